@@ -154,6 +154,7 @@ def deploy(rt, app_info, credentials):
 
 def set_loglevel(levels, filename):
     from calvin.utilities.calvinlogger import get_logger, set_file
+    from calvin.utilities import calvinuuid
     global _log
 
     if filename:
@@ -163,6 +164,7 @@ def set_loglevel(levels, filename):
 
     if not levels:
         get_logger().setLevel(logging.INFO)
+        calvinuuid.refresh()
         return
 
     for level in levels:
@@ -181,6 +183,7 @@ def set_loglevel(levels, filename):
             get_logger(module).setLevel(logging.DEBUG)
         elif level == "ANALYZE":
             get_logger(module).setLevel(5)
+    calvinuuid.refresh()
 
 
 def dispatch_and_deploy(app_info, wait, uri, control_uri, attr, credentials):
@@ -16,17 +16,38 @@
 
 import wrapt
 import functools
+import logging
 import time
 from calvin.utilities import calvinuuid
 from calvin.utilities.security import Security
 from calvin.actor import actorport
 from calvin.utilities.calvinlogger import get_logger
 from calvin.utilities.utils import enum
+from calvin.utilities import calvinconfig
 from calvin.runtime.north.calvin_token import Token, ExceptionToken
 from calvin.runtime.north import calvincontrol
 from calvin.runtime.north import metering
+from calvin.runtime.north.hooks import get_firing_hooks
+from calvin.runtime.north import offload as offload_pools
 
 _log = get_logger(__name__)
+_conf = calvinconfig.get()
+
+# Decorators skip status checks, production validation and debug logging
+_production_mode = bool(_conf.get(None, 'actor_production_mode'))
+
+
+def log_firing(actor, action_name, action_result):
+    _log.debug("Actor %s(%s) did fire %s -> %s" % (
+        actor._type, actor.id,
+        action_name,
+        str(action_result)))
+
+
+def attach_debug_hook(firing_hooks):
+    """ Log every firing when actors log at debug level """
+    if _log.isEnabledFor(logging.DEBUG):
+        firing_hooks.attach(log_firing)
 
 
 # Tests in test_manage_decorator.py
@@ -70,13 +91,22 @@ def manage(include=None, exclude=None):
     return wrapper
 
 
-def condition(action_input=[], action_output=[]):
+def condition(action_input=[], action_output=[], batch=False, offload=None):
     """
     Decorator condition specifies the required input data and output space.
     Both parameters are lists of tuples: (port, #tokens consumed/produced)
     Optionally, the port spec can be a port only, meaning #tokens is 1.
     Return value is an ActionResult object
 
+    With batch=True the action is called once with all tokens that can be consumed, up to the
+    free space of the output ports, as a list per input port, and the production is a list per
+    output port. Only for actions with inputs, consuming and producing one token per port.
+
+    With offload='thread' the action runs in a thread pool, for actions that block, and with
+    offload='process' in a process pool, for pure CPU-bound actions. Process pool actions are
+    called without an actor instance (self is None), their arguments and production must be picklable.
+    The actor fires nothing else until the action returns, then the production is written.
+
     FIXME:
     - Modify ActionResult to specify how many tokens were read/written from/to each port
       E.g. ActionResult.tokens_consumed/produced are dicts: {'port1':4, 'port2':1, ...}
@@ -93,8 +123,21 @@ def condition(action_input=[], action_output=[]):
     tokens_produced = sum(contract_output)
     tokens_consumed = sum([n for _, n in action_input])
 
+    if batch:
+        if not action_input or any(repeat != 1 for _, repeat in action_input + action_output):
+            raise Exception("@condition batch: Must have inputs and one token per port")
+        return lambda action_method: _batch_condition(action_method, action_input, action_output)
+
+    if offload:
+        if offload not in ('thread', 'process'):
+            raise Exception("@condition offload: Must be 'thread' or 'process'")
+        return lambda action_method: _offload_condition(action_method, action_input, action_output, offload)
+
     def wrap(action_method):
 
+        if _production_mode:
+            return _production_condition(action_method, action_input, action_output, tokens_consumed, tokens_produced)
+
         @functools.wraps(action_method)
         def condition_wrapper(self):
             #
@@ -180,10 +223,250 @@ def condition(action_input=[], action_output=[]):
             return action_result
         condition_wrapper.action_input = action_input
         condition_wrapper.action_output = action_output
+        condition_wrapper.action_method = action_method
+        condition_wrapper.batch = False
         return condition_wrapper
     return wrap
 
 
+def _production_condition(action_method, action_input, action_output, tokens_consumed, tokens_produced):
+    """
+    Condition wrapper for production mode, specialized for the common one token in, one token out
+    actions. Does not validate the production of the action, nor log.
+    """
+    if len(action_input) == 1 and len(action_output) == 1 and action_input[0][1] == 1 and action_output[0][1] == 1:
+        in_name = action_input[0][0]
+        out_name = action_output[0][0]
+
+        @functools.wraps(action_method)
+        def condition_wrapper(self):
+            inport = self.inports[in_name]
+            outport = self.outports[out_name]
+            if inport.available_tokens() < 1 or outport.available_tokens() < 1:
+                return _NOT_FIRED
+            token = inport.peek_token()
+            if isinstance(token, ExceptionToken):
+                action_result = self.exception_handler(action_method, [token], {'exceptions': {in_name: [0]}})
+            else:
+                action_result = action_method(self, token.value)
+            if action_result.did_fire:
+                inport.commit_peek_as_read()
+                data = action_result.production[0]
+                outport.write_token(data if isinstance(data, Token) else Token(data))
+                action_result.tokens_consumed = 1
+                action_result.tokens_produced = 1
+            else:
+                inport.peek_rewind()
+            return action_result
+    else:
+        action_input = tuple(action_input)
+        action_output = tuple(action_output)
+
+        @functools.wraps(action_method)
+        def condition_wrapper(self):
+            inports = self.inports
+            outports = self.outports
+            for portname, repeat in action_input:
+                if inports[portname].available_tokens() < repeat:
+                    return _NOT_FIRED
+            for portname, repeat in action_output:
+                if outports[portname].available_tokens() < repeat:
+                    return _NOT_FIRED
+            args = []
+            ex = None
+            for portname, repeat in action_input:
+                port = inports[portname]
+                tokenlist = []
+                for i in xrange(repeat):
+                    token = port.peek_token()
+                    if isinstance(token, ExceptionToken):
+                        if ex is None:
+                            ex = {}
+                        ex.setdefault(portname, []).append(i)
+                        tokenlist.append(token)
+                    else:
+                        tokenlist.append(token.value)
+                args.append(tokenlist if repeat > 1 else tokenlist[0])
+            if ex:
+                action_result = self.exception_handler(action_method, args, {'exceptions': ex})
+            else:
+                action_result = action_method(self, *args)
+            if action_result.did_fire:
+                for portname, _ in action_input:
+                    inports[portname].commit_peek_as_read()
+                for (portname, repeat), retval in zip(action_output, action_result.production):
+                    port = outports[portname]
+                    if repeat > 1:
+                        for data in retval:
+                            port.write_token(data if isinstance(data, Token) else Token(data))
+                    else:
+                        port.write_token(retval if isinstance(retval, Token) else Token(retval))
+                action_result.tokens_consumed = tokens_consumed
+                action_result.tokens_produced = tokens_produced
+            else:
+                for portname, _ in action_input:
+                    inports[portname].peek_rewind()
+            return action_result
+
+    condition_wrapper.action_input = list(action_input)
+    condition_wrapper.action_output = list(action_output)
+    condition_wrapper.action_method = action_method
+    condition_wrapper.batch = False
+    return condition_wrapper
+
+
+def _batch_condition(action_method, action_input, action_output):
+    """
+    Condition wrapper for batch=True. Tokens up to an exception token are handled in one batch,
+    the exception token is then given to the exception handler by itself.
+    """
+    in_names = tuple(portname for portname, _ in action_input)
+    out_names = tuple(portname for portname, _ in action_output)
+
+    def peek(inports, count):
+        return [[port.peek_token() for _ in xrange(count)] for port in inports]
+
+    @functools.wraps(action_method)
+    def condition_wrapper(self):
+        inports = [self.inports[portname] for portname in in_names]
+        outports = [self.outports[portname] for portname in out_names]
+        count = min([port.available_tokens() for port in inports + outports])
+        if count < 1:
+            return ActionResult(did_fire=False)
+        tokens = peek(inports, count)
+        first_exception = count
+        for port_tokens in tokens:
+            for i, token in enumerate(port_tokens[:first_exception]):
+                if isinstance(token, ExceptionToken):
+                    first_exception = i
+                    break
+        if first_exception == 0:
+            for port in inports:
+                port.peek_rewind()
+            args = [port.peek_token() for port in inports]
+            ex = {portname: [0] for portname, token in zip(in_names, args) if isinstance(token, ExceptionToken)}
+            args = [token if isinstance(token, ExceptionToken) else token.value for token in args]
+            action_result = self.exception_handler(action_method, args, {'exceptions': ex})
+            productions = [[production] for production in action_result.production]
+            count = 1
+        else:
+            if first_exception < count:
+                # Leave the exception for a later firing
+                for port in inports:
+                    port.peek_rewind()
+                count = first_exception
+                tokens = peek(inports, count)
+            action_result = action_method(self, *[[token.value for token in port_tokens] for port_tokens in tokens])
+            productions = action_result.production
+
+        if not action_result.did_fire:
+            for port in inports:
+                port.peek_rewind()
+            return action_result
+
+        if not _production_mode and (len(productions) != len(outports) or
+                                     any(len(production) != count for production in productions)):
+            for port in inports:
+                port.peek_rewind()
+            action = "%s.%s" % (self._type, action_method.__name__)
+            raise Exception("%s invalid production %s, expected %d tokens for each of %s" % (
+                action, str(action_result.production), count, str(out_names)))
+
+        for port in inports:
+            port.commit_peek_as_read()
+        for port, production in zip(outports, productions):
+            for data in production:
+                port.write_token(data if isinstance(data, Token) else Token(data))
+        action_result.tokens_consumed = count * len(inports)
+        action_result.tokens_produced = count * len(outports)
+        return action_result
+
+    condition_wrapper.action_input = action_input
+    condition_wrapper.action_output = action_output
+    condition_wrapper.action_method = action_method
+    condition_wrapper.batch = True
+    return condition_wrapper
+
+
+def _offload_condition(action_method, action_input, action_output, offload):
+    """
+    Condition wrapper for offload='thread' or 'process'. The first call peeks the tokens, starts
+    the action in the pool and rewinds the ports, the call after the action returned reads the
+    same tokens and writes the production. Exception tokens are handled without offloading.
+    """
+    contract_output = tuple(n for _, n in action_output)
+    tokens_produced = sum(contract_output)
+    tokens_consumed = sum([n for _, n in action_input])
+
+    def commit(self, action_result):
+        if not action_result.did_fire:
+            return action_result
+        if (len(contract_output) != len(action_result.production) or
+                any(repeat > 1 and len(prod) != repeat for repeat, prod in zip(contract_output, action_result.production))):
+            action = "%s.%s" % (self._type, action_method.__name__)
+            raise Exception("%s invalid production %s, expected %s" % (action, str(action_result.production), str(tuple(action_output))))
+        for (portname, repeat) in action_input:
+            port = self.inports[portname]
+            for _ in xrange(repeat):
+                port.peek_token()
+            port.commit_peek_as_read()
+        for (portname, repeat), retval in zip(action_output, action_result.production):
+            port = self.outports[portname]
+            for data in retval if repeat > 1 else [retval]:
+                port.write_token(data if isinstance(data, Token) else Token(data))
+        action_result.tokens_consumed = tokens_consumed
+        action_result.tokens_produced = tokens_produced
+        return action_result
+
+    @functools.wraps(action_method)
+    def condition_wrapper(self):
+        job = self._offload_job
+        if job is not None:
+            if not job.done:
+                return ActionResult(did_fire=False)
+            self._offload_job = None
+            if job.error:
+                raise Exception("%s.%s failed in %s pool:\n%s" % (self._type, action_method.__name__, offload, job.error))
+            return commit(self, job.result)
+
+        input_ok = all(self.inports[portname].available_tokens() >= repeat for (portname, repeat) in action_input)
+        output_ok = all(self.outports[portname].available_tokens() >= repeat for (portname, repeat) in action_output)
+        if not input_ok or not output_ok:
+            return ActionResult(did_fire=False)
+
+        args = []
+        ex = {}
+        for (portname, repeat) in action_input:
+            port = self.inports[portname]
+            tokenlist = []
+            for i in range(repeat):
+                token = port.peek_token()
+                is_exception = isinstance(token, ExceptionToken)
+                if is_exception:
+                    ex.setdefault(portname, []).append(i)
+                tokenlist.append(token if is_exception else token.value)
+            args.append(tokenlist if len(tokenlist) > 1 else tokenlist[0])
+        # The tokens are read again when the action has returned
+        for (portname, _) in action_input:
+            self.inports[portname].peek_rewind()
+
+        if ex:
+            return commit(self, self.exception_handler(action_method, args, {'exceptions': ex}))
+
+        if offload == 'thread':
+            self._offload_job = offload_pools.get_offload().run_in_thread(self, condition_wrapper, action_method, args)
+        else:
+            self._offload_job = offload_pools.get_offload().run_in_process(self, condition_wrapper, args)
+        return ActionResult(did_fire=False)
+
+    condition_wrapper.action_input = action_input
+    condition_wrapper.action_output = action_output
+    condition_wrapper.action_method = action_method
+    condition_wrapper.batch = False
+    condition_wrapper.offload = offload
+    return condition_wrapper
+
+
 def guard(action_guard):
     """
     Decorator guard refines the criteria for picking an action to run by stating a function
@@ -194,6 +477,14 @@ def guard(action_guard):
 
     def wrap(action_method):
 
+        if _production_mode:
+            @functools.wraps(action_method)
+            def production_guard_wrapper(self, *args):
+                if action_guard(self, *args):
+                    return action_method(self, *args)
+                return _NOT_FIRED
+            return production_guard_wrapper
+
         @functools.wraps(action_method)
         def guard_wrapper(self, *args):
             retval = ActionResult(did_fire=False)
@@ -212,7 +503,11 @@ def verify_status(valid_status_list, raise_=False):
     Decorator to help with debugging of state transitions
     If a decorated is called when the actors status is not in valid_status_list
     it will log (or raise exception if raise_ is True) the attempt.
+    In production mode the check is skipped unless raise_ is True.
     """
+    if _production_mode and not raise_:
+        return lambda wrapped: wrapped
+
     @wrapt.decorator
     def wrapper(wrapped, instance, args, kwargs):
         # Exclude the instance variables added by superclasses
@@ -255,6 +550,10 @@ class ActionResult(object):
         self.tokens_produced += other_result.tokens_produced
 
 
+# Shared result of actions not fired in production mode, must not be modified
+_NOT_FIRED = ActionResult(did_fire=False)
+
+
 def _implements_state(obj):
     """Helper method to check if foreign object supports setting/getting state."""
     return hasattr(obj, 'state') and callable(getattr(obj, 'state')) and \
@@ -275,6 +574,11 @@ class Actor(object):
     # Class variable controls action priority order
     action_priority = tuple()
 
+    # Class variable, True when the actor has one inport, one outport and a single action without
+    # side effects, consuming and producing one token. Local chains of such actors can be fused,
+    # their actions are then called in sequence without passing the FIFOs in between.
+    fusable = False
+
     # Internal state (status)
     class FSM(object):
 
@@ -341,6 +645,9 @@ class Actor(object):
         self._using = {}
         self.control = calvincontrol.get_calvincontrol()
         self.metering = metering.get_metering()
+        self._fired_hooks = get_firing_hooks().fired
+        self._fused_chain = None
+        self._offload_job = None  # Action running in an offload pool, see @condition(offload=...)
         self._migrating_to = None  # During migration while on the previous node set to the next node id
         self._last_time_warning = 0.0
         self.credentials = None
@@ -442,7 +749,10 @@ class Actor(object):
 
     @verify_status([STATUS.READY])
     def set_port_property(self, port_type, port_name, port_property, value):
-        """Change a port property. Currently, setting 'fanout' on output ports is only allowed operation."""
+        """
+        Change a port property, e.g. 'fanout' on output ports or 'fifo_size' and 'fifo_max_size'
+        (the token queue size and the size it may grow to) on any port.
+        """
 
         if port_type not in ('in', 'out'):
             _log.error("Illegal port type '%s' for actor '%s' of type '%s'" % (port_type, self.name, self._type))
@@ -457,7 +767,12 @@ class Actor(object):
             _log.error("Illegal property '%s' for %sport '%s' in actor '%s' of type '%s'" %
                        (port_property, port_type, port_name, self.name, self._type))
             return False
-        setattr(port, port_property, value)
+        try:
+            setattr(port, port_property, value)
+        except Exception as e:
+            _log.error("Failed to set property '%s' for %sport '%s' in actor '%s': %s" %
+                       (port_property, port_type, port_name, self.name, e))
+            return False
         return True
 
     @verify_status([STATUS.READY, STATUS.PENDING])
@@ -482,12 +797,18 @@ class Actor(object):
         # If we made it here, all ports are connected
         self.fsm.transition_to(Actor.STATUS.ENABLED)
 
+        if self.fusable and _conf.get(None, 'actor_fusion'):
+            from calvin.runtime.north import fusion
+            fusion.fuse_around(self)
+
         # Actor enabled, inform scheduler
-        self._calvinsys.scheduler_wakeup()
+        self._calvinsys.scheduler_wakeup([self.id])
 
     @verify_status([STATUS.ENABLED, STATUS.PENDING])
     def did_disconnect(self, port):
         """Called when a port is disconnected, checks actor is fully disconnected."""
+        if self._fused_chain is not None:
+            self._fused_chain.unfuse()
         # If we happen to by in ENABLED, go to PENDING
         if self.fsm.state() == Actor.STATUS.ENABLED:
             self.fsm.transition_to(Actor.STATUS.PENDING)
@@ -511,27 +832,25 @@ class Actor(object):
     def fire(self):
         start_time = time.time()
         total_result = ActionResult(did_fire=False)
+        if self._fused_chain is not None and self._fused_chain.head is self:
+            total_result.merge(self._fused_chain.fire())
         while True:
+            # Only the offloaded action may fire, when it has returned, to keep the token order
+            actions = self.__class__.action_priority if self._offload_job is None else (self._offload_job.action,)
             # Re-try action in list order after EVERY firing
-            for action_method in self.__class__.action_priority:
+            for action_method in actions:
                 action_result = action_method(self)
                 total_result.merge(action_result)
                 # Action firing should fire the first action that can fire,
                 # hence when fired start from the beginning
                 if action_result.did_fire:
-                    # FIXME: Make this a hook for the runtime too use, don't
-                    #        import and use calvin_control or metering in actor
-                    self.metering.fired(self.id, action_method.__name__)
-                    self.control.log_actor_firing(
-                        self.id,
-                        action_method.__name__,
-                        action_result.tokens_produced,
-                        action_result.tokens_consumed,
-                        action_result.production)
-                    _log.debug("Actor %s(%s) did fire %s -> %s" % (
-                        self._type, self.id,
-                        action_method.__name__,
-                        str(action_result)))
+                    # Metering, log subscribers etc. attach to the firing hooks
+                    if self._fired_hooks:
+                        for hook in self._fired_hooks:
+                            hook(self, action_method.__name__, action_result)
+                    break
+                if self._offload_job is not None:
+                    # The action was started in an offload pool
                     break
 
             if not action_result.did_fire:
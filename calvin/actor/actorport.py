@@ -15,18 +15,20 @@
 # limitations under the License.
 
 from calvin.utilities import calvinuuid
+from calvin.utilities import calvinconfig
 from calvin.runtime.north import fifo
 from calvin.runtime.south import endpoint
 from calvin.utilities.calvinlogger import get_logger
 import copy
 
 _log = get_logger(__name__)
+_conf = calvinconfig.get()
 
 
 class Port(object):
     """docstring for Port"""
 
-    def __init__(self, name, owner, fifo_size=5):
+    def __init__(self, name, owner, fifo_size=None, fifo_max_size=None):
         super(Port, self).__init__()
         # Human readable port name
         self.name = name
@@ -36,20 +38,44 @@ class Port(object):
         self.id = calvinuuid.uuid("PORT")
         # The token queue. Not all scenarios use it,
         # but needed when e.g. changing from local to remote connection.
-        self.fifo = fifo.FIFO(fifo_size)
+        self.fifo = fifo.new_fifo(fifo_size or _conf.get(None, 'fifo_size'),
+                                  fifo_max_size or _conf.get(None, 'fifo_max_size'))
+        # Link used by remote connections, settable as a port property:
+        # 'shared', 'token' or 'dedicated', None uses the runtime's 'token_link' setting
+        self.link = None
 
     def __str__(self):
         return "%s id=%s" % (self.name, self.id)
 
+    @property
+    def fifo_size(self):
+        """Number of entries in the token queue, settable as a port property."""
+        return self.fifo.N
+
+    @fifo_size.setter
+    def fifo_size(self, size):
+        if not self.fifo.resize(int(size)):
+            raise Exception("Can't resize fifo of port %s.%s to %s" % (self.owner.name, self.name, size))
+
+    @property
+    def fifo_max_size(self):
+        """Number of entries the token queue may grow to when it keeps filling up."""
+        return self.fifo.max_N
+
+    @fifo_max_size.setter
+    def fifo_max_size(self, size):
+        self.fifo.max_N = max(self.fifo.N, int(size))
+
     def _state(self):
         """Return port state for serialization."""
-        return {'name': self.name, 'id': self.id, 'fifo': self.fifo._state()}
+        return {'name': self.name, 'id': self.id, 'fifo': self.fifo._state(), 'link': self.link}
 
     def _set_state(self, state):
         """Set port state."""
         self.name = state.pop('name')
         self.id = state.pop('id')
         self.fifo._set_state(state.pop('fifo'))
+        self.link = state.pop('link', None)
 
     def attach_endpoint(self, endpoint_):
         """
@@ -216,6 +242,8 @@ class OutPort(Port):
         if not self.fifo.write(data):
             raise Exception("FIFO full when writing to port %s.%s with id: %s" % (
                 self.owner.name, self.name, self.id))
+        for ep in self.endpoints:
+            ep.tokens_available()
 
     def available_tokens(self):
         """Used by actor (owner) to check number of token slots available on the port."""
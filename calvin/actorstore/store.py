@@ -662,19 +662,30 @@ class GlobalStore(ActorStore):
         return hashlib.sha256(json.dumps(GlobalStore.list_sort(desc), separators=(',', ':'), sort_keys=True)).hexdigest()
 
     def export_actor(self, desc):
-        signature = self.actor_signature(desc)
-        hash = self.actor_hash(desc)
-        if self.node:
+        self.export_actors([desc])
+
+    def export_actors(self, descs):
+        """ Store the descriptions and their signature indexes, in one storage operation of each kind """
+        index_values = []
+        actor_types = {}
+        for desc in descs:
+            signature = self.actor_signature(desc)
+            hash = self.actor_hash(desc)
+            if self.node:
+                index_values.append((['actor', 'signature', signature], hash))
+                actor_types[hash] = desc
+            else:
+                print "global store index %s -> %s" %(signature, hash)
+        if self.node and descs:
             # FIXME should have callback to verify OK
-            self.node.storage.add_index(['actor', 'signature', signature], hash, root_prefix_level=3)
+            self.node.storage.add_indexes(index_values, root_prefix_level=3)
             # FIXME should have callback to verify OK
-            self.node.storage.set('actor_type-', hash, desc, None)
-        else:
-            print "global store index %s -> %s" %(signature, hash)
+            self.node.storage.set_many('actor_type-', actor_types, None)
 
     def export(self):
         self.qualified_actor_list = []
         self._collect()
+        descs = []
         for a in self.qualified_actor_list:
             found, is_primitive, actor = self.lookup(a)
             if not found:
@@ -693,7 +704,8 @@ class GlobalStore(ActorStore):
                 desc = {'is_primitive': is_primitive, 
                         'actor_type': a,
                         'component': actor}
-            self.export_actor(desc)
+            descs.append(desc)
+        self.export_actors(descs)
 
     def global_lookup(self, desc, cb):
         """ Lookup the described actor
@@ -21,7 +21,7 @@ class FaceDetect(Actor) :
     def did_migrate(self):
         self.setup()
 
-    @condition(['image'], ['faces'])
+    @condition(['image'], ['faces'], offload='thread')
     def detect(self, image):
         found = self.image.detect_face(image)
         return ActionResult(production=(found, ))
@@ -32,13 +32,15 @@ class Identity(Actor):
     def log(self, data):
         print "%s<%s>: %s" % (self.__class__.__name__, self.id, data)
 
-    @condition(['token'], ['token'])
-    def donothing(self, input):
+    @condition(['token'], ['token'], batch=True)
+    def donothing(self, tokens):
         if self.dump:
-            self.log(input)
-        return ActionResult(production=(input, ))
+            for data in tokens:
+                self.log(data)
+        return ActionResult(production=(tokens, ))
 
     action_priority = (donothing, )
+    fusable = True
 
     test_set = [
         {
@@ -31,11 +31,12 @@ class Stringify(Actor):
     def init(self):
         pass
 
-    @condition(['in'], ['out'])
-    def stringify(self, input):
-        return ActionResult(production=(str(input), ))
+    @condition(['in'], ['out'], batch=True)
+    def stringify(self, tokens):
+        return ActionResult(production=([str(data) for data in tokens], ))
 
     action_priority = (stringify, )
+    fusable = True
 
     test_set = [
         {
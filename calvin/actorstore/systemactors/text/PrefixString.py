@@ -34,11 +34,12 @@ class PrefixString(Actor):
     def exception_handler(self, action, args, exceptions):
         return ActionResult(production=(EOSToken(), ))
 
-    @condition(['in'], ['out'])
-    def prefix(self, token):
-        return ActionResult(production=(self.prefix + str(token), ))
+    @condition(['in'], ['out'], batch=True)
+    def prefix(self, tokens):
+        return ActionResult(production=([self.prefix + str(token) for token in tokens], ))
 
     action_priority = (prefix, )
+    fusable = True
 
     test_kwargs = {'prefix': 'P'}
 
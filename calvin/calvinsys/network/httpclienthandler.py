@@ -48,10 +48,10 @@ class HTTPClientHandler(object):
         return self._issue_request('GET', url, params, headers, None)
 
     def _receive_headers(self, dummy=None):
-        self._node.sched.trigger_loop()
+        self._node.sched.trigger_loop(actor_ids=[self._actor.id])
 
     def _receive_body(self, dummy=None):
-        self._node.sched.trigger_loop()
+        self._node.sched.trigger_loop(actor_ids=[self._actor.id])
 
     def received_headers(self, handle):
         return self._requests[handle].headers() is not None
@@ -31,7 +31,7 @@ class Distance(object):
     def _new_measurement(self, measurement):
         self._measurement = measurement
         self._has_data = True
-        self._node.sched.trigger_loop(actor_ids=[self._actor])
+        self._node.sched.trigger_loop(actor_ids=[self._actor.id])
         
     def start(self, frequency):
         self._distance.start(frequency)
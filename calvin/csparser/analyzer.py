@@ -51,6 +51,7 @@ class Analyzer(object):
         self.app_info = {}
         self.connections = {}
         self.actors = {}
+        self.port_properties = {}
         self.verify = verify
         self.actorstore = ActorStore()
         self.analyze()
@@ -81,6 +82,8 @@ class Analyzer(object):
             _log.exception(e)
             valid = False
         self.app_info = {'valid': valid, 'actors': self.actors, 'connections': self.connections}
+        if self.port_properties:
+            self.app_info['port_properties'] = self.port_properties
         if self.script_name:
             self.app_info['name'] = self.script_name
 
@@ -125,6 +128,15 @@ class Analyzer(object):
         else:
             self.connections.setdefault(src_actor_port, []).append(dst_actor_port)
 
+    def add_port_properties(self, actor_port, port_dir, properties):
+        # Properties are kept per actor as {<actor>: {'in'|'out': {<port>: {<property>: <value>}}}}
+        if type(actor_port) is not list:
+            actor_port = [actor_port]
+        for name in actor_port:
+            actor_name, port_name = name.rsplit('.', 1)
+            port_props = self.port_properties.setdefault(actor_name, {}).setdefault(port_dir, {})
+            port_props.setdefault(port_name, {}).update(properties)
+
     def expand_literals(self, structure, argd):
         # Check for literals on inports...
         const_count = 1
@@ -164,7 +176,7 @@ class Analyzer(object):
             args[arg_name] = arg_value
         return args
 
-    def create_connection(self, c, namespace, in_mappings, out_mappings):
+    def create_connection(self, c, namespace, in_mappings, out_mappings, argd):
         # export_mapping = {'in':{}, 'out':{}}
         # Get the full port name.
         # If src/dst is ".", the full port name is component port name at caller level
@@ -176,6 +188,15 @@ class Analyzer(object):
         dst_actor_port = in_mappings.get(dst_actor_port, dst_actor_port)
         src_actor_port = out_mappings.get(src_actor_port, src_actor_port)
 
+        # Add any properties given for the ports
+        for side, port_dir, actor_port in (('src', 'out', src_actor_port), ('dst', 'in', dst_actor_port)):
+            if side + '_properties' not in c:
+                continue
+            if c[side] == '.':
+                raise Exception("%s: Properties can't be set on component port '%s'" %
+                                (self.debug_info(c), c[side + '_port']))
+            self.add_port_properties(actor_port, port_dir, self.resolve_arguments(c[side + '_properties'], argd))
+
         # Add connections if possible, or export a port mapping for calling level
         if c['src'] != '.' and c['dst'] != '.':
             self.add_connection(src_actor_port, dst_actor_port)
@@ -236,7 +257,7 @@ class Analyzer(object):
         export_in_mappings = {}
         export_out_mappings = {}
         for c in structure['connections']:
-            in_mapping, out_mapping = self.create_connection(c, namespace, in_mappings, out_mappings)
+            in_mapping, out_mapping = self.create_connection(c, namespace, in_mappings, out_mappings, argd)
             for p in in_mapping:
                 export_in_mappings.setdefault(p, []).extend(in_mapping[p])
             export_out_mappings.update(out_mapping)
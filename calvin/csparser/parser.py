@@ -132,20 +132,32 @@ def p_assignment(p):
 
 
 def p_link(p):
-    """link : port GT port
-            | argument GT port"""
-    kind, value = p[1]
+    """link : port_ref GT port_ref
+            | argument GT port_ref"""
+    kind, value = p[1][:2]
     (src, port) = value if kind == 'PORT' else (None, (kind, value))
     d = {}
     d['src'] = src
     d['src_port'] = port
-    _, (dst, port) = p[3]
+    if kind == 'PORT' and p[1][2]:
+        d['src_properties'] = p[1][2]
+    _, (dst, port), properties = p[3]
     d['dst'] = dst
     d['dst_port'] = port
+    if properties:
+        d['dst_properties'] = properties
     d['dbg_line'] = p.lineno(2)
     p[0] = ('link', d)
 
 
+def p_port_ref(p):
+    """port_ref : port
+                | port LPAREN named_args RPAREN"""
+    # Port with optional properties, e.g. snk.token(fifo_size=16)
+    kind, value = p[1]
+    p[0] = (kind, value, p[3] if len(p) == 5 else {})
+
+
 def p_port(p):
     """port : IDENTIFIER DOT IDENTIFIER
             | DOT IDENTIFIER"""
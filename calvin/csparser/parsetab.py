@@ -5,9 +5,9 @@ _tabversion = '3.8'
 
 _lr_method = 'LALR'
 
-_lr_signature = 'E14E21B9666D419D06EB34A6DFAA3EEC'
+_lr_signature = '746C69D1E78BEB928379D8C7A4EBD564'
     
-_lr_action_items = {'RARROW':([59,60,65,66,],[-47,-49,69,-48,]),'COMPONENT':([0,2,3,7,8,9,13,16,17,18,19,20,22,29,32,33,34,35,36,55,57,81,],[-2,6,-4,-8,-3,6,-27,-7,-35,-37,-29,-33,-32,-30,-31,-34,-36,-5,-28,-38,-46,-9,]),'RPAREN':([13,17,18,19,20,22,29,32,33,34,36,38,48,55,57,60,61,66,67,72,75,77,],[-27,-35,-37,-29,-33,-32,-30,-31,-34,-36,-28,-47,59,-38,-46,-49,-23,-48,70,-25,-24,-26,]),'COMMA':([13,17,18,19,20,22,29,32,33,34,36,54,55,57,58,60,68,72,77,],[-27,-35,-37,-29,-33,-32,-30,-31,-34,-36,-28,62,-38,-46,64,66,-42,75,-26,]),'LPAREN':([11,12,47,52,],[38,-51,-50,61,]),'TRUE':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,31,32,33,34,35,36,42,43,46,49,51,53,55,57,58,63,64,70,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,17,17,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,17,-30,-43,-31,-34,-36,-5,-28,-14,-22,17,-20,-21,-19,-38,-46,-45,17,-44,-18,17,-10,17,-11,17,-9,]),'DOCSTRING':([76,],[79,]),'NUMBER':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,31,32,33,34,35,36,42,43,46,49,51,53,55,57,58,63,64,70,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,20,20,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,20,-30,-43,-31,-34,-36,-5,-28,-14,-22,20,-20,-21,-19,-38,-46,-45,20,-44,-18,20,-10,20,-11,20,-9,]),'$end':([0,2,3,4,7,8,9,13,14,15,16,17,18,19,20,22,24,25,26,29,32,33,34,35,36,42,43,49,51,53,55,57,70,81,],[-2,-6,-4,0,-8,-3,-12,-27,-15,-1,-7,-35,-37,-29,-33,-32,-17,-16,-13,-30,-31,-34,-36,-5,-28,-14,-22,-20,-21,-19,-38,-46,-18,-9,]),'EQ':([5,71,],[10,74,]),'NULL':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,31,32,33,34,35,36,42,43,46,49,51,53,55,57,58,63,64,70,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,18,18,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,18,-30,-43,-31,-34,-36,-5,-28,-14,-22,18,-20,-21,-19,-38,-46,-45,18,-44,-18,18,-10,18,-11,18,-9,]),'GT':([13,17,18,19,20,21,22,23,28,29,32,33,34,43,51,55,57,],[-27,-35,-37,-29,-33,39,-32,-28,44,-30,-31,-34,-36,-22,-21,-38,-46,]),'IDENTIFIER':([0,1,2,3,6,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,27,29,32,33,34,35,36,37,38,39,40,41,42,43,44,48,49,51,53,55,57,59,60,61,65,66,67,69,70,72,73,74,75,76,77,78,79,80,81,],[-2,5,-6,-4,12,-8,-3,23,36,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,23,43,-30,-31,-34,-36,-5,-28,47,-47,50,51,12,-14,-22,50,60,-20,-21,-19,-38,-46,-47,-49,-23,60,-48,71,-47,-18,-25,60,36,-24,-10,-26,23,-11,23,-9,]),'DOT':([0,2,3,7,8,9,11,12,13,14,16,17,18,19,20,22,23,24,25,26,29,32,33,34,35,36,39,42,43,44,47,49,50,51,52,53,55,57,70,76,78,79,80,81,],[-2,-6,-4,-8,-3,27,37,-51,-27,-15,-7,-35,-37,-29,-33,-32,40,-17,-16,27,-30,-31,-34,-36,-5,-28,27,-14,-22,27,-50,-20,40,-21,37,-19,-38,-46,-18,-10,27,-11,27,-9,]),'DEFINE':([0,2,3,8,13,17,18,19,20,22,29,32,33,34,35,36,55,57,],[1,1,-4,-3,-27,-35,-37,-29,-33,-32,-30,-31,-34,-36,-5,-28,-38,-46,]),'COLON':([23,56,],[41,63,]),'LBRACE':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,31,32,33,34,35,36,42,43,46,49,51,53,55,57,58,60,63,64,66,69,70,73,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,30,30,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,30,-30,-43,-31,-34,-36,-5,-28,-14,-22,30,-20,-21,-19,-38,-46,-45,-49,30,-44,-48,-47,-18,76,30,-10,30,-11,30,-9,]),'LBRACK':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,31,32,33,34,35,36,42,43,46,49,51,53,55,57,58,63,64,70,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,31,31,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,31,-30,-43,-31,-34,-36,-5,-28,-14,-22,31,-20,-21,-19,-38,-46,-45,31,-44,-18,31,-10,31,-11,31,-9,]),'RBRACE':([14,17,18,19,20,22,24,25,29,30,32,33,34,42,43,45,49,51,53,54,55,57,62,68,70,80,],[-15,-35,-37,-29,-33,-32,-17,-16,-30,-39,-31,-34,-36,-14,-22,55,-20,-21,-19,-41,-38,-46,-40,-42,-18,81,]),'RBRACK':([17,18,19,20,22,29,31,32,33,34,46,55,57,58,64,],[-35,-37,-29,-33,-32,-30,-43,-31,-34,-36,57,-38,-46,-45,-44,]),'STRING':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,30,31,32,33,34,35,36,42,43,45,46,49,51,53,54,55,57,58,62,63,64,68,70,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,33,33,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,33,-30,-39,-43,-31,-34,-36,-5,-28,-14,-22,56,33,-20,-21,-19,-41,-38,-46,-45,-40,33,-44,-42,-18,33,-10,33,-11,33,-9,]),'FALSE':([0,2,3,7,8,9,10,13,14,16,17,18,19,20,22,24,25,26,29,31,32,33,34,35,36,42,43,46,49,51,53,55,57,58,63,64,70,74,76,78,79,80,81,],[-2,-6,-4,-8,-3,34,34,-27,-15,-7,-35,-37,-29,-33,-32,-17,-16,34,-30,-43,-31,-34,-36,-5,-28,-14,-22,34,-20,-21,-19,-38,-46,-45,34,-44,-18,34,-10,34,-11,34,-9,]),}
+_lr_action_items = {'NUMBER':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,32,33,34,35,39,41,46,47,48,51,55,56,57,60,61,65,69,70,74,79,81,82,83,84,85,],[-2,-6,-4,-8,29,-3,-31,-32,-34,-37,-36,-39,-7,-21,29,-15,-33,-16,-35,-17,-38,-45,-29,29,-24,-14,29,-5,-30,-20,-23,-19,-40,-48,-47,-22,29,-46,29,-18,-10,29,-11,29,-9,]),'NULL':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,32,33,34,35,39,41,46,47,48,51,55,56,57,60,61,65,69,70,74,79,81,82,83,84,85,],[-2,-6,-4,-8,19,-3,-31,-32,-34,-37,-36,-39,-7,-21,19,-15,-33,-16,-35,-17,-38,-45,-29,19,-24,-14,19,-5,-30,-20,-23,-19,-40,-48,-47,-22,19,-46,19,-18,-10,19,-11,19,-9,]),'TRUE':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,32,33,34,35,39,41,46,47,48,51,55,56,57,60,61,65,69,70,74,79,81,82,83,84,85,],[-2,-6,-4,-8,16,-3,-31,-32,-34,-37,-36,-39,-7,-21,16,-15,-33,-16,-35,-17,-38,-45,-29,16,-24,-14,16,-5,-30,-20,-23,-19,-40,-48,-47,-22,16,-46,16,-18,-10,16,-11,16,-9,]),'DOT':([0,2,3,5,7,8,10,11,13,14,15,16,18,19,20,21,22,23,24,25,28,29,30,32,34,38,39,41,44,47,48,50,51,52,54,55,56,57,60,65,79,81,82,83,84,85,],[-2,-6,-4,-8,17,-3,37,-53,-31,-32,-34,-37,-36,-39,-7,-21,17,-15,-33,43,-16,-35,-17,-38,-29,17,-24,-14,17,-5,-30,-52,-20,43,37,-23,-19,-40,-48,-22,-18,-10,17,-11,17,-9,]),'RBRACE':([13,14,15,16,18,19,21,23,24,28,29,30,31,32,39,41,45,51,55,56,57,58,60,65,68,76,79,84,],[-31,-32,-34,-37,-36,-39,-21,-15,-33,-16,-35,-17,-41,-38,-24,-14,57,-20,-23,-19,-40,-43,-48,-22,-42,-44,-18,85,]),'RPAREN':([13,14,15,16,18,19,24,29,32,34,36,40,48,49,53,57,60,63,64,67,72,73,75,78,],[-31,-32,-34,-37,-36,-39,-33,-35,-38,-29,-49,-25,-30,62,65,-40,-48,-51,-27,-25,-50,-26,79,-28,]),'DOCSTRING':([81,],[83,]),'RARROW':([62,63,71,72,],[-49,-51,77,-50,]),'COLON':([25,59,],[42,69,]),'COMMA':([13,14,15,16,18,19,24,29,32,34,48,57,58,60,61,63,64,76,78,],[-31,-32,-34,-37,-36,-39,-33,-35,-38,-29,-30,-40,68,-48,70,72,73,-44,-28,]),'IDENTIFIER':([0,2,3,4,5,6,7,8,13,14,15,16,17,18,19,20,21,22,23,24,28,29,30,32,34,35,36,37,38,39,40,41,42,43,44,47,48,49,51,53,55,56,57,60,62,63,64,65,67,71,72,73,74,75,77,78,79,80,81,82,83,84,85,],[-2,-6,-4,9,-8,11,25,-3,-31,-32,-34,-37,39,-36,-39,-7,-21,25,-15,-33,-16,-35,-17,-38,-29,48,-49,50,52,-24,-25,-14,11,55,52,-5,-30,63,-20,66,-23,-19,-40,-48,-49,-51,-27,-22,-25,63,-50,-26,48,66,-49,-28,-18,63,-10,25,-11,25,-9,]),'DEFINE':([0,2,3,8,13,14,15,16,18,19,24,29,32,34,47,48,57,60,],[4,4,-4,-3,-31,-32,-34,-37,-36,-39,-33,-35,-38,-29,-5,-30,-40,-48,]),'GT':([12,13,14,15,16,18,19,21,24,25,27,29,32,34,39,55,57,60,65,],[38,-31,-32,-34,-37,-36,-39,-21,-33,-30,44,-35,-38,-29,-24,-23,-40,-48,-22,]),'STRING':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,31,32,33,34,35,39,41,45,46,47,48,51,55,56,57,58,60,61,65,68,69,70,74,76,79,81,82,83,84,85,],[-2,-6,-4,-8,18,-3,-31,-32,-34,-37,-36,-39,-7,-21,18,-15,-33,-16,-35,-17,-41,-38,-45,-29,18,-24,-14,59,18,-5,-30,-20,-23,-19,-40,-43,-48,-47,-22,-42,18,-46,18,-44,-18,-10,18,-11,18,-9,]),'RBRACK':([13,14,15,16,18,19,24,29,32,33,46,57,60,61,70,],[-31,-32,-34,-37,-36,-39,-33,-35,-38,-45,60,-40,-48,-47,-46,]),'LPAREN':([10,11,21,39,50,54,55,],[36,-53,40,-24,-52,67,-23,]),'EQ':([9,66,],[35,74,]),'LBRACE':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,32,33,34,35,39,41,46,47,48,51,55,56,57,60,61,63,65,69,70,72,74,77,79,80,81,82,83,84,85,],[-2,-6,-4,-8,31,-3,-31,-32,-34,-37,-36,-39,-7,-21,31,-15,-33,-16,-35,-17,-38,-45,-29,31,-24,-14,31,-5,-30,-20,-23,-19,-40,-48,-47,-51,-22,31,-46,-50,31,-49,-18,81,-10,31,-11,31,-9,]),'FALSE':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,32,33,34,35,39,41,46,47,48,51,55,56,57,60,61,65,69,70,74,79,81,82,83,84,85,],[-2,-6,-4,-8,32,-3,-31,-32,-34,-37,-36,-39,-7,-21,32,-15,-33,-16,-35,-17,-38,-45,-29,32,-24,-14,32,-5,-30,-20,-23,-19,-40,-48,-47,-22,32,-46,32,-18,-10,32,-11,32,-9,]),'COMPONENT':([0,2,3,5,7,8,13,14,15,16,18,19,20,24,29,32,34,47,48,57,60,85,],[-2,6,-4,-8,6,-3,-31,-32,-34,-37,-36,-39,-7,-33,-35,-38,-29,-5,-30,-40,-48,-9,]),'LBRACK':([0,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,28,29,30,32,33,34,35,39,41,46,47,48,51,55,56,57,60,61,65,69,70,74,79,81,82,83,84,85,],[-2,-6,-4,-8,33,-3,-31,-32,-34,-37,-36,-39,-7,-21,33,-15,-33,-16,-35,-17,-38,-45,-29,33,-24,-14,33,-5,-30,-20,-23,-19,-40,-48,-47,-22,33,-46,33,-18,-10,33,-11,33,-9,]),'$end':([0,1,2,3,5,7,8,13,14,15,16,18,19,20,21,22,23,24,26,28,29,30,32,34,39,41,47,48,51,55,56,57,60,65,79,85,],[-2,0,-6,-4,-8,-12,-3,-31,-32,-34,-37,-36,-39,-7,-21,-13,-15,-33,-1,-16,-35,-17,-38,-29,-24,-14,-5,-30,-20,-23,-19,-40,-48,-22,-18,-9,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -16,7 +16,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'constdef':([0,2,],[3,8,]),'qualified_name':([6,41,],[11,52,]),'statement':([9,26,78,80,],[14,42,14,42,]),'value':([9,10,26,46,63,74,78,80,],[13,13,13,58,68,13,13,13,]),'opt_program':([9,],[15,]),'constdefs':([0,],[2,]),'values':([31,],[46,]),'compdef':([2,9,],[7,16,]),'identifiers':([38,59,69,],[48,65,73,]),'compdefs':([2,],[9,]),'dictionary':([9,10,26,46,63,74,78,80,],[19,19,19,19,19,19,19,19,]),'member':([45,],[54,]),'argument':([9,10,26,74,78,80,],[21,35,21,77,21,21,]),'null':([9,10,26,46,63,74,78,80,],[22,22,22,22,22,22,22,22,]),'docstring':([76,],[78,]),'link':([9,26,78,80,],[24,24,24,24,]),'assignment':([9,26,78,80,],[25,25,25,25,]),'script':([0,],[4,]),'program':([9,78,],[26,80,]),'named_args':([61,],[67,]),'port':([9,26,39,44,78,80,],[28,28,49,53,28,28,]),'array':([9,10,26,46,63,74,78,80,],[29,29,29,29,29,29,29,29,]),'members':([30,],[45,]),'named_arg':([67,],[72,]),'bool':([9,10,26,46,63,74,78,80,],[32,32,32,32,32,32,32,32,]),}
+_lr_goto_items = {'argument':([7,22,35,74,82,84,],[12,12,47,78,12,12,]),'dictionary':([7,22,35,46,69,74,82,84,],[13,13,13,13,13,13,13,13,]),'named_arg':([53,75,],[64,64,]),'array':([7,22,35,46,69,74,82,84,],[14,14,14,14,14,14,14,14,]),'null':([7,22,35,46,69,74,82,84,],[15,15,15,15,15,15,15,15,]),'port':([7,22,38,44,82,84,],[21,21,21,21,21,21,]),'compdef':([2,7,],[5,20,]),'script':([0,],[1,]),'compdefs':([2,],[7,]),'member':([45,],[58,]),'program':([7,82,],[22,84,]),'bool':([7,22,35,46,69,74,82,84,],[24,24,24,24,24,24,24,24,]),'statement':([7,22,82,84,],[23,41,23,41,]),'opt_program':([7,],[26,]),'constdef':([0,2,],[3,8,]),'port_ref':([7,22,38,44,82,84,],[27,27,51,56,27,27,]),'qualified_name':([6,42,],[10,54,]),'assignment':([7,22,82,84,],[28,28,28,28,]),'docstring':([81,],[82,]),'link':([7,22,82,84,],[30,30,30,30,]),'named_args':([40,67,],[53,75,]),'members':([31,],[45,]),'constdefs':([0,],[2,]),'identifiers':([36,62,77,],[49,71,80,]),'value':([7,22,35,46,69,74,82,84,],[34,34,34,61,76,34,34,34,]),'values':([33,],[46,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -44,37 +44,39 @@ _lr_productions = [
   ('statement -> assignment','statement',1,'p_statement','parser.py',124),
   ('statement -> link','statement',1,'p_statement','parser.py',125),
   ('assignment -> IDENTIFIER COLON qualified_name LPAREN named_args RPAREN','assignment',6,'p_assignment','parser.py',130),
-  ('link -> port GT port','link',3,'p_link','parser.py',135),
-  ('link -> argument GT port','link',3,'p_link','parser.py',136),
-  ('port -> IDENTIFIER DOT IDENTIFIER','port',3,'p_port','parser.py',150),
-  ('port -> DOT IDENTIFIER','port',2,'p_port','parser.py',151),
-  ('named_args -> <empty>','named_args',0,'p_named_args','parser.py',156),
-  ('named_args -> named_args named_arg COMMA','named_args',3,'p_named_args','parser.py',157),
-  ('named_args -> named_args named_arg','named_args',2,'p_named_args','parser.py',158),
-  ('named_arg -> IDENTIFIER EQ argument','named_arg',3,'p_named_arg','parser.py',166),
-  ('argument -> value','argument',1,'p_argument','parser.py',171),
-  ('argument -> IDENTIFIER','argument',1,'p_argument','parser.py',172),
-  ('value -> dictionary','value',1,'p_value','parser.py',177),
-  ('value -> array','value',1,'p_value','parser.py',178),
-  ('value -> bool','value',1,'p_value','parser.py',179),
-  ('value -> null','value',1,'p_value','parser.py',180),
-  ('value -> NUMBER','value',1,'p_value','parser.py',181),
-  ('value -> STRING','value',1,'p_value','parser.py',182),
-  ('bool -> TRUE','bool',1,'p_bool','parser.py',187),
-  ('bool -> FALSE','bool',1,'p_bool','parser.py',188),
-  ('null -> NULL','null',1,'p_null','parser.py',193),
-  ('dictionary -> LBRACE members RBRACE','dictionary',3,'p_dictionary','parser.py',198),
-  ('members -> <empty>','members',0,'p_members','parser.py',203),
-  ('members -> members member COMMA','members',3,'p_members','parser.py',204),
-  ('members -> members member','members',2,'p_members','parser.py',205),
-  ('member -> STRING COLON value','member',3,'p_member','parser.py',214),
-  ('values -> <empty>','values',0,'p_values','parser.py',219),
-  ('values -> values value COMMA','values',3,'p_values','parser.py',220),
-  ('values -> values value','values',2,'p_values','parser.py',221),
-  ('array -> LBRACK values RBRACK','array',3,'p_array','parser.py',230),
-  ('identifiers -> <empty>','identifiers',0,'p_identifiers','parser.py',243),
-  ('identifiers -> identifiers IDENTIFIER COMMA','identifiers',3,'p_identifiers','parser.py',244),
-  ('identifiers -> identifiers IDENTIFIER','identifiers',2,'p_identifiers','parser.py',245),
-  ('qualified_name -> qualified_name DOT IDENTIFIER','qualified_name',3,'p_qualified_name','parser.py',253),
-  ('qualified_name -> IDENTIFIER','qualified_name',1,'p_qualified_name','parser.py',254),
+  ('link -> port_ref GT port_ref','link',3,'p_link','parser.py',135),
+  ('link -> argument GT port_ref','link',3,'p_link','parser.py',136),
+  ('port_ref -> port','port_ref',1,'p_port_ref','parser.py',154),
+  ('port_ref -> port LPAREN named_args RPAREN','port_ref',4,'p_port_ref','parser.py',155),
+  ('port -> IDENTIFIER DOT IDENTIFIER','port',3,'p_port','parser.py',162),
+  ('port -> DOT IDENTIFIER','port',2,'p_port','parser.py',163),
+  ('named_args -> <empty>','named_args',0,'p_named_args','parser.py',168),
+  ('named_args -> named_args named_arg COMMA','named_args',3,'p_named_args','parser.py',169),
+  ('named_args -> named_args named_arg','named_args',2,'p_named_args','parser.py',170),
+  ('named_arg -> IDENTIFIER EQ argument','named_arg',3,'p_named_arg','parser.py',178),
+  ('argument -> value','argument',1,'p_argument','parser.py',183),
+  ('argument -> IDENTIFIER','argument',1,'p_argument','parser.py',184),
+  ('value -> dictionary','value',1,'p_value','parser.py',189),
+  ('value -> array','value',1,'p_value','parser.py',190),
+  ('value -> bool','value',1,'p_value','parser.py',191),
+  ('value -> null','value',1,'p_value','parser.py',192),
+  ('value -> NUMBER','value',1,'p_value','parser.py',193),
+  ('value -> STRING','value',1,'p_value','parser.py',194),
+  ('bool -> TRUE','bool',1,'p_bool','parser.py',199),
+  ('bool -> FALSE','bool',1,'p_bool','parser.py',200),
+  ('null -> NULL','null',1,'p_null','parser.py',205),
+  ('dictionary -> LBRACE members RBRACE','dictionary',3,'p_dictionary','parser.py',210),
+  ('members -> <empty>','members',0,'p_members','parser.py',215),
+  ('members -> members member COMMA','members',3,'p_members','parser.py',216),
+  ('members -> members member','members',2,'p_members','parser.py',217),
+  ('member -> STRING COLON value','member',3,'p_member','parser.py',226),
+  ('values -> <empty>','values',0,'p_values','parser.py',231),
+  ('values -> values value COMMA','values',3,'p_values','parser.py',232),
+  ('values -> values value','values',2,'p_values','parser.py',233),
+  ('array -> LBRACK values RBRACK','array',3,'p_array','parser.py',242),
+  ('identifiers -> <empty>','identifiers',0,'p_identifiers','parser.py',255),
+  ('identifiers -> identifiers IDENTIFIER COMMA','identifiers',3,'p_identifiers','parser.py',256),
+  ('identifiers -> identifiers IDENTIFIER','identifiers',2,'p_identifiers','parser.py',257),
+  ('qualified_name -> qualified_name DOT IDENTIFIER','qualified_name',3,'p_qualified_name','parser.py',265),
+  ('qualified_name -> IDENTIFIER','qualified_name',1,'p_qualified_name','parser.py',266),
 ]
@@ -15,6 +15,7 @@
 # limitations under the License.
 
 import os
+import copy
 from calvin.utilities.calvin_callback import CalvinCB
 from calvin.utilities import dynops
 from calvin.utilities import calvinlogger
@@ -194,6 +195,7 @@ class AppManager(object):
         except:
             pass
         application.clear_node_info()
+        remote_actor_ids = []
         # Loop over copy of app's actors, since modified inside loop
         for actor_id in application.actors.keys()[:]:
             if actor_id in self._node.am.list_actors():
@@ -203,7 +205,10 @@ class AppManager(object):
                 application.remove_actor(actor_id)
             else:
                 _log.analyze(self._node.id, "+ REMOTE ACTOR", {'actor_id': actor_id})
-                self.storage.get_actor(actor_id, CalvinCB(func=self._destroy_actor_cb, application=application))
+                remote_actor_ids.append(actor_id)
+        if remote_actor_ids:
+            # Locations of all remote actors in one storage operation
+            self.storage.get_many("actor-", remote_actor_ids, CalvinCB(func=self._destroy_actor_cb, application=application))
 
         if not application.actors or application.complete_node_info():
             # Actors list already empty, all actors were local or the storage was calling the cb in-loop
@@ -220,7 +225,8 @@ class AppManager(object):
             if retries<10:
                 # FIXME add backoff time
                 _log.analyze(self._node.id, "+ RETRY", {'actor_id': key, 'value': value, 'retries': retries})
-                self.storage.get_actor(key, CalvinCB(func=self._destroy_actor_cb, application=application, retries=(retries+1)))
+                self.storage.get_actor(key, CalvinCB(func=self._destroy_actor_cb, application=application, retries=(retries+1)),
+                                       bypass_cache=True)
             else:
                 # FIXME report failure
                 _log.analyze(self._node.id, "+ GIVE UP", {'actor_id': key, 'value': value, 'retries': retries})
@@ -615,6 +621,24 @@ class Deployer(object):
         return self.deploy_info['requirements'][name] if (self.deploy_info and 'requirements' in self.deploy_info
                                                             and name in self.deploy_info['requirements']) else []
 
+    def get_port_properties(self):
+        """
+        Port properties from the script, updated with those given in the deploy info, as
+        {<actor_name>: {'in'|'out': {<port_name>: {<property>: <value>}}}}
+        """
+        port_properties = copy.deepcopy(self.deployable.get('port_properties', {}))
+        if self.deploy_info and 'port_properties' in self.deploy_info:
+            for name, port_dirs in self.deploy_info['port_properties'].iteritems():
+                actor_name = self.ns + ':' + name if self.ns else name
+                if actor_name not in self.deployable['actors']:
+                    _log.warning("Port properties given for unknown actor %s" % name)
+                    continue
+                for port_type, ports in port_dirs.iteritems():
+                    for port_name, properties in ports.iteritems():
+                        port_props = port_properties.setdefault(actor_name, {}).setdefault(port_type, {})
+                        port_props.setdefault(port_name, {}).update(properties)
+        return port_properties
+
     def instantiate(self, actor_name, actor_type, argd, signature=None):
         """
         Instantiate an actor.
@@ -834,6 +858,12 @@ class Deployer(object):
                 src_name, src_port = src.split('.')
                 self.set_port_property(src_name, 'out', src_port, 'fanout', len(dst_list))
 
+        for actor_name, port_dirs in self.get_port_properties().iteritems():
+            for port_type, ports in port_dirs.iteritems():
+                for port_name, properties in ports.iteritems():
+                    for port_property, value in properties.iteritems():
+                        self.set_port_property(actor_name, port_type, port_name, port_property, value)
+
         for src, dst_list in self.deployable['connections'].iteritems():
             src_actor, src_port = src.split('.')
             for dst in dst_list:
@@ -17,9 +17,11 @@
 import os
 import glob
 import importlib
+import itertools
 
 from calvin.utilities import calvinuuid
 from calvin.utilities.calvin_callback import CalvinCB
+from calvin.utilities.timingwheel import TimingWheel
 import calvin.requests.calvinresponse as response
 from calvin.runtime.south.plugins.async import async
 from calvin.utilities import calvinlogger
@@ -31,14 +33,18 @@ _conf = calvinconfig.get()
 TRANSPORT_PLUGIN_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), *['south', 'plugins', 'transports'])
 TRANSPORT_PLUGIN_NS = "calvin.runtime.south.plugins.transports"
 
+# Seconds to wait for a reply
+REPLY_TIMEOUT = 10.0
+
 class CalvinLink(object):
     """ CalvinLink class manage one RT to RT link between
         rt_id and peer_id using transport as mechanism.
         transport: a plug-in transport object
         old_link: should be supplied when we replace an existing link, will be closed
+        timeouts: timing wheel for reply timeouts, usually shared by all links of the node
     """
 
-    def __init__(self, rt_id, peer_id, transport, old_link=None):
+    def __init__(self, rt_id, peer_id, transport, old_link=None, timeouts=None):
         super(CalvinLink, self).__init__()
         self.rt_id = rt_id
         self.peer_id = peer_id
@@ -46,7 +52,11 @@ class CalvinLink(object):
         # FIXME replies should also be made independent on the link object,
         # to handle dying transports losing reply callbacks
         self.replies = old_link.replies if old_link else {}
-        self.replies_timeout = old_link.replies_timeout if old_link else {}
+        self.timeouts = old_link.timeouts if old_link else (TimingWheel() if timeouts is None else timeouts)
+        # Message ids are a counter after a prefix unique to the link (and the links replacing it),
+        # a reply from the peer can then not be mistaken for a reply on another link
+        self.msg_prefix = old_link.msg_prefix if old_link else calvinuuid.uuid("MSGID") + "-"
+        self.msg_counter = old_link.msg_counter if old_link else itertools.count()
         if old_link:
             # close old link after a period, since might still receive messages on the transport layer
             # TODO chose the delay based on RTT instead of arbitrary 3 seconds
@@ -57,7 +67,7 @@ class CalvinLink(object):
         """ Gets called when a REPLY messages arrives on this link """
         try:
             # Cancel timeout
-            self.replies_timeout.pop(payload['msg_uuid']).cancel()
+            self.timeouts.cancel(payload['msg_uuid'])
         except:
             # We ignore any errors in cancelling timeout
             pass
@@ -71,11 +81,6 @@ class CalvinLink(object):
 
     def reply_timeout(self, msg_id):
         """ Gets called when a request times out """
-        try:
-            # remove timeout
-            self.replies_timeout.pop(msg_id)
-        except:
-            pass
         try:
             self.replies.pop(msg_id)(response.CalvinResponse(response.GATEWAY_TIMEOUT))
         except:
@@ -86,9 +91,9 @@ class CalvinLink(object):
         """ Adds a message id to the message and send it,
             also registers the callback for the reply.
         """
-        msg_id = calvinuuid.uuid("MSGID")
+        msg_id = self.msg_prefix + str(next(self.msg_counter))
         self.replies[msg_id] = callback
-        self.replies_timeout[msg_id] = async.DelayedCall(10.0, CalvinCB(self.reply_timeout, msg_id))
+        self.timeouts.add(msg_id, REPLY_TIMEOUT, self.reply_timeout)
         msg['msg_uuid'] = msg_id
         self.send(msg)
 
@@ -117,8 +122,9 @@ class CalvinNetwork(object):
 
         The actual join protocol is handled by each transport plugin.
 
-        TODO enable additional links to be established for other purposes
-        than runtime to runtime communication, e.g. direct token transport etc.
+        Besides the runtime to runtime (control) link additional named data links
+        can be established to a peer, e.g. for high volume token transport, these
+        are joined with the link name and only used by tunnels asking for them.
     """
 
     def __init__(self, node):
@@ -127,9 +133,12 @@ class CalvinNetwork(object):
         self.transport_modules = {}  # key module namespace string, value: imported module (must have register function)
         self.transports = {}  # key: URI schema, value: transport factory that handle URI
         self.links = {}  # key peer node id, value: CalvinLink obj
+        self.data_links = {}  # key peer node id, value: dict with key: link name, value: CalvinLink obj
+        self.pending_data_links = {}  # key: (peer node id, link name), value: uri
         self.recv_handler = None
         self.pending_joins = {}  # key: uri, value: list of callbacks or None
         self.pending_joins_by_id = {}  # key: peer id, value: uri
+        self.reply_timeouts = TimingWheel()  # for requests sent on any link
 
     def register_recv(self, recv_handler):
         """ Register THE function that will receive all incomming messages on all links """
@@ -259,6 +268,9 @@ class CalvinNetwork(object):
                     for cb in cbs:
                         cb(status=response.CalvinResponse(response.SERVICE_UNAVAILABLE), uri=uri, peer_node_id=peer_id)
             return
+        if tp_link.get_link_name():
+            self._data_link_joined(tp_link, peer_id, is_orginator)
+            return
         # Only support for one RT to RT communication link per peer
         if peer_id in self.links:
             # Likely simultaneous join requests, use the one requested by the node with highest id
@@ -281,7 +293,7 @@ class CalvinNetwork(object):
         else:
             # No simultaneous join detected, just add the link
             _log.analyze(self.node.id, "+ INSERT", {'uri': uri, 'peer_id': peer_id}, peer_node_id=peer_id, tb=True)
-            self.links[peer_id] = CalvinLink(self.node.id, peer_id, tp_link)
+            self.links[peer_id] = CalvinLink(self.node.id, peer_id, tp_link, timeouts=self.reply_timeouts)
 
         # Find and call any callbacks registered for the uri or peer id
         _log.debug("%s: peer_id: %s, uri: %s\npending_joins_by_id: %s\npending_joins: %s" % (self.node.id, peer_id,
@@ -304,6 +316,67 @@ class CalvinNetwork(object):
 
         return
 
+    def _data_link_joined(self, tp_link, peer_id, is_orginator):
+        """ A data link is joined, simultaneous joins of the same link name are resolved
+            as for the control link, i.e. the one requested by the node with highest id is kept.
+        """
+        name = tp_link.get_link_name()
+        self.pending_data_links.pop((peer_id, name), None)
+        links = self.data_links.setdefault(peer_id, {})
+        if name in links and is_orginator != (self.node.id > peer_id):
+            _log.analyze(self.node.id, "+ DROP DATA LINK", {'name': name}, peer_node_id=peer_id)
+            tp_link.disconnect()
+            return
+        _log.analyze(self.node.id, "+ INSERT DATA LINK", {'name': name}, peer_node_id=peer_id)
+        links[name] = CalvinLink(self.node.id, peer_id, tp_link, links.get(name), timeouts=self.reply_timeouts)
+
+    def data_link_request(self, peer_id, name):
+        """ Request that an additional link named name is established to the peer,
+            for traffic that should not be queued behind the messages on the control link.
+            Users of the data link fall back on the control link until it is established.
+
+            returns: True when the data link already exist, False when it needs to be established
+        """
+        if name in self.data_links.get(peer_id, {}):
+            return True
+        if (peer_id, name) not in self.pending_data_links:
+            self.pending_data_links[(peer_id, name)] = None
+            self.node.storage.get_node(peer_id, CalvinCB(self.data_link_request_finished, name=name))
+        return False
+
+    def data_link_request_finished(self, key, value, name):
+        """ Called by storage when the node is (not) found for a data link request """
+        uri = self.get_supported_uri(value['uri']) if value else None
+        schema = uri.split(":", 1)[0] if uri else None
+        if schema not in self.transports:
+            _log.analyze(self.node.id, "+ NO DATA LINK", {'name': name, 'uri': uri}, peer_node_id=key)
+            self.pending_data_links.pop((key, name), None)
+            return
+        self.pending_data_links[(key, name)] = uri
+        self.transports[schema].join(uri, link_name=name)
+
+    def data_link_get(self, peer_id, name):
+        """ Get a data link by node id and link name """
+        return self.data_links.get(peer_id, {}).get(name, None)
+
+    def data_link_close(self, peer_id, name):
+        """ Close a data link, the peer removes it when its transport is disconnected """
+        link = self.data_links.get(peer_id, {}).pop(name, None)
+        if link:
+            link.close()
+
+    def _data_link_disconnected(self, tp_link, peer_id):
+        name = tp_link.get_link_name()
+        if peer_id is None:
+            # Failed join, the peer id is not known
+            for key, uri in self.pending_data_links.items():
+                if key[1] == name and uri == tp_link.get_uri():
+                    self.pending_data_links.pop(key)
+            return
+        links = self.data_links.get(peer_id, {})
+        if name in links and links[name].transport == tp_link:
+            links.pop(name)
+
     def link_get(self, peer_id):
         """ Get a link by node id """
         return self.links.get(peer_id, None)
@@ -349,6 +422,9 @@ class CalvinNetwork(object):
         return None
 
     def peer_disconnected(self, link, rt_id, reason):
+        if link.get_link_name():
+            self._data_link_disconnected(link, rt_id)
+            return
         _log.analyze(self.node.id, "+", {'reason': reason,
                                          'links_equal': link == self.links[rt_id].transport if rt_id in self.links else "Gone"},
                                          peer_node_id=rt_id)
@@ -362,6 +438,9 @@ class CalvinNetwork(object):
             self.links.pop(peer_id)
         except:
             pass
+        # Data links are not used without the control link
+        for link in self.data_links.pop(peer_id, {}).values():
+            link.close()
 
     def link_check(self, rt_uuid):
         """ Check if we have the link otherwise raise exception """
@@ -370,3 +449,12 @@ class CalvinNetwork(object):
 
     def list_links(self):
         return list(self.links.keys())
+
+    def link_stats(self):
+        """ Transport counters of the control and data links to each peer """
+        stats = {}
+        for peer_id, link in self.links.items():
+            stats[peer_id] = {'link': link.transport.get_stats(),
+                              'data_links': {name: data_link.transport.get_stats()
+                                             for name, data_link in self.data_links.get(peer_id, {}).items()}}
+        return stats
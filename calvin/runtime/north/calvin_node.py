@@ -22,12 +22,15 @@ import logging
 
 from calvin.calvinsys import Sys as CalvinSys
 
+from calvin.actor import actor
 from calvin.runtime.north import actormanager
 from calvin.runtime.north import appmanager
 from calvin.runtime.north import scheduler
 from calvin.runtime.north import storage
 from calvin.runtime.north import calvincontrol
 from calvin.runtime.north import metering
+from calvin.runtime.north import offload
+from calvin.runtime.north import hooks
 from calvin.runtime.north.calvin_network import CalvinNetwork
 from calvin.runtime.north.calvin_proto import CalvinProto
 from calvin.runtime.north.portmanager import PortManager
@@ -74,13 +77,20 @@ class Node(object):
             self.attributes = AttributeResolver(None)
         # Obtain node id, when using security also handle runtime certificate
         self.id = certificate.obtain_cert_node_info(self.attributes.get_node_name_as_str())['id']
+        self.firing_hooks = hooks.get_firing_hooks()
+        actor.attach_debug_hook(self.firing_hooks)
         self.metering = metering.set_metering(metering.Metering(self))
+        self.offload = offload.get_offload()
         self.monitor = Event_Monitor()
         self.am = actormanager.ActorManager(self)
         self.control = calvincontrol.get_calvincontrol()
         
         
-        _scheduler = scheduler.DebugScheduler if _log.getEffectiveLevel() <= logging.DEBUG else scheduler.Scheduler
+        debug = _log.getEffectiveLevel() <= logging.DEBUG
+        if _conf.get(None, 'scheduler') == 'event':
+            _scheduler = scheduler.DebugEventScheduler if debug else scheduler.EventScheduler
+        else:
+            _scheduler = scheduler.DebugScheduler if debug else scheduler.Scheduler
         self.sched = _scheduler(self, self.am, self.monitor)
         self.async_msg_ids = {}
         self._calvinsys = CalvinSys(self)
@@ -99,7 +109,7 @@ class Node(object):
         async.DelayedCall(0, self.start)
 
     def insert_local_reply(self):
-        msg_id = calvinuuid.uuid("LMSG")
+        msg_id = calvinuuid.transient_id("LMSG")
         self.async_msg_ids[msg_id] = None
         return msg_id
 
@@ -209,6 +219,7 @@ class Node(object):
             _log.debug(args)
             self.sched.stop()
             _log.analyze(self.id, "+ SCHED STOPPED", {'args': args})
+            self.offload.stop()
             self.control.stop()
             _log.analyze(self.id, "+ CONTROL STOPPED", {'args': args})
 
@@ -28,16 +28,19 @@ class CalvinTunnel(object):
 
     STATUS = enum('PENDING', 'WORKING', 'TERMINATED')
 
-    def __init__(self, links, tunnels, peer_node_id, tunnel_type, policy, rt_id=None, id=None):
+    def __init__(self, links, tunnels, peer_node_id, tunnel_type, policy, rt_id=None, id=None, data_links=None):
         """ links: the calvin networks dictionary of links
             peer_node_id: the id of the peer that we use
             tunnel_type: what is the usage of the tunnel
-            policy: TODO not used currently
+            policy: dict of options proposed by the requester, the responder's tunnel handler may change it
+                    to the options it accepts, which are sent back and replace the requester's policy
             id: Tunnel objects on both nodes will use the same id number hence only supply if provided from other side
+            data_links: the calvin networks dictionary of named data links per peer
         """
         super(CalvinTunnel, self).__init__()
         # The tunnel only use one link (links[peer_node_id]) at a time but it can switch at any point
         self.links = links
+        self.data_links = data_links if data_links is not None else {}
         self.tunnels = tunnels
         self.peer_node_id = peer_node_id
         self.tunnel_type = tunnel_type
@@ -85,6 +88,8 @@ class CalvinTunnel(object):
         if reply and reply.data['tunnel_id'] != self.id:
             self._update_id(reply.data['tunnel_id'])
         if reply:
+            # The options accepted by the peer, an older peer accepts none
+            self.policy = reply.data.get('policy', {})
             self.status = CalvinTunnel.STATUS.WORKING
             if self.up_handler:
                 self.up_handler()
@@ -99,19 +104,26 @@ class CalvinTunnel(object):
         if not reply:
             _log.error("Got none ack on destruction of tunnel!\n%s" % reply)
 
-    def send(self, payload):
+    def send(self, payload, link=None):
         """ Send a payload over the tunnel
             payload must be serializable, i.e. only built-in types such as:
             dict, list, tuple, string, numbers, booleans, etc
+            link: name of a data link to the peer to send it on, when
+                  not (yet) established the control link is used
         """
         msg = {'cmd': 'TUNNEL_DATA', 'value': payload, 'tunnel_id': self.id}
         try:
-            self.links[self.peer_node_id].send(msg)
+            data_link = self.data_links.get(self.peer_node_id, {}).get(link) if link else None
+            (data_link or self.links[self.peer_node_id]).send(msg)
         except:
             # FIXME we failed sending should resend after establishing the link if our node is not quiting
             # so far only seen during node quit
             _log.analyze(self.rt_id, "+ TUNNEL FAILED", payload, peer_node_id=self.peer_node_id)
 
+    def on_link(self, link):
+        """ Returns the tunnel sending on the data link named link, or the tunnel itself when link is None """
+        return CalvinTunnelLink(self, link) if link else self
+
     def register_recv(self, handler):
         """ Register the handler of incoming messages on this tunnel """
         self.recv_handler = handler
@@ -136,6 +148,23 @@ class CalvinTunnel(object):
             #FIXME use the tunnel_destroy cmd directly instead
             raise NotImplementedError()
 
+class CalvinTunnelLink(object):
+    """A tunnel that sends on a named data link, e.g. for a port connection with a dedicated link.
+       Everything else is handled by the tunnel.
+    """
+
+    def __init__(self, tunnel, link):
+        super(CalvinTunnelLink, self).__init__()
+        self.tunnel = tunnel
+        self.link = link
+
+    def send(self, payload):
+        self.tunnel.send(payload, link=self.link)
+
+    def __getattr__(self, name):
+        return getattr(self.tunnel, name)
+
+
 class CalvinProto(CalvinCBClass):
     """ CalvinProto class is the interface between runtimes for all runtime
         subsystem that need to interact. It uses the links in network.
@@ -183,8 +212,16 @@ class CalvinProto(CalvinCBClass):
         self.network.links[payload['from_rt_uuid']].reply_handler(payload)
 
     def recv_handler(self, tp_link, payload):
-        """ Called by transport when a full payload has been received
+        """ Called by transport when a full payload has been received,
+            a list of payloads when the transport coalesced several messages.
         """
+        if isinstance(payload, list):
+            for p in payload:
+                try:
+                    self.recv_handler(tp_link, p)
+                except:
+                    _log.exception("Failed handling coalesced message")
+            return
         _log.analyze(self.rt_id, "RECV", payload)
         try:
             self.network.link_check(payload['from_rt_uuid'])
@@ -336,7 +373,7 @@ class CalvinProto(CalvinCBClass):
         except:
             # Need to join the other peer first
             # Create a tunnel object which is not inserted on a link yet
-            tunnel = CalvinTunnel(self.network.links, self.tunnels, None, tunnel_type, policy, rt_id=self.node.id)
+            tunnel = CalvinTunnel(self.network.links, self.tunnels, None, tunnel_type, policy, rt_id=self.node.id, data_links=self.network.data_links)
             self.network.link_request(to_rt_uuid, CalvinCB(self._tunnel_link_request_finished, tunnel=tunnel, to_rt_uuid=to_rt_uuid, tunnel_type=tunnel_type, policy=policy))
             return tunnel
 
@@ -346,7 +383,7 @@ class CalvinProto(CalvinCBClass):
             return tunnel
 
         # Create new tunnel and send request to peer
-        tunnel = CalvinTunnel(self.network.links, self.tunnels, to_rt_uuid, tunnel_type, policy, rt_id=self.node.id)
+        tunnel = CalvinTunnel(self.network.links, self.tunnels, to_rt_uuid, tunnel_type, policy, rt_id=self.node.id, data_links=self.network.data_links)
         self._tunnel_new_msg(tunnel, to_rt_uuid, tunnel_type, policy)
         return tunnel
 
@@ -409,15 +446,16 @@ class CalvinProto(CalvinCBClass):
             return
         else:
             # No simultaneous tunnel requests, lets create it...
-            tunnel = CalvinTunnel(self.network.links, self.tunnels, payload['from_rt_uuid'], payload['type'], payload['policy'], rt_id=self.node.id, id=payload['tunnel_id'])
+            tunnel = CalvinTunnel(self.network.links, self.tunnels, payload['from_rt_uuid'], payload['type'], payload['policy'], rt_id=self.node.id, id=payload['tunnel_id'], data_links=self.network.data_links)
             _log.analyze(self.rt_id, "+ NO SMASH", payload, peer_node_id=payload['from_rt_uuid'])
             try:
                 # ... and see if the handler wants it
                 ok = self.tunnel_handlers[payload['type']](tunnel)
             except:
                 pass
-        # Send the response
-        msg = {'cmd': 'REPLY', 'msg_uuid': payload['msg_uuid'], 'value': response.CalvinResponse(ok, data={'tunnel_id': tunnel.id}).encode()}
+        # Send the response, with the policy accepted by the handler
+        msg = {'cmd': 'REPLY', 'msg_uuid': payload['msg_uuid'],
+               'value': response.CalvinResponse(ok, data={'tunnel_id': tunnel.id, 'policy': tunnel.policy}).encode()}
         self.network.links[payload['from_rt_uuid']].send(msg)
 
         # If handler did not want it close it again
@@ -478,12 +516,16 @@ class CalvinProto(CalvinCBClass):
 
     #### PORTS ####
 
-    def port_connect(self, callback=None, port_id=None, peer_node_id=None, peer_port_id=None, peer_actor_id=None, peer_port_name=None, peer_port_dir=None, tunnel=None):
+    def port_connect(self, callback=None, port_id=None, peer_node_id=None, peer_port_id=None, peer_actor_id=None, peer_port_name=None, peer_port_dir=None, tunnel=None, link=None):
         """ Before calling this method all needed information and when requested a tunnel must be available
             see port manager for parameters
+            link: optional name of the data link the connection's tokens should use
         """
         if tunnel:
-            msg = {'cmd': 'PORT_CONNECT', 'port_id': port_id, 'peer_actor_id': peer_actor_id, 'peer_port_name': peer_port_name, 'peer_port_id': peer_port_id, 'peer_port_dir': peer_port_dir, 'tunnel_id':tunnel.id}
+            msg = {'cmd': 'PORT_CONNECT', 'port_id': port_id, 'peer_actor_id': peer_actor_id, 'peer_port_name': peer_port_name, 'peer_port_id': peer_port_id, 'peer_port_dir': peer_port_dir, 'tunnel_id':tunnel.id,
+                   'batch_tokens': True, 'chunked_tokens': True}
+            if link:
+                msg['link'] = link
             self.network.links[peer_node_id].send_with_reply(callback, msg)
         else:
             raise NotImplementedError()
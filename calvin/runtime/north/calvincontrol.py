@@ -21,6 +21,8 @@ from random import randint
 from calvin.Tools import cscompiler as compiler
 from calvin.runtime.north.appmanager import Deployer
 from calvin.runtime.north import metering
+from calvin.runtime.north import offload
+from calvin.runtime.north import hooks
 from calvin.utilities.calvinlogger import get_logger
 from calvin.utilities.calvin_callback import CalvinCB
 from calvin.runtime.south.plugins.async import server_connection, async
@@ -121,6 +123,38 @@ control_api_doc += \
 """
 re_get_nodes = re.compile(r"GET /nodes\sHTTP/1")
 
+control_api_doc += \
+    """
+    GET /links
+    Transport counters of the links to the nodes known to self, bytes of frames
+    before (sent_bytes, received_bytes) and after compression (sent_wire_bytes, received_wire_bytes)
+    Response status code: OK
+    Response:
+    {
+        <peer-node-id>: {
+            "link": {"sent_bytes": <bytes>, "sent_wire_bytes": <bytes>, "compressed_frames": <frames>, ...},
+            "data_links": {<link name>: {...}, ...}
+        },
+        ...
+    }
+"""
+re_get_links = re.compile(r"GET /links\sHTTP/1")
+
+control_api_doc += \
+    """
+    GET /offload
+    Counters of the pools running actions declared with @condition(offload='thread' or 'process'),
+    running and queued actions, and the share of the workers' time spent in actions (utilization)
+    Response status code: OK
+    Response:
+    {
+        "thread": {"workers": <n>, "submitted": <n>, "completed": <n>, "failed": <n>,
+                   "running": <n>, "queue_depth": <n>, "utilization": <0.0-1.0>},
+        "process": {...}
+    }
+"""
+re_get_offload = re.compile(r"GET /offload\sHTTP/1")
+
 control_api_doc += \
     """
     GET /node/{node-id}
@@ -308,7 +342,8 @@ control_api_doc += \
     """
     POST /set_port_property
     Sets a property of the port.
-    Currently only fanout on outports is supported.
+    Supported are fanout on outports, and fifo_size and fifo_max_size
+    (token queue size and the size it may grow to when filling up) on any port.
     Body:
     {
         "actor_id" : <actor-id>,
@@ -317,7 +352,7 @@ control_api_doc += \
         "port_property": <property-name>
         "value" : <property value>
     }
-    Response status code: OK or NOT_FOUND
+    Response status code: OK, BAD_REQUEST or NOT_FOUND
     Response: none
 """
 re_set_port_property = re.compile(r"POST /set_port_property\sHTTP/1")
@@ -591,6 +626,22 @@ control_api_doc += \
 """
 re_post_storage = re.compile(r"POST /storage/([0-9a-zA-Z\.\-/_]*)\sHTTP/1")
 
+control_api_doc += \
+    """
+    GET /storage_cache
+    Counters of the storage read cache, of the cache of a proxy client (with storage_proxy_cache_size set)
+    and, as proxy master, the keys cached by proxy clients and the invalidations sent to them
+    Response status code: OK
+    Response:
+    {
+        "read": {"size": <n>, "max_size": <n>, "hits": <n>, "misses": <n>, "evictions": <n>,
+                 "hit_rate": <0.0-1.0>},
+        "proxy": {...},  (only on proxy clients)
+        "proxy_master": {"keys": <n>, "invalidations": <n>}
+    }
+"""
+re_get_storage_cache = re.compile(r"GET /storage_cache\sHTTP/1")
+
 control_api_doc += \
     """
     OPTIONS /url
@@ -662,6 +713,8 @@ class CalvinControl(object):
             (re_get_log, self.handle_get_log),
             (re_get_node_id, self.handle_get_node_id),
             (re_get_nodes, self.handle_get_nodes),
+            (re_get_links, self.handle_get_links),
+            (re_get_offload, self.handle_get_offload),
             (re_get_node, self.handle_get_node),
             (re_post_peer_setup, self.handle_peer_setup),
             (re_get_applications, self.handle_get_applications),
@@ -692,6 +745,7 @@ class CalvinControl(object):
             (re_get_index, self.handle_get_index),
             (re_get_storage, self.handle_get_storage),
             (re_post_storage, self.handle_post_storage),
+            (re_get_storage_cache, self.handle_get_storage_cache),
             (re_options, self.handle_options)
         ]
 
@@ -731,6 +785,21 @@ class CalvinControl(object):
         for user_id, logger in self.loggers:
             if logger.handle == handle:
                 del self.loggers[user_id]
+        self.update_firing_hook()
+
+    def update_firing_hook(self):
+        """ Only hook into actor firing while some logger wants firing events
+        """
+        if any(not logger.events or self.LOG_ACTOR_FIRING in logger.events for logger in self.loggers.itervalues()):
+            hooks.get_firing_hooks().attach(self.actor_fired)
+        else:
+            hooks.get_firing_hooks().detach(self.actor_fired)
+
+    def actor_fired(self, actor, action_name, action_result):
+        """ Firing hook
+        """
+        self.log_actor_firing(actor.id, action_name, action_result.tokens_produced,
+                              action_result.tokens_consumed, action_result.production)
 
     def handle_request(self, actor_ids=None):
         """ Handle incoming requests on socket
@@ -843,6 +912,7 @@ class CalvinControl(object):
                         break
             if status == calvinresponse.OK:
                 self.loggers[user_id] = Logger(actors=actors, events=events)
+                self.update_firing_hook()
         else:
             status = calvinresponse.BAD_REQUEST
 
@@ -856,6 +926,7 @@ class CalvinControl(object):
         """
         if match.group(1) in self.loggers:
             del self.loggers[match.group(1)]
+            self.update_firing_hook()
             status = calvinresponse.OK
         else:
             status = calvinresponse.NOT_FOUND
@@ -892,6 +963,16 @@ class CalvinControl(object):
         """
         self.send_response(handle, connection, json.dumps(self.node.network.list_links()))
 
+    def handle_get_links(self, handle, connection, match, data, hdr):
+        """ Get transport counters of links
+        """
+        self.send_response(handle, connection, json.dumps(self.node.network.link_stats()))
+
+    def handle_get_offload(self, handle, connection, match, data, hdr):
+        """ Get counters of the offload pools
+        """
+        self.send_response(handle, connection, json.dumps(offload.get_offload().get_stats()))
+
     def handle_get_node(self, handle, connection, match, data, hdr):
         """ Get node information from id
         """
@@ -1054,13 +1135,13 @@ class CalvinControl(object):
 
     def handle_set_port_property(self, handle, connection, match, data, hdr):
         try:
-            self.node.am.set_port_property(
+            result = self.node.am.set_port_property(
                 actor_id=data["actor_id"],
                 port_type=data["port_type"],
                 port_name=data["port_name"],
                 port_property=data["port_property"],
                 value=data["value"])
-            status = calvinresponse.OK
+            status = calvinresponse.OK if result == 'OK' else calvinresponse.BAD_REQUEST
         except:
             status = calvinresponse.NOT_FOUND
         self.send_response(handle, connection, None, status=status)
@@ -1254,6 +1335,11 @@ class CalvinControl(object):
         """
         self.node.storage.get("", match.group(1), cb=CalvinCB(self.get_index_cb, handle, connection))
 
+    def handle_get_storage_cache(self, handle, connection, match, data, hdr):
+        """ Get counters of the storage caches
+        """
+        self.send_response(handle, connection, json.dumps(self.node.storage.cache_stats()))
+
     def log_actor_firing(self, actor_id, action_method, tokens_produced, tokens_consumed, production):
         """ Trace actor firing
         """
@@ -1281,6 +1367,8 @@ class CalvinControl(object):
                         self.tunnel_client.send(msg)
         for user_id in disconnected:
             del self.loggers[user_id]
+        if disconnected:
+            self.update_firing_hook()
 
     def log_actor_new(self, actor_id, actor_name, actor_type, is_shadow):
         """ Trace actor new
@@ -1307,6 +1395,8 @@ class CalvinControl(object):
                         self.tunnel_client.send(msg)
         for user_id in disconnected:
             del self.loggers[user_id]
+        if disconnected:
+            self.update_firing_hook()
 
     def log_actor_destroy(self, actor_id):
         """ Trace actor destroy
@@ -1330,6 +1420,8 @@ class CalvinControl(object):
                         self.tunnel_client.send(msg)
         for user_id in disconnected:
             del self.loggers[user_id]
+        if disconnected:
+            self.update_firing_hook()
 
     def log_actor_migrate(self, actor_id, dest_node_id):
         """ Trace actor migrate
@@ -1354,6 +1446,8 @@ class CalvinControl(object):
                         self.tunnel_client.send(msg)
         for user_id in disconnected:
             del self.loggers[user_id]
+        if disconnected:
+            self.update_firing_hook()
 
     def log_application_new(self, application_id, application_name):
         """ Trace application new
@@ -1377,6 +1471,8 @@ class CalvinControl(object):
                     self.tunnel_client.send(msg)
         for user_id in disconnected:
             del self.loggers[user_id]
+        if disconnected:
+            self.update_firing_hook()
 
     def log_application_destroy(self, application_id):
         """ Trace application destroy
@@ -1399,6 +1495,8 @@ class CalvinControl(object):
                     self.tunnel_client.send(msg)
         for user_id in disconnected:
             del self.loggers[user_id]
+        if disconnected:
+            self.update_firing_hook()
 
     def handle_options(self, handle, connection, match, data, hdr):
         """ Handle HTTP OPTIONS requests
@@ -1507,7 +1605,7 @@ class CalvinControlTunnel(object):
         """
         if self.server.pending_connections:
             addr, conn = self.server.accept()
-            msg_id = calvinuuid.uuid("MSGID")
+            msg_id = calvinuuid.transient_id("MSGID")
             self.connections[msg_id] = conn
             _log.debug("New connection msg_id: %s" % msg_id)
 
@@ -14,7 +14,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
 from calvin_token import Token
+from calvin.utilities import calvinconfig
+
+_conf = calvinconfig.get()
+
+# Number of times a FIFO must fill up before it is grown (if allowed by its max length)
+GROW_AFTER_FILLS = 3
+# Seconds within which the fills must happen, fills further apart are light traffic
+GROW_FILLS_WINDOW = 1.0
+
+
+def _relayout(tokens, N, first, last, length):
+    """Place the tokens at positions first..last-1 of a ring with N entries in a new ring with length entries"""
+    ring = [Token(0)] * length
+    for pos in xrange(first, last):
+        ring[pos % length] = tokens[pos % N]
+    return ring
 
 
 class FIFO(object):
@@ -23,16 +41,22 @@ class FIFO(object):
     A FIFO for Calvin
     Parameters:
         length is the number of entries in the FIFO
+        max_length is the number of entries the FIFO may grow to when it
+            fills up GROW_AFTER_FILLS times within GROW_FILLS_WINDOW seconds,
+            by default it does not grow
         readers is a set of actors reading from the FIFO
     """
 
     # FIXME: (MAJOR) Readers must be UUIDs instead of sockets or we can't
     # migrate
 
-    def __init__(self, length):
+    def __init__(self, length, max_length=None):
         super(FIFO, self).__init__()
         self.fifo = [Token(0)] * length
         self.N = length
+        self.max_N = max(length, max_length or 0)
+        self.fill_count = 0
+        self.fill_window_start = 0.0
         self.readers = set()
         # NOTE: For simplicity, modulo operation is only used in fifo access,
         #       all read and write positions are monotonousy increasing
@@ -50,6 +74,7 @@ class FIFO(object):
         state = {
             'fifo': [t.encode() for t in self.fifo],
             'N': self.N,
+            'max_N': self.max_N,
             'readers': list(self.readers),
             'write_pos': self.write_pos,
             'read_pos': self.read_pos,
@@ -60,6 +85,8 @@ class FIFO(object):
     def _set_state(self, state):
         self.fifo = [Token.decode(d) for d in state['fifo']]
         self.N = state['N']
+        self.max_N = state.get('max_N', max(self.max_N, self.N))
+        self.fill_count = 0
         self.readers = set(state['readers'])
         self.write_pos = state['write_pos']
         self.read_pos = state['read_pos']
@@ -91,6 +118,32 @@ class FIFO(object):
         write_pos = self.write_pos
         self.fifo[write_pos % self.N] = data
         self.write_pos = write_pos + 1
+        if self.N < self.max_N and not self.can_write():
+            self._filled()
+        return True
+
+    def _filled(self):
+        # Double the size when the FIFO keeps filling up
+        now = time.time()
+        if now - self.fill_window_start > GROW_FILLS_WINDOW:
+            self.fill_count = 0
+            self.fill_window_start = now
+        self.fill_count += 1
+        if self.fill_count >= GROW_AFTER_FILLS:
+            self.resize(min(2 * self.N, self.max_N))
+
+    def resize(self, length):
+        """
+        Change the number of entries, keeping any queued tokens.
+        Returns False if the tokens would not fit.
+        """
+        first = min(self.read_pos.values() or [self.write_pos])
+        if length < 2 or self.write_pos - first >= length:
+            return False
+        self.fifo = _relayout(self.fifo, self.N, first, self.write_pos, length)
+        self.N = length
+        self.max_N = max(self.max_N, length)
+        self.fill_count = 0
         return True
 
     def available_slots(self):
@@ -143,3 +196,258 @@ class FIFO(object):
                 self.read_pos[reader] += 1
             else:
                 self.tentative_read_pos[reader] -= 1
+
+
+class _ReaderPositions(object):
+
+    """
+    Dict-like view of one of the read position lists in a CompactFIFO,
+    so that code indexing read_pos/tentative_read_pos by reader keeps working.
+    """
+
+    __slots__ = ('_fifo', '_tentative')
+
+    def __init__(self, fifo, tentative):
+        self._fifo = fifo
+        self._tentative = tentative
+
+    def _positions(self):
+        return self._fifo._tentative_read_pos if self._tentative else self._fifo._read_pos
+
+    def __getitem__(self, reader):
+        return self._positions()[self._fifo._reader_index[reader]]
+
+    def __setitem__(self, reader, pos):
+        self._fifo._set_pos(reader, pos, self._tentative)
+
+    def __contains__(self, reader):
+        return reader in self._fifo._reader_index
+
+    def __iter__(self):
+        return iter(self._fifo._reader_index)
+
+    def __len__(self):
+        return len(self._fifo._reader_index)
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __str__(self):
+        return str(dict(self.items()))
+
+    __repr__ = __str__
+
+    def keys(self):
+        return self._fifo._reader_index.keys()
+
+    def values(self):
+        return list(self._positions())
+
+    def items(self):
+        positions = self._positions()
+        return [(reader, positions[i]) for reader, i in self._fifo._reader_index.iteritems()]
+
+
+class CompactFIFO(object):
+
+    """
+    A FIFO for Calvin with the same API and state format as FIFO, but
+    with a preallocated ring, read positions kept in small lists indexed
+    per reader, and the slowest reader's position updated when it changes
+    instead of being computed on every call.
+    Parameters:
+        length is the number of entries in the FIFO
+        max_length is the number of entries the FIFO may grow to, see FIFO
+    """
+
+    __slots__ = ('fifo', 'N', 'max_N', 'fill_count', 'fill_window_start', 'readers', 'write_pos', '_reader_index',
+                 '_read_pos', '_tentative_read_pos', '_min_read_pos', 'read_pos', 'tentative_read_pos')
+
+    def __init__(self, length, max_length=None):
+        super(CompactFIFO, self).__init__()
+        self.fifo = [Token(0)] * length
+        self.N = length
+        self.max_N = max(length, max_length or 0)
+        self.fill_count = 0
+        self.fill_window_start = 0.0
+        self.readers = set()
+        # NOTE: For simplicity, modulo operation is only used in fifo access,
+        #       all read and write positions are monotonousy increasing
+        self.write_pos = 0
+        self._reader_index = {}  # key: reader, value: index in the position lists
+        self._read_pos = []
+        self._tentative_read_pos = []
+        self._min_read_pos = 0
+        self.read_pos = _ReaderPositions(self, False)
+        self.tentative_read_pos = _ReaderPositions(self, True)
+
+    def __len__(self):
+        return self.write_pos - self._min_read_pos
+
+    def __str__(self):
+        return "Tokens: %s, w:%i, r:%s, tr:%s" % (self.fifo, self.write_pos, self.read_pos, self.tentative_read_pos)
+
+    def _update_min_read_pos(self):
+        self._min_read_pos = min(self._read_pos) if self._read_pos else 0
+
+    def _set_pos(self, reader, pos, tentative):
+        i = self._reader_index[reader]
+        if tentative:
+            self._tentative_read_pos[i] = pos
+        else:
+            old_pos = self._read_pos[i]
+            self._read_pos[i] = pos
+            if old_pos == self._min_read_pos or pos < self._min_read_pos:
+                self._update_min_read_pos()
+
+    def _state(self):
+        state = {
+            'fifo': [t.encode() for t in self.fifo],
+            'N': self.N,
+            'max_N': self.max_N,
+            'readers': list(self.readers),
+            'write_pos': self.write_pos,
+            'read_pos': dict(self.read_pos.items()),
+            'tentative_read_pos': dict(self.tentative_read_pos.items())
+        }
+        return state
+
+    def _set_state(self, state):
+        self.fifo = [Token.decode(d) for d in state['fifo']]
+        self.N = state['N']
+        self.max_N = state.get('max_N', max(self.max_N, self.N))
+        self.fill_count = 0
+        self.readers = set(state['readers'])
+        self.write_pos = state['write_pos']
+        read_pos = state['read_pos']
+        tentative_read_pos = state['tentative_read_pos']
+        self._reader_index = {}
+        self._read_pos = []
+        self._tentative_read_pos = []
+        for reader in read_pos:
+            self._reader_index[reader] = len(self._read_pos)
+            self._read_pos.append(read_pos[reader])
+            self._tentative_read_pos.append(tentative_read_pos[reader])
+        self._update_min_read_pos()
+
+    def add_reader(self, reader):
+        if not isinstance(reader, basestring):
+            raise Exception('Not a string: %s' % reader)
+        if reader not in self.readers:
+            self._reader_index[reader] = len(self._read_pos)
+            self._read_pos.append(0)
+            self._tentative_read_pos.append(0)
+            self.readers.add(reader)
+            self._update_min_read_pos()
+
+    def remove_reader(self, reader):
+        if not isinstance(reader, basestring):
+            raise Exception('Not a string: %s' % reader)
+        i = self._reader_index.pop(reader)
+        del self._read_pos[i]
+        del self._tentative_read_pos[i]
+        for r, j in self._reader_index.iteritems():
+            if j > i:
+                self._reader_index[r] = j - 1
+        self.readers.discard(reader)
+        self._update_min_read_pos()
+
+    def can_write(self):
+        # See if there is space to write data
+        return not (self.write_pos + 1) % self.N == self._min_read_pos % self.N
+
+    def write(self, data):
+        write_pos = self.write_pos
+        if (write_pos + 1) % self.N == self._min_read_pos % self.N:
+            return False
+        self.fifo[write_pos % self.N] = data
+        self.write_pos = write_pos + 1
+        if self.N < self.max_N and (write_pos + 2) % self.N == self._min_read_pos % self.N:
+            self._filled()
+        return True
+
+    def _filled(self):
+        # Double the size when the FIFO keeps filling up
+        now = time.time()
+        if now - self.fill_window_start > GROW_FILLS_WINDOW:
+            self.fill_count = 0
+            self.fill_window_start = now
+        self.fill_count += 1
+        if self.fill_count >= GROW_AFTER_FILLS:
+            self.resize(min(2 * self.N, self.max_N))
+
+    def resize(self, length):
+        """
+        Change the number of entries, keeping any queued tokens.
+        Returns False if the tokens would not fit.
+        """
+        first = self._min_read_pos if self._read_pos else self.write_pos
+        if length < 2 or self.write_pos - first >= length:
+            return False
+        self.fifo = _relayout(self.fifo, self.N, first, self.write_pos, length)
+        self.N = length
+        self.max_N = max(self.max_N, length)
+        self.fill_count = 0
+        return True
+
+    def available_slots(self):
+        # See if there is space to write data
+        return self.N - ((self.write_pos - self._min_read_pos) % self.N) - 1
+
+    def _index(self, reader):
+        try:
+            return self._reader_index[reader]
+        except KeyError:
+            raise Exception("Unknown reader: '%s'" % reader)
+
+    def available_tokens(self, reader):
+        return self.write_pos - self._tentative_read_pos[self._index(reader)]
+
+    #
+    # Reading is now done tentatively until committed
+    #
+    def can_read(self, reader):
+        return not self._tentative_read_pos[self._index(reader)] == self.write_pos
+
+    def read(self, reader):
+        i = self._index(reader)
+        read_pos = self._tentative_read_pos[i]
+        if read_pos == self.write_pos:
+            return None
+        self._tentative_read_pos[i] = read_pos + 1
+        return self.fifo[read_pos % self.N]
+
+    # Commit is always required after reads.
+    def commit_reads(self, reader, commit=True):
+        i = self._reader_index[reader]
+        if commit:
+            old_pos = self._read_pos[i]
+            self._read_pos[i] = self._tentative_read_pos[i]
+            if old_pos == self._min_read_pos or self._read_pos[i] < self._min_read_pos:
+                self._update_min_read_pos()
+        else:
+            self._tentative_read_pos[i] = self._read_pos[i]
+
+    def rollback_reads(self, reader):
+        self.commit_reads(reader, False)
+
+    def commit_one_read(self, reader, commit=True):
+        i = self._reader_index[reader]
+        if self._read_pos[i] < self._tentative_read_pos[i]:
+            if commit:
+                old_pos = self._read_pos[i]
+                self._read_pos[i] = old_pos + 1
+                if old_pos == self._min_read_pos:
+                    self._update_min_read_pos()
+            else:
+                self._tentative_read_pos[i] -= 1
+
+
+def new_fifo(length, max_length=None):
+    """ Create a FIFO of the kind selected by the 'fifo' option (default or compact) """
+    if _conf.get(None, 'fifo') == 'compact':
+        return CompactFIFO(length, max_length)
+    return FIFO(length, max_length)
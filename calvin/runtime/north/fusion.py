@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from calvin.actor.actor import ActionResult
+from calvin.runtime.north.calvin_token import Token, ExceptionToken
+from calvin.runtime.south.endpoint import LocalInEndpoint, LocalOutEndpoint
+from calvin.utilities.calvinlogger import get_logger
+
+_log = get_logger(__name__)
+
+
+def _fusable(actor):
+    if not actor.fusable or not actor.enabled() or len(actor.inports) != 1 or len(actor.outports) != 1:
+        return False
+    if len(actor.action_priority) != 1:
+        return False
+    action = actor.action_priority[0]
+    return (hasattr(action, 'action_method') and
+            [n for _, n in action.action_input] == [1] and [n for _, n in action.action_output] == [1])
+
+
+def _inport(actor):
+    return actor.inports.values()[0]
+
+
+def _outport(actor):
+    return actor.outports.values()[0]
+
+
+def _upstream(actor):
+    """ The actor connected locally, and only, to the inport of actor """
+    ep = _inport(actor).endpoint
+    if not isinstance(ep, LocalInEndpoint):
+        return None
+    peer = ep.peer_port.owner
+    if len(peer.outports) != 1 or _downstream(peer) is not actor:
+        return None
+    return peer
+
+
+def _downstream(actor):
+    """ The actor connected locally, and only, to the outport of actor """
+    endpoints = _outport(actor).endpoints
+    if len(endpoints) != 1 or not isinstance(endpoints[0], LocalOutEndpoint):
+        return None
+    peer_port = endpoints[0].peer_port
+    peer = peer_port.owner
+    if len(peer.inports) != 1 or not isinstance(peer_port.endpoint, LocalInEndpoint) or \
+            peer_port.endpoint.peer_port is not _outport(actor):
+        return None
+    return peer
+
+
+def fuse_around(actor):
+    """ Fuse the longest local chain of fusable actors through actor, replacing chains it overlaps """
+    if not _fusable(actor):
+        return None
+    actors = [actor]
+    while True:
+        peer = _upstream(actors[0])
+        if peer is None or peer in actors or not _fusable(peer):
+            break
+        actors.insert(0, peer)
+    while True:
+        peer = _downstream(actors[-1])
+        if peer is None or peer in actors or not _fusable(peer):
+            break
+        actors.append(peer)
+    for member in actors:
+        if member._fused_chain is not None:
+            member._fused_chain.unfuse()
+    if len(actors) < 2:
+        return None
+    return FusedChain(actors)
+
+
+class FusedChain(object):
+    """
+    A local chain of fusable actors fired as one unit by its head actor.
+
+    Tokens are read from the inport of the head, passed through the actions of all members and
+    written to the outport of the last member. The members keep their ports, state and status,
+    and fire by themselves when tokens are waiting in between, e.g. from before the fusion.
+    """
+
+    def __init__(self, actors):
+        super(FusedChain, self).__init__()
+        self.actors = actors
+        self.head = actors[0]
+        self.inports = [_inport(a) for a in actors]
+        self.outport = _outport(actors[-1])
+        self.actions = [(a, a.action_priority[0]) for a in actors]
+        for member in actors:
+            member._fused_chain = self
+        _log.debug("Fused actors %s" % [a.id for a in actors])
+
+    def unfuse(self):
+        for member in self.actors:
+            if member._fused_chain is self:
+                member._fused_chain = None
+        _log.debug("Unfused actors %s" % [a.id for a in self.actors])
+
+    def _not_fired(self):
+        self.inports[0].peek_rewind()
+        return ActionResult(did_fire=False)
+
+    def fire(self):
+        for member in self.actors:
+            if not member.enabled():
+                return ActionResult(did_fire=False)
+        # Tokens already in the chain must go first
+        for port in self.inports[1:]:
+            if port.available_tokens():
+                return ActionResult(did_fire=False)
+        inport = self.inports[0]
+        count = min(inport.available_tokens(), self.outport.available_tokens())
+        values = []
+        for _ in xrange(count):
+            token = inport.peek_token()
+            if isinstance(token, ExceptionToken):
+                # Exception tokens are handled by the members firing by themselves
+                inport.peek_rewind()
+                for _ in values:
+                    inport.peek_token()
+                break
+            values.append(token.value)
+        if not values:
+            return self._not_fired()
+
+        for member, action in self.actions:
+            if action.batch:
+                result = action.action_method(member, values)
+                if not result.did_fire:
+                    return self._not_fired()
+                values = result.production[0]
+            else:
+                produced = []
+                for value in values:
+                    result = action.action_method(member, value)
+                    if not result.did_fire:
+                        return self._not_fired()
+                    produced.append(result.production[0])
+                values = produced
+            if any(isinstance(value, Token) for value in values):
+                # Tokens, e.g. end of stream, are passed by the members firing by themselves
+                return self._not_fired()
+
+        inport.commit_peek_as_read()
+        for value in values:
+            self.outport.write_token(Token(value))
+
+        if self.head._fired_hooks:
+            for member, action in self.actions:
+                result = ActionResult()
+                result.tokens_consumed = result.tokens_produced = len(values)
+                for hook in self.head._fired_hooks:
+                    hook(member, action.__name__, result)
+
+        result = ActionResult()
+        result.tokens_consumed = result.tokens_produced = len(values) * len(self.actors)
+        return result
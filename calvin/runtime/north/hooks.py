@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+_firing_hooks = None
+
+
+def get_firing_hooks():
+    """ Returns the FiringHooks singleton
+    """
+    global _firing_hooks
+    if _firing_hooks is None:
+        _firing_hooks = FiringHooks()
+    return _firing_hooks
+
+
+class FiringHooks(object):
+    """ Functions called after an actor fired an action, as hook(actor, action_name, action_result).
+
+        Actors bind the list of hooks when created and the list is only changed in place,
+        hence with nothing attached firing costs a test of an empty list.
+    """
+
+    def __init__(self):
+        super(FiringHooks, self).__init__()
+        self.fired = []
+
+    def attach(self, hook):
+        if hook not in self.fired:
+            self.fired.append(hook)
+
+    def detach(self, hook):
+        if hook in self.fired:
+            self.fired.remove(hook)
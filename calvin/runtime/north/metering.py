@@ -18,6 +18,7 @@ import time
 from calvin.utilities import calvinlogger
 from calvin.utilities import calvinuuid
 from calvin.utilities import calvinconfig
+from calvin.runtime.north import hooks
 
 _conf = calvinconfig.get()
 _log = calvinlogger.get_logger(__name__)
@@ -37,6 +38,9 @@ def set_metering(metering):
     global _metering
     if _metering is None:
         _metering = metering
+        # Aggregated metering is collected also before any user registers
+        if _metering.aggregated_timeout > 0.0:
+            _metering.firing_hooks.attach(_metering.actor_fired)
     return _metering
 
 class Metering(object):
@@ -57,6 +61,11 @@ class Metering(object):
         self.next_forget_aggregated = time.time()
         self.actors_aggregated = {}
         self.actors_aggregated_time = {}
+        self.firing_hooks = hooks.get_firing_hooks()
+
+    def actor_fired(self, actor, action_name, action_result):
+        """ Firing hook """
+        self.fired(actor.id, action_name)
 
     def fired(self, actor_id, action_name):
         t = time.time()
@@ -82,6 +91,7 @@ class Metering(object):
             raise Exception("User id already in use")
         self.users[user_id] = time.time()
         self.active = True
+        self.firing_hooks.attach(self.actor_fired)
         return user_id
 
     def unregister(self, user_id):
@@ -89,6 +99,8 @@ class Metering(object):
             self.users.pop(user_id)
             self.active = bool(self.users)
             self.forget(time.time())
+            if not self.active and self.aggregated_timeout <= 0.0:
+                self.firing_hooks.detach(self.actor_fired)
         else:
             raise Exception("User id not found")
 
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import cPickle
+import traceback
+import multiprocessing
+
+from calvin.runtime.south.plugins.async import threads
+from calvin.utilities import calvinconfig
+from calvin.utilities.calvinlogger import get_logger
+
+_log = get_logger(__name__)
+_conf = calvinconfig.get()
+
+_offload = None
+
+
+def get_offload():
+    """ Returns the Offload singleton
+    """
+    global _offload
+    if _offload is None:
+        _offload = Offload()
+    return _offload
+
+
+def _run_in_thread(action_method, actor, args):
+    """ Runs in a pool thread, returns (action result, error, busy seconds) """
+    start = time.time()
+    try:
+        return action_method(actor, *args), None, time.time() - start
+    except Exception:
+        return None, traceback.format_exc(), time.time() - start
+
+
+# Actor classes loaded by a worker process
+_actor_classes = {}
+
+
+def _run_in_process(actor_type, action_name, args):
+    """ Runs in a pool process, returns (pickled action result, error, busy seconds).
+        The action is pure, it is called without an actor instance.
+    """
+    start = time.time()
+    try:
+        actor_class = _actor_classes.get(actor_type)
+        if actor_class is None:
+            from calvin.actorstore.store import ActorStore
+            found, is_primitive, actor_class = ActorStore().lookup(actor_type)
+            if not found or not is_primitive:
+                raise Exception("Actor type %s not found" % actor_type)
+            _actor_classes[actor_type] = actor_class
+        action_result = getattr(actor_class, action_name).action_method(None, *args)
+        return cPickle.dumps(action_result, cPickle.HIGHEST_PROTOCOL), None, time.time() - start
+    except Exception:
+        return None, traceback.format_exc(), time.time() - start
+
+
+class OffloadJob(object):
+    """ An action of actor running in a pool, action is the condition wrapper that completes it.
+        When done the actor is woken up and fires the action again to commit the result, or
+        to raise the error of the action.
+    """
+
+    def __init__(self, actor, action):
+        super(OffloadJob, self).__init__()
+        self.actor = actor
+        self.action = action
+        self.done = False
+        self.result = None
+        self.error = None
+
+    def finished(self, result, error):
+        self.done = True
+        self.result = result
+        self.error = error
+        if self.actor._offload_job is self:
+            self.actor._calvinsys.scheduler_wakeup([self.actor.id])
+
+
+class PoolStats(object):
+    """ Counters of a pool, jobs not yet completed are running or queued """
+
+    def __init__(self, workers):
+        super(PoolStats, self).__init__()
+        self.workers = workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.started = time.time()
+
+    def get(self):
+        pending = self.submitted - self.completed - self.failed
+        elapsed = time.time() - self.started
+        return {
+            'workers': self.workers,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'running': min(pending, self.workers),
+            'queue_depth': max(0, pending - self.workers),
+            'utilization': self.busy_time / (self.workers * elapsed) if elapsed > 0 else 0.0
+        }
+
+
+class Offload(object):
+    """ Runs actions outside the reactor thread, actions that block in a thread pool and pure
+        CPU-bound actions in a process pool. The process pool is started when first used.
+    """
+
+    def __init__(self):
+        super(Offload, self).__init__()
+        thread_workers = _conf.get(None, 'offload_threads') or 10
+        threads.suggest_pool_size(thread_workers)
+        self.thread_stats = PoolStats(thread_workers)
+        self.process_workers = _conf.get(None, 'offload_processes') or multiprocessing.cpu_count()
+        self.process_timeout = _conf.get(None, 'offload_process_timeout')
+        self.process_pool = None
+        self.process_stats = PoolStats(self.process_workers)
+        self.process_pending = set()  # Deferreds of the running process pool jobs
+
+    def run_in_thread(self, actor, action, action_method, args):
+        """ Call action_method(actor, *args) in the thread pool, returns the OffloadJob """
+        job = OffloadJob(actor, action)
+        self.thread_stats.submitted += 1
+        d = threads.defer_to_thread(_run_in_thread, action_method, actor, args)
+        d.addCallback(self._completed, job, self.thread_stats)
+        return job
+
+    def run_in_process(self, actor, action, args):
+        """ Call the pure action with args in the process pool, returns the OffloadJob """
+        if self.process_pool is None:
+            self.process_pool = multiprocessing.Pool(self.process_workers)
+            self.process_stats.started = time.time()
+        job = OffloadJob(actor, action)
+        self.process_stats.submitted += 1
+        d = threads.defer_to_process(self.process_pool, _run_in_process, actor._type, action.__name__, args,
+                                     timeout=self.process_timeout)
+        self.process_pending.add(d)
+        d.addBoth(self._process_done, d)
+        d.addCallbacks(self._process_completed, self._process_failed, callbackArgs=(job, ), errbackArgs=(job, ))
+        return job
+
+    def _process_done(self, reply, d):
+        self.process_pending.discard(d)
+        return reply
+
+    def _process_completed(self, reply, job):
+        pickled_result, error, busy_time = reply
+        result = None if error else cPickle.loads(pickled_result)
+        self._completed((result, error, busy_time), job, self.process_stats)
+
+    def _process_failed(self, failure, job):
+        # Not run by the worker, as when the arguments can't be pickled, the worker died or the pool stopped
+        self._completed((None, failure.getTraceback(), 0.0), job, self.process_stats)
+
+    def _completed(self, reply, job, stats):
+        result, error, busy_time = reply
+        stats.busy_time += busy_time
+        if error:
+            stats.failed += 1
+        else:
+            stats.completed += 1
+        job.finished(result, error)
+
+    def get_stats(self):
+        return {'thread': self.thread_stats.get(), 'process': self.process_stats.get()}
+
+    def stop(self):
+        if self.process_pool is not None:
+            self.process_pool.terminate()
+            self.process_pool = None
+        for d in list(self.process_pending):
+            d.cancel()
@@ -16,12 +16,25 @@
 
 # Coders
 import json_coder
+try:
+    import msgpack_coder
+except ImportError:
+    msgpack_coder = None
+
 
 def get_prio_list():
-    return ['json']
+    """ Supported coders, best first """
+    if msgpack_coder is None:
+        return ['json']
+    if msgpack_coder.FAST:
+        return ['msgpack', 'json']
+    # The pure python msgpack is smaller but slower than json
+    return ['json', 'msgpack']
 
 def get(type_):
     if type_ == "json":
         return json_coder.MessageCoder()
+    if type_ == "msgpack" and msgpack_coder is not None:
+        return msgpack_coder.MessageCoder()
 
     raise Exception("Coder {} requested is not supported".format(type_))
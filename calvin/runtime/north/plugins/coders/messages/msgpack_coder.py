@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2015 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from message_coder import MessageCoderBase
+
+# Use the msgpack package when installed, otherwise the pure python umsgpack (a kademlia dependency)
+try:
+    import msgpack
+
+    # Without its C extension msgpack runs the pure python fallback
+    FAST = not msgpack.Packer.__module__.endswith('fallback')
+
+    def _packb(data):
+        return msgpack.packb(data, use_bin_type=True)
+
+    def _unpackb(data):
+        return msgpack.unpackb(data, raw=False)
+except ImportError:
+    import umsgpack
+
+    FAST = False
+    _packb = umsgpack.packb
+    _unpackb = umsgpack.unpackb
+
+
+# set of functions to encode/decode data tokens to/from a msgpack description,
+# unlike json byte strings (str) are kept as binary data and unicode as text
+class MessageCoder(MessageCoderBase):
+
+    def encode(self, data):
+        return _packb(data)
+
+    def decode(self, data):
+        return _unpackb(data)
@@ -23,6 +23,22 @@ _conf = calvinconfig.get()
 
 class DynamicNegotiator(negotiator_base.NegotiatorBase):
 
-    def get_coder(self, channel):
-        raise NotImplemented("This is not implemented yet.")
+    """
+        Selects the best of our coders that the peer also supports.
+    """
+
+    def get_coder(self, prio_list):
+        coder = self.select(prio_list)
+        if coder is None:
+            raise Exception("No common coder!")
+        return message_coder_factory.get(coder)
+
+    def get_list(self):
+        return message_coder_factory.get_prio_list()
+
+    def select(self, prio_list):
+        for coder in self.get_list():
+            if coder in prio_list:
+                return coder
+        return None
 
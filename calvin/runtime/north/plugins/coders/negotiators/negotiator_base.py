@@ -33,3 +33,10 @@ class NegotiatorBase(object):
             Get a list of avalible coders.
         """
         raise NotImplemented("Negotiator not implemented.")
+
+    def select(self, prio_list):
+        """
+            Get the name of the coder to use with a peer supporting the
+            coders in prio_list, or None if there is no common coder.
+        """
+        raise NotImplemented("Negotiator not implemented.")
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from calvin.runtime.north.plugins.storage.storage_base import StorageBase
+from calvin.runtime.south.plugins.async import async
+from calvin.utilities import calvinlogger
+from calvin.utilities import calvinconfig
+from calvin.utilities.logstore import LogStore, store_path
+
+_conf = calvinconfig.get()
+_log = calvinlogger.get_logger(__name__)
+
+
+class PersistentStorage(StorageBase):
+    """ Implements a storage local to the runtime, kept in a file under storage_path """
+    def __init__(self, node):
+        super(PersistentStorage, self).__init__()
+        self.node = node
+        self.store = None
+
+    def start(self, iface='', network='', bootstrap=[], cb=None, name=None):
+        """
+            Opens the storage file, cb is called when done. Without a node name the
+            storage is kept in memory only.
+        """
+        path = store_path(self.node.attributes.get_node_name_as_str(), 'local')
+        _log.debug("Persistent storage %s" % path)
+        self.store = LogStore(path, sync_delay=_conf.get(None, 'storage_sync_delay'),
+                              sync_count=_conf.get(None, 'storage_sync_count') or 1000)
+        if cb:
+            async.DelayedCall(0, cb, True)
+
+    def set(self, key, value, cb=None):
+        """
+            Set a key, value pair in the storage, a None value deletes the key
+        """
+        if value is None:
+            self.store.delete(key)
+        else:
+            self.store.set(key, value)
+        if cb:
+            cb(key=key, value=True)
+
+    def get(self, key, cb=None):
+        """
+            Gets a value from the storage
+        """
+        if cb:
+            cb(key=key, value=self.store.get(key))
+
+    def get_concat(self, key, cb=None):
+        """
+            Gets a value from the storage
+        """
+        self.get(key, cb=cb)
+
+    def _update_set(self, key, value, update):
+        try:
+            items = json.loads(value)
+            old_value = self.store.get(key)
+            old_items = json.loads(old_value) if old_value else []
+            self.store.set(key, json.dumps(update(set(old_items), set(items))))
+            return True
+        except:
+            _log.debug("Trying to update something not a JSON coded list %s" % value, exc_info=True)
+            return False
+
+    def append(self, key, value, cb=None):
+        status = self._update_set(key, value, lambda old, new: list(old | new))
+        if cb:
+            cb(key=key, value=status)
+
+    def remove(self, key, value, cb=None):
+        status = self._update_set(key, value, lambda old, removed: list(old - removed))
+        if cb:
+            cb(key=key, value=status)
+
+    def bootstrap(self, addrs, cb=None):
+        pass
+
+    def stop(self, cb=None):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        if cb:
+            cb()
@@ -15,22 +15,46 @@
 # limitations under the License.
 
 from calvin.runtime.north.plugins.storage.storage_base import StorageBase
+from calvin.runtime.south.plugins.async import async
 from calvin.utilities import calvinlogger
 from calvin.utilities import calvinconfig
 from calvin.utilities.calvin_callback import CalvinCB
 from calvin.utilities import calvinuuid
+from calvin.utilities.timingwheel import TimingWheel
+from calvin.utilities.lrucache import LRUCache
 
 _conf = calvinconfig.get()
 _log = calvinlogger.get_logger(__name__)
 
+_MISSING = object()
+
 
 class StorageProxy(StorageBase):
-    """ Implements a storage that asks a master node, this is the client class"""
+    """ Implements a storage that asks a master node, this is the client class.
+
+        Requests made within a reactor tick are sent together in one BATCH message, when the
+        master accepts the batch option in the tunnel policy, with at most
+        storage_proxy_window requests waiting for replies. A request without a reply within
+        storage_proxy_timeout seconds fails, as when the tunnel goes down.
+
+        With storage_proxy_cache_size set, the replies to get and get_concat are cached. The master
+        remembers which keys the client caches, until they expire, and sends INVALIDATE when they
+        change, the client's own changes are dropped from the cache at once.
+    """
     def __init__(self, node):
         self.master_uri = _conf.get(None, 'storage_proxy')
         self.node = node
         self.tunnel = None
-        self.replies = {}
+        self.replies = {}  # key: msg id, value: (request, callback) of sent requests
+        self.queue = []  # (request, callback) waiting to be sent
+        self.send_delayedcall = None
+        self.window = _conf.get(None, 'storage_proxy_window') or 64
+        self.timeout = _conf.get(None, 'storage_proxy_timeout') or 20.0
+        self.timeouts = TimingWheel()
+        # key: (cmd, key), value: coded value
+        self.cache = LRUCache(_conf.get(None, 'storage_proxy_cache_size') or 0)
+        self.cache_ttl = _conf.get(None, 'storage_proxy_cache_ttl') or 60.0
+        self.invalidated_cb = None  # called with each key invalidated by the master
         _log.debug("PROXY init for %s", self.master_uri)
         super(StorageProxy, self).__init__()
 
@@ -50,7 +74,8 @@ class StorageProxy(StorageBase):
             return
         # Got link set up tunnel
         self.master_id = peer_node_id
-        self.tunnel = self.node.proto.tunnel_new(self.master_id, 'storage', {})
+        # An older master does not accept batch, then each request is sent on its own
+        self.tunnel = self.node.proto.tunnel_new(self.master_id, 'storage', {'batch': True})
         self.tunnel.register_tunnel_down(CalvinCB(self.tunnel_down, org_cb=org_cb))
         self.tunnel.register_tunnel_up(CalvinCB(self.tunnel_up, org_cb=org_cb))
         self.tunnel.register_recv(self.tunnel_recv_handler)
@@ -61,6 +86,9 @@ class StorageProxy(StorageBase):
             return True
         _log.analyze(self.node.id, "+ CLIENT", {'tunnel_id': self.tunnel.id})
         self.tunnel = None
+        self._fail_all()
+        # The master forgets what we cache
+        self.cache.clear()
         # FIXME assumes that the org_cb is the callback given by storage when starting, can only be called once
         # not future up/down
         if org_cb:
@@ -77,26 +105,141 @@ class StorageProxy(StorageBase):
         # not future up/down
         if org_cb:
             org_cb(True)
+        self._trigger_send()
         # We should always return True which sends an ACK on the destruction of the tunnel
         return True
 
     def tunnel_recv_handler(self, payload):
         """ Gets called when a storage master replies"""
         _log.analyze(self.node.id, "+ CLIENT", {'payload': payload})
-        if 'msg_uuid' in payload and payload['msg_uuid'] in self.replies and 'cmd' in payload and payload['cmd']=='REPLY':
-            self.replies.pop(payload['msg_uuid'])(**{k: v for k, v in payload.iteritems() if k in ('key', 'value')})
+        if payload.get('cmd') == 'BATCH':
+            for reply in payload['msgs']:
+                self._reply(reply)
+        elif payload.get('cmd') == 'INVALIDATE':
+            self._invalidate(payload['keys'])
+            if self.invalidated_cb:
+                for key in payload['keys']:
+                    self.invalidated_cb(key)
+        else:
+            self._reply(payload)
+        # Replies open the window for more requests
+        self._trigger_send()
+
+    def _reply(self, payload):
+        if payload.get('cmd') != 'REPLY' or payload.get('msg_uuid') not in self.replies:
+            _log.debug("Unexpected storage proxy reply %s" % payload)
+            return
+        self.timeouts.cancel(payload['msg_uuid'])
+        msg, cb = self.replies.pop(payload['msg_uuid'])
+        if msg.get('cache') and 'value' in payload:
+            self.cache.set((msg['cmd'], msg['key']), payload['value'], self.cache_ttl)
+        if cb:
+            cb(**{k: v for k, v in payload.iteritems() if k in ('key', 'value', 'values')})
+
+    def _reply_timeout(self, msg_id):
+        """ Gets called when a request times out """
+        if msg_id not in self.replies:
+            return
+        msg, cb = self.replies.pop(msg_id)
+        _log.warning("Storage proxy request %s timed out" % msg['cmd'])
+        self._fail(msg, cb)
+        self._trigger_send()
+
+    def _fail(self, msg, cb):
+        """ Reply as the master does when the storage operation fails """
+        if not cb:
+            return
+        value = None if msg['cmd'] in ('GET', 'GET_CONCAT', 'GET_MANY') else False
+        if 'keys' in msg:
+            cb(values={key: value for key in msg['keys']})
+        elif 'items' in msg:
+            cb(values={key: value for key in msg['items']})
+        else:
+            cb(key=msg['key'], value=value)
+
+    def _clear_requests(self):
+        """ Forget all sent and queued requests, returns them """
+        for msg_id in self.replies:
+            self.timeouts.cancel(msg_id)
+        requests = self.replies.values() + self.queue
+        self.replies = {}
+        self.queue = []
+        if self.send_delayedcall is not None:
+            self.send_delayedcall.cancel()
+            self.send_delayedcall = None
+        return requests
+
+    def _fail_all(self):
+        """ Fail all sent and queued requests, e.g. when the tunnel is down """
+        for msg, cb in self._clear_requests():
+            self._fail(msg, cb)
 
     def send(self, cmd, msg, cb):
-        msg_id = calvinuuid.uuid("MSGID")
-        self.replies[msg_id] = cb
-        msg['msg_uuid'] = msg_id
-        self.tunnel.send(dict(msg, cmd=cmd, msg_uuid=msg_id))
+        """ Queue a request, it is sent when the tick is over """
+        if not self.tunnel:
+            _log.error("Storage proxy request %s without a tunnel to the master" % cmd)
+            async.DelayedCall(0, self._fail, dict(msg, cmd=cmd), cb)
+            return
+        msg_id = calvinuuid.transient_id("MSGID")
+        self.queue.append((dict(msg, cmd=cmd, msg_uuid=msg_id), cb))
+        self._trigger_send()
+
+    def _trigger_send(self):
+        if (self.tunnel and self.queue and len(self.replies) < self.window and
+                self.send_delayedcall is None):
+            self.send_delayedcall = async.DelayedCall(0, self._send_queued)
+
+    def _send_queued(self):
+        """ Send the queued requests that fit in the window, together when more than one and the master
+            accepts batches
+        """
+        self.send_delayedcall = None
+        if not self.tunnel:
+            return
+        count = max(0, self.window - len(self.replies))
+        msgs = []
+        for msg, cb in self.queue[:count]:
+            self.replies[msg['msg_uuid']] = (msg, cb)
+            self.timeouts.add(msg['msg_uuid'], self.timeout, self._reply_timeout)
+            msgs.append(msg)
+        del self.queue[:count]
+        if len(msgs) > 1 and self.tunnel.policy.get('batch'):
+            _log.debug("Storage proxy batch of %d requests, %d queued" % (len(msgs), len(self.queue)))
+            self.tunnel.send({'cmd': 'BATCH', 'msgs': msgs})
+        else:
+            for msg in msgs:
+                self.tunnel.send(msg)
+
+    def _invalidate(self, keys):
+        """ Drop keys from the cache, also the replies on their way may be older """
+        if self.cache.size <= 0:
+            return
+        keys = set(keys)
+        for key in keys:
+            self.cache.invalidate(('GET', key))
+            self.cache.invalidate(('GET_CONCAT', key))
+        for msg, _ in self.replies.values() + self.queue:
+            if msg.get('cache') and msg['key'] in keys:
+                msg['cache'] = False
+
+    def _cached_get(self, cmd, key, cb):
+        """ Get from the cache when there, otherwise ask the master and cache the reply """
+        if self.cache.size <= 0:
+            self.send(cmd=cmd, msg={'key': key}, cb=cb)
+            return
+        value = self.cache.get((cmd, key), _MISSING)
+        if value is _MISSING:
+            # Seconds the master remembers that we cache the key, the reply comes within the timeout
+            self.send(cmd=cmd, msg={'key': key, 'cache': self.timeout + self.cache_ttl}, cb=cb)
+        elif cb:
+            async.DelayedCall(0, cb, key=key, value=value)
 
     def set(self, key, value, cb=None):
         """
             Set a key, value pair in the storage
         """
         _log.analyze(self.node.id, "+ CLIENT", {'key': key, 'value': value})
+        self._invalidate([key])
         self.send(cmd='SET',msg={'key':key, 'value': value}, cb=cb)
 
     def get(self, key, cb=None):
@@ -104,27 +247,51 @@ class StorageProxy(StorageBase):
             Gets a value from the storage
         """
         _log.analyze(self.node.id, "+ CLIENT", {'key': key})
-        self.send(cmd='GET',msg={'key':key}, cb=cb)
+        self._cached_get('GET', key, cb)
 
     def get_concat(self, key, cb=None):
         """
             Gets a value from the storage
         """
         _log.analyze(self.node.id, "+ CLIENT", {'key': key})
-        self.send(cmd='GET_CONCAT',msg={'key':key}, cb=cb)
+        self._cached_get('GET_CONCAT', key, cb)
 
     def append(self, key, value, cb=None):
         _log.analyze(self.node.id, "+ CLIENT", {'key': key, 'value': value})
+        self._invalidate([key])
         self.send(cmd='APPEND',msg={'key':key, 'value': value}, cb=cb)
 
     def remove(self, key, value, cb=None):
         _log.analyze(self.node.id, "+ CLIENT", {'key': key, 'value': value})
+        self._invalidate([key])
         self.send(cmd='REMOVE',msg={'key':key, 'value': value}, cb=cb)
 
+    def _reply_many(self, values, cb):
+        """ One reply with the values of all keys of a *_MANY command """
+        if cb:
+            for key, value in values.iteritems():
+                cb(key=key, value=value)
+
+    def set_many(self, items, cb=None):
+        _log.analyze(self.node.id, "+ CLIENT", {'keys': items.keys()})
+        self._invalidate(items)
+        self.send(cmd='SET_MANY', msg={'items': items}, cb=CalvinCB(self._reply_many, cb=cb))
+
+    def get_many(self, keys, cb=None):
+        _log.analyze(self.node.id, "+ CLIENT", {'keys': keys})
+        self.send(cmd='GET_MANY', msg={'keys': list(keys)}, cb=CalvinCB(self._reply_many, cb=cb))
+
+    def append_many(self, items, cb=None):
+        _log.analyze(self.node.id, "+ CLIENT", {'keys': items.keys()})
+        self._invalidate(items)
+        self.send(cmd='APPEND_MANY', msg={'items': items}, cb=CalvinCB(self._reply_many, cb=cb))
+
     def bootstrap(self, addrs, cb=None):
         _log.analyze(self.node.id, "+ CLIENT", None)
 
     def stop(self, cb=None):
         _log.analyze(self.node.id, "+ CLIENT", None)
+        # Nobody waits for the replies when stopping
+        self._clear_requests()
         if cb:
             cb()
\ No newline at end of file
@@ -36,6 +36,8 @@ class StorageBase(object):
             append:
                 key: The key
                 status: True or False
+            set_many/get_many/append_many:
+                called once for each key, as for set/get/append
             bootstrap:
                 status: List of True and/or false:s
 
@@ -74,6 +76,28 @@ class StorageBase(object):
     def remove(self, key, value, cb=None):
         raise NotImplementedError()
 
+    def set_many(self, items, cb=None):
+        """
+            Set several key, value pairs given as a dict, one set at a time unless
+            the storage can do better
+        """
+        for key, value in items.iteritems():
+            self.set(key=key, value=value, cb=cb)
+
+    def get_many(self, keys, cb=None):
+        """
+            Gets the values of several keys
+        """
+        for key in keys:
+            self.get(key=key, cb=cb)
+
+    def append_many(self, items, cb=None):
+        """
+            Append to several keys, items is a dict of key: coded list of values
+        """
+        for key, value in items.iteritems():
+            self.append(key=key, value=value, cb=cb)
+
     def bootstrap(self, addrs, cb=None):
         raise NotImplementedError()
 
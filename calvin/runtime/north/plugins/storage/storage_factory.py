@@ -18,15 +18,20 @@
 # Parsers
 from calvin.runtime.south.plugins.storage import dht, securedht
 from calvin.runtime.north.plugins.storage.proxy import StorageProxy
+from calvin.runtime.north.plugins.storage.persistent import PersistentStorage
+from calvin.utilities import calvinconfig
+
+_conf = calvinconfig.get()
 
 def get(type_, node=None):
     if type_ == "dht":
-        return dht.AutoDHTServer()
+        return dht.AutoDHTServer(node)
     elif type_ == "securedht":
         return securedht.AutoDHTServer()
     elif type_ == "proxy":
         return StorageProxy(node)
     elif type_ == "local":
-        return None
+        # Kept in the localstore of Storage, unless it should be persistent
+        return PersistentStorage(node) if _conf.get(None, 'storage_path') else None
 
     raise Exception("Parser {} requested is not supported".format(type_))
@@ -20,9 +20,11 @@ from calvin.runtime.south import endpoint
 from calvin.runtime.north.calvin_proto import CalvinTunnel
 import calvin.requests.calvinresponse as response
 from calvin.utilities import calvinlogger
+from calvin.utilities import calvinconfig
 from calvin.actor.actor import ShadowActor
 
 _log = calvinlogger.get_logger(__name__)
+_conf = calvinconfig.get()
 
 
 class PortManager(object):
@@ -102,6 +104,69 @@ class PortManager(object):
                      'value': 'ABORT'}
             tunnel.send(reply)
 
+    def recv_tokens_handler(self, tunnel, payload):
+        """ Gets called when a batch of tokens arrives on any port """
+        try:
+            port = self._get_local_port(port_id=payload['peer_port_id'])
+            port.endpoint.recv_tokens(payload)
+        except:
+            # See recv_token_handler
+            reply = {'cmd': 'TOKENS_REPLY',
+                     'port_id': payload['port_id'],
+                     'peer_port_id': payload['peer_port_id'],
+                     'sequencenbr': payload['sequencenbr'],
+                     'acked': payload['sequencenbr'],
+                     'credit': 0,
+                     'value': 'ABORT'}
+            tunnel.send(reply)
+
+    def recv_token_chunk_handler(self, tunnel, payload):
+        """ Gets called when a chunk of a large token arrives on any port """
+        try:
+            port = self._get_local_port(port_id=payload['peer_port_id'])
+            port.endpoint.recv_token_chunk(payload)
+        except:
+            # See recv_token_handler
+            reply = {'cmd': 'TOKENS_REPLY',
+                     'port_id': payload['port_id'],
+                     'peer_port_id': payload['peer_port_id'],
+                     'sequencenbr': payload['sequencenbr'],
+                     'acked': payload['sequencenbr'],
+                     'credit': 0,
+                     'value': 'ABORT'}
+            tunnel.send(reply)
+
+    def recv_token_chunk_reply_handler(self, tunnel, payload):
+        """ Gets called when a chunk of a large token is (N)ACKed for any port """
+        try:
+            port = self._get_local_port(port_id=payload['port_id'])
+        except:
+            pass
+        else:
+            for e in port.endpoints:
+                try:
+                    if e.get_peer()[1] == payload['peer_port_id']:
+                        e.reply_token_chunk(payload['sequencenbr'], payload['received'], payload['epoch'],
+                                            payload['value'])
+                        break
+                except:
+                    pass
+
+    def recv_tokens_reply_handler(self, tunnel, payload):
+        """ Gets called when a batch of tokens is (N)ACKed for any port """
+        try:
+            port = self._get_local_port(port_id=payload['port_id'])
+        except:
+            pass
+        else:
+            for e in port.endpoints:
+                try:
+                    if e.get_peer()[1] == payload['peer_port_id']:
+                        e.reply_tokens(payload['sequencenbr'], payload['acked'], payload['credit'], payload['value'])
+                        break
+                except:
+                    pass
+
     def recv_token_reply_handler(self, tunnel, payload):
         """ Gets called when a token is (N)ACKed for any port """
         try:
@@ -127,6 +192,14 @@ class PortManager(object):
                 self.recv_token_handler(tunnel, payload)
             elif 'TOKEN_REPLY' == payload['cmd']:
                 self.recv_token_reply_handler(tunnel, payload)
+            elif 'TOKENS' == payload['cmd']:
+                self.recv_tokens_handler(tunnel, payload)
+            elif 'TOKENS_REPLY' == payload['cmd']:
+                self.recv_tokens_reply_handler(tunnel, payload)
+            elif 'TOKEN_CHUNK' == payload['cmd']:
+                self.recv_token_chunk_handler(tunnel, payload)
+            elif 'TOKEN_CHUNK_REPLY' == payload['cmd']:
+                self.recv_token_chunk_reply_handler(tunnel, payload)
 
     def connection_request(self, payload):
         """ A request from a peer to connect a port"""
@@ -159,18 +232,23 @@ class PortManager(object):
                 _log.analyze(self.node.id, "+ WRONG TUNNEL", payload, peer_node_id=payload['from_rt_uuid'])
                 return response.CalvinResponse(response.GONE)
 
+            # The requester may have asked for the tokens to use a data link
+            tunnel = tunnel.on_link(payload.get('link'))
             if isinstance(port, InPort):
                 endp = endpoint.TunnelInEndpoint(port,
                                                  tunnel,
                                                  payload['from_rt_uuid'],
                                                  payload['port_id'],
-                                                 self.node.sched.trigger_loop)
+                                                 self.node.sched.trigger_loop,
+                                                 batch=payload.get('batch_tokens', False))
             else:
                 endp = endpoint.TunnelOutEndpoint(port,
                                                   tunnel,
                                                   payload['from_rt_uuid'],
                                                   payload['port_id'],
-                                                  self.node.sched.trigger_loop)
+                                                  self.node.sched.trigger_loop,
+                                                  batch=payload.get('batch_tokens', False),
+                                                  chunked=payload.get('chunked_tokens', False))
                 self.monitor.register_out_endpoint(endp)
 
             invalid_endpoint = port.attach_endpoint(endp)
@@ -187,7 +265,9 @@ class PortManager(object):
                 self.node.storage.add_port(port, self.node.id, port.owner.id, "out")
 
             _log.analyze(self.node.id, "+ OK", payload, peer_node_id=payload['from_rt_uuid'])
-            return response.CalvinResponse(response.OK, {'port_id': port.id})
+            # Tell peer that we accept batches of tokens and large tokens in chunks (peers not knowing about it ignore it)
+            return response.CalvinResponse(response.OK, {'port_id': port.id, 'batch_tokens': True,
+                                                         'chunked_tokens': True})
 
 
     def connect(self, callback=None, actor_id=None, port_name=None, port_dir=None, port_id=None, peer_node_id=None,
@@ -403,13 +483,34 @@ class PortManager(object):
         _log.analyze(self.node.id, "+ SENDING", dict({k: state[k] for k in state.keys() if k != 'callback'},tunnel_status=self.tunnels[state['peer_node_id']].status), peer_node_id=state['peer_node_id'])
         if 'retries' not in state:
             state['retries'] = 0
+        state['link'] = self._link_name(port)
+        if state['link']:
+            # Tokens use the control link until the data link is established
+            self.node.network.data_link_request(state['peer_node_id'], state['link'])
         self.proto.port_connect(callback=CalvinCB(self._connected_via_tunnel, **state),
                                 port_id=state['port_id'],
                                 peer_node_id=state['peer_node_id'],
                                 peer_port_id=state['peer_port_id'],
                                 peer_actor_id=state['peer_actor_id'],
                                 peer_port_name=state['peer_port_name'],
-                                peer_port_dir=state['peer_port_dir'], tunnel=tunnel)
+                                peer_port_dir=state['peer_port_dir'], tunnel=tunnel,
+                                link=state['link'])
+
+    def _link_name(self, port):
+        """ Name of the data link a remote connection of port should use, None for the control link """
+        link = port.link or _conf.get(None, 'token_link')
+        if link == 'token':
+            # All token tunnel traffic to the peer share one data link
+            return 'token'
+        if link == 'dedicated':
+            return 'port-' + port.id
+        return None
+
+    def _release_link(self, ep):
+        """ Close the data link dedicated to an endpoint's connection """
+        link = getattr(getattr(ep, 'tunnel', None), 'link', None)
+        if link and link.startswith('port-'):
+            self.node.network.data_link_close(ep.tunnel.peer_node_id, link)
 
 
     def _connected_via_tunnel(self, reply, **state):
@@ -422,7 +523,8 @@ class PortManager(object):
                 # Maybe it is on another node now lets retry and lookup the port
                 state['peer_node_id'] = None
                 state['retries'] += 1
-                self.node.storage.get_port(state['peer_port_id'], CalvinCB(self._connect_by_peer_port_id, **state))
+                self.node.storage.get_port(state['peer_port_id'], CalvinCB(self._connect_by_peer_port_id, **state),
+                                           bypass_cache=True)
                 return None
             if state['callback']:
                 state['callback'](status=response.CalvinResponse(response.NOT_FOUND), **state)
@@ -443,20 +545,23 @@ class PortManager(object):
                 return None
 
         # Set up the port's endpoint
-        tunnel = self.tunnels[state['peer_node_id']]
+        tunnel = self.tunnels[state['peer_node_id']].on_link(state.get('link'))
         port = self.ports[state['port_id']]
         if isinstance(port, InPort):
             endp = endpoint.TunnelInEndpoint(port,
                                              tunnel,
                                              state['peer_node_id'],
                                              reply.data['port_id'],
-                                             self.node.sched.trigger_loop)
+                                             self.node.sched.trigger_loop,
+                                             batch=reply.data.get('batch_tokens', False))
         else:
             endp = endpoint.TunnelOutEndpoint(port,
                                               tunnel,
                                               state['peer_node_id'],
                                               reply.data['port_id'],
-                                              self.node.sched.trigger_loop)
+                                              self.node.sched.trigger_loop,
+                                              batch=reply.data.get('batch_tokens', False),
+                                              chunked=reply.data.get('chunked_tokens', False))
             # register into main loop
             self.monitor.register_out_endpoint(endp)
         invalid_endpoint = port.attach_endpoint(endp)
@@ -596,6 +701,7 @@ class PortManager(object):
             if isinstance(ep, endpoint.TunnelOutEndpoint):
                 self.monitor.unregister_out_endpoint(ep)
             ep.destroy()
+            self._release_link(ep)
 
         ok = True
         for peer_node_id, peer_port_id in peer_ids:
@@ -686,6 +792,7 @@ class PortManager(object):
                 if isinstance(ep, endpoint.TunnelOutEndpoint):
                     self.monitor.unregister_out_endpoint(ep)
                 ep.destroy()
+                self._release_link(ep)
 
             return response.CalvinResponse(True)
 
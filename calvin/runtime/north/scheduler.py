@@ -18,6 +18,7 @@ import sys
 import time
 
 from calvin.actor.actor import ActionResult
+from calvin.runtime.south import endpoint
 from calvin.runtime.south.plugins.async import async
 from calvin.utilities.calvinlogger import get_logger
 
@@ -124,16 +125,106 @@ class Scheduler(object):
         return total
 
 
-class DebugScheduler(Scheduler):
-    """This is an instrumented version of the scheduler for use in debugging runs."""
+class EventScheduler(Scheduler):
+    """
+    Scheduler that only fires actors that have been marked as runnable.
+
+    Actors are marked by trigger_loop(actor_ids=[...]), e.g. from tunnel endpoints
+    receiving tokens or (N)ACKs, timers and calvinsys, and implicitly when a local
+    neighbour has fired. A trigger without actor ids marks all actors, i.e. the
+    same behaviour as the default scheduler.
+    """
 
     def __init__(self, node, actor_mgr, monitor):
-        super(DebugScheduler, self).__init__(node, actor_mgr, monitor)
+        super(EventScheduler, self).__init__(node, actor_mgr, monitor)
+        # Start with a complete loop to pick up any actors already enabled
+        self._fire_all = True
+
+    def loop_once(self, all_=False):
+        self._loop_once = None
+        activity = self.monitor.loop(self)
+
+        # Swap out the set of runnable actors, new triggers during firing go into the next loop
+        actor_ids = None if (all_ or self._fire_all) else self._trigger_set
+        self._trigger_set = set()
+        self._fire_all = False
+
+        total = self.fire_actors(actor_ids)
+        activity = total.did_fire or activity
+
+        _log.debug("looped_once for %s at %s again in %s" %
+                   ("ALL" if actor_ids is None else actor_ids, time.time(), 0 if activity else self._heartbeat))
+
+        if activity:
+            # Actors that fired, and their local peers, might be able to fire again
+            self.trigger_loop(0, total.actor_ids)
+        else:
+            # No firings, only poll the monitor until something is triggered
+            if self._heartbeat_loop is not None:
+                self._heartbeat_loop.cancel()
+            self._heartbeat_loop = async.DelayedCall(self._heartbeat, self.trigger_loop, actor_ids=[])
+
+    def trigger_loop(self, delay=0, actor_ids=None):
+        """ Mark actor_ids (all actors when None) as runnable and make sure a loop_once is pending """
+        if delay > 0:
+            _log.debug("Delayed trigger %s" % delay)
+            async.DelayedCall(delay, self.trigger_loop, actor_ids=actor_ids)
+            return
+
+        if actor_ids is None:
+            self._fire_all = True
+        else:
+            self._trigger_set.update(actor_ids)
+
+        # Never have more then one outstanding loop_once
+        if self._loop_once is None:
+            self._loop_once = async.DelayedCall(0, self.loop_once)
+
+    def _local_peers(self, actor):
+        """ Return the ids of the actors connected locally to actor, or to its fused chain """
+        peers = set()
+        chain = actor._fused_chain
+        members = chain.actors if chain is not None and chain.head is actor else [actor]
+        for member in members:
+            for port in member.inports.itervalues():
+                if isinstance(port.endpoint, endpoint.LocalInEndpoint):
+                    peers.add(port.endpoint.peer_port.owner.id)
+            for port in member.outports.itervalues():
+                for ep in port.endpoints:
+                    if isinstance(ep, endpoint.LocalOutEndpoint):
+                        peers.add(ep.peer_port.owner.id)
+        return peers
+
+    def fire_actors(self, actor_ids=None):
+        total = ActionResult(did_fire=False)
+        total.actor_ids = set()
+
+        if actor_ids is None:
+            actors = self.actor_mgr.enabled_actors()
+        else:
+            actors = [self.actor_mgr.actors.get(actor_id, None) for actor_id in actor_ids]
+            actors = [actor for actor in actors if actor is not None and actor.enabled()]
+
+        for actor in actors:
+            try:
+                action_result = actor.fire()
+                total.merge(action_result)
+                if action_result.did_fire:
+                    total.actor_ids.add(actor.id)
+                    total.actor_ids.update(self._local_peers(actor))
+            except Exception as e:
+                self._log_exception_during_fire(e)
+        self.idle = not total.did_fire
+        return total
+
+
+class DebugSchedulerMixin(object):
+    """Instrumentation of a scheduler for use in debugging runs, put before the scheduler class."""
 
     def trigger_loop(self, delay=0, actor_ids=None):
         import inspect
         import traceback
-        super(DebugScheduler, self).trigger_loop(delay, actor_ids)
+        super(DebugSchedulerMixin, self).trigger_loop(delay, actor_ids)
         (frame, filename, line_no, fname, lines, index) = inspect.getouterframes(inspect.currentframe())[1]
         _log.debug("triggered %s by %s in file %s at %s" % (time.time(), fname, filename, line_no))
         _log.debug("Trigger happend here:\n" + ''.join(traceback.format_stack()[-6:-1]))
@@ -145,4 +236,12 @@ class DebugScheduler(Scheduler):
     def fire_actors(self, actor_ids=None):
         from infi.traceback import traceback_context
         traceback_context()
-        return super(DebugScheduler, self).fire_actors(actor_ids)
+        return super(DebugSchedulerMixin, self).fire_actors(actor_ids)
+
+
+class DebugScheduler(DebugSchedulerMixin, Scheduler):
+    """This is an instrumented version of the scheduler for use in debugging runs."""
+
+
+class DebugEventScheduler(DebugSchedulerMixin, EventScheduler):
+    """This is an instrumented version of the event scheduler for use in debugging runs."""
@@ -24,6 +24,8 @@ from calvin.actor.actor import ShadowActor
 from calvin.utilities import calvinconfig
 from calvin.actorstore.store import GlobalStore
 from calvin.utilities import dynops
+from calvin.utilities.lrucache import LRUCache
+from calvin.utilities.timingwheel import TimingWheel
 import re
 
 _log = calvinlogger.get_logger(__name__)
@@ -45,9 +47,21 @@ class Storage(object):
         self.proxy = _conf.get(None, 'storage_proxy') if storage_type == 'proxy' else None
         _log.analyze(self.node.id, "+", {'proxy': self.proxy})
         self.tunnel = {}
-        self.starting = storage_type != 'local'
         self.storage = storage_factory.get(storage_type, node)
+        self.starting = self.storage is not None
         self.coder = message_coder_factory.get("json")  # TODO: always json? append/remove requires json at the moment
+        # Read cache of get, holds coded values for the seconds given per key prefix
+        self.cache = LRUCache(_conf.get(None, 'storage_cache_size') or 0)
+        self.cache_ttl = _conf.get(None, 'storage_cache_ttl') or {}
+        if self.proxy:
+            # Values changed at the master are dropped from the read cache as well
+            self.storage.invalidated_cb = self.cache.invalidate
+        # As proxy master, the proxy clients caching a key are told when it changes
+        self._proxy_cache_holders = {}  # key: storage key, value: set of peer node ids
+        self._proxy_cache_timeouts = TimingWheel()  # (key, peer node id) expire when the client's cache does
+        self._proxy_invalidations = {}  # key: peer node id, value: set of keys to send at the end of the tick
+        self._proxy_invalidate_delayedcall = None
+        self.proxy_invalidations_sent = 0
         self.flush_delayedcall = None
         self.reset_flush_timeout()
 
@@ -138,6 +152,9 @@ class Storage(object):
                             'REMOVE': self.remove,
                             'DELETE': self.delete,
                             'REPLY': self._proxy_reply}
+        self._proxy_many_cmds = {'GET_MANY': self.get_many,
+                                 'SET_MANY': self.set_many,
+                                 'APPEND_MANY': self.append_many}
         try:
             self.node.proto.register_tunnel_handler('storage', CalvinCB(self.tunnel_request_handles))
         except:
@@ -154,6 +171,29 @@ class Storage(object):
             cb()
         self.started = False
 
+    def cache_stats(self):
+        """ Counters of the read cache, of the proxy client cache and of the invalidations sent to proxy clients
+        """
+        stats = {'read': self.cache.stats(),
+                 'proxy_master': {'keys': len(self._proxy_cache_holders),
+                                  'invalidations': self.proxy_invalidations_sent}}
+        if self.proxy:
+            stats['proxy'] = self.storage.cache.stats()
+        return stats
+
+    def _invalidate(self, key):
+        """ Drop key from the read cache and from the caches of the proxy clients holding it
+        """
+        self.cache.invalidate(key)
+        peer_ids = self._proxy_cache_holders.pop(key, None)
+        if not peer_ids:
+            return
+        for peer_id in peer_ids:
+            self._proxy_cache_timeouts.cancel((key, peer_id))
+            self._proxy_invalidations.setdefault(peer_id, set()).add(key)
+        if self._proxy_invalidate_delayedcall is None:
+            self._proxy_invalidate_delayedcall = async.DelayedCall(0, self._proxy_send_invalidations)
+
     ### Storage operations ###
 
     def set_cb(self, key, value, org_key, org_value, org_cb):
@@ -183,6 +223,7 @@ class Storage(object):
 
         if prefix + key in self.localstore_sets:
             del self.localstore_sets[prefix + key]
+        self._invalidate(prefix + key)
 
         # Always save locally
         self.localstore[prefix + key] = value
@@ -192,30 +233,98 @@ class Storage(object):
         elif cb:
             async.DelayedCall(0, cb, key=key, value=True)
 
-    def get_cb(self, key, value, org_cb, org_key):
+    def _set_many_cb(self, key, value, org_items, org_cb):
+        self.set_cb(key, value, org_key=key, org_value=org_items[key], org_cb=org_cb)
+
+    def set_many(self, prefix, items, cb):
+        """ Set several keys: prefix+key values: value given as a dict, in one storage operation.
+            cb is called for each key as for set
+        """
+        _log.debug("Set keys %s" % [prefix + key for key in items])
+        coded_items = {}
+        for key, value in items.iteritems():
+            value = self.coder.encode(value) if value else value
+            if prefix + key in self.localstore_sets:
+                del self.localstore_sets[prefix + key]
+            self._invalidate(prefix + key)
+            # Always save locally
+            self.localstore[prefix + key] = value
+            coded_items[prefix + key] = value
+
+        if self.started:
+            self.storage.set_many(items=coded_items,
+                                  cb=CalvinCB(func=self._set_many_cb, org_items=coded_items, org_cb=cb))
+        elif cb:
+            for key in items:
+                async.DelayedCall(0, cb, key=key, value=True)
+
+    def get_cb(self, key, value, org_cb, org_key, cache_ttl=0):
         """ get callback
         """
         if value:
+            if cache_ttl and key not in self.localstore:
+                # Not while a local set is pending, the value could be older
+                self.cache.set(key, value, cache_ttl)
             value = self.coder.decode(value)
         org_cb(org_key, value)
 
-    def get(self, prefix, key, cb):
-        """ Get value for key: prefix+key, first look in localstore
+    def get(self, prefix, key, cb, bypass_cache=False):
+        """ Get value for key: prefix+key, first look in localstore and then in the read cache,
+            unless bypass_cache is set for a fresh value from storage
         """
         if not cb:
             return
 
+        cache_ttl = self.cache_ttl.get(prefix, 0)
         if prefix + key in self.localstore:
             value = self.localstore[prefix + key]
             if value:
                 value = self.coder.decode(value)
             async.DelayedCall(0, cb, key=key, value=value)
-        else:
-            try:
-                self.storage.get(key=prefix + key, cb=CalvinCB(func=self.get_cb, org_cb=cb, org_key=key))
-            except:
-                _log.error("Failed to get: %s" % key)
-                async.DelayedCall(0, cb, key=key, value=False)
+            return
+        if cache_ttl and not bypass_cache:
+            value = self.cache.get(prefix + key)
+            if value is not None:
+                async.DelayedCall(0, cb, key=key, value=self.coder.decode(value))
+                return
+        try:
+            self.storage.get(key=prefix + key, cb=CalvinCB(func=self.get_cb, org_cb=cb, org_key=key, cache_ttl=cache_ttl))
+        except:
+            _log.error("Failed to get: %s" % key)
+            async.DelayedCall(0, cb, key=key, value=False)
+
+    def _get_many_cb(self, key, value, prefix, org_cb, cache_ttl):
+        self.get_cb(key, value, org_cb, key[len(prefix):], cache_ttl)
+
+    def get_many(self, prefix, keys, cb, bypass_cache=False):
+        """ Get values for keys: prefix+key as get, the keys not found in localstore or the read cache
+            are asked for in one storage operation. cb is called for each key as for get
+        """
+        if not cb:
+            return
+
+        cache_ttl = self.cache_ttl.get(prefix, 0)
+        remaining = []
+        for key in keys:
+            if prefix + key in self.localstore:
+                value = self.localstore[prefix + key]
+                async.DelayedCall(0, cb, key=key, value=self.coder.decode(value) if value else value)
+                continue
+            if cache_ttl and not bypass_cache:
+                value = self.cache.get(prefix + key)
+                if value is not None:
+                    async.DelayedCall(0, cb, key=key, value=self.coder.decode(value))
+                    continue
+            remaining.append(prefix + key)
+        if not remaining:
+            return
+        try:
+            self.storage.get_many(keys=remaining, cb=CalvinCB(func=self._get_many_cb, prefix=prefix, org_cb=cb,
+                                                              cache_ttl=cache_ttl))
+        except:
+            _log.error("Failed to get: %s" % remaining)
+            for key in remaining:
+                async.DelayedCall(0, cb, key=key[len(prefix):], value=False)
 
     def get_iter_cb(self, key, value, it, org_key, include_key=False):
         """ get callback
@@ -346,6 +455,7 @@ class Storage(object):
         """ set operation append on key: prefix+key value: value is a list of items
         """
         _log.debug("Append key %s, value %s" % (prefix + key, value))
+        self._invalidate(prefix + key)
         # Keep local storage for sets updated until confirmed
         if (prefix + key) in self.localstore_sets:
             # Append value items
@@ -363,6 +473,31 @@ class Storage(object):
             if cb:
                 cb(key=key, value=True)
 
+    def _append_many_cb(self, key, value, prefix, org_cb):
+        self.append_cb(key, value, org_key=key[len(prefix):], org_value=None, org_cb=org_cb)
+
+    def append_many(self, prefix, items, cb):
+        """ set operation append on several keys: prefix+key, items is a dict of key: list of items,
+            in one storage operation. cb is called for each key as for append
+        """
+        _log.debug("Append keys %s" % [prefix + key for key in items])
+        for key, value in items.iteritems():
+            self._invalidate(prefix + key)
+            # Keep local storage for sets updated until confirmed
+            if (prefix + key) in self.localstore_sets:
+                self.localstore_sets[prefix + key]['+'] |= set(value)
+                self.localstore_sets[prefix + key]['-'] -= set(value)
+            else:
+                self.localstore_sets[prefix + key] = {'+': set(value), '-': set([])}
+
+        if self.started:
+            coded_items = {prefix + key: self.coder.encode(list(self.localstore_sets[prefix + key]['+']))
+                           for key in items}
+            self.storage.append_many(items=coded_items, cb=CalvinCB(func=self._append_many_cb, prefix=prefix, org_cb=cb))
+        elif cb:
+            for key in items:
+                cb(key=key, value=True)
+
     def remove_cb(self, key, value, org_key, org_value, org_cb):
         """ remove callback, on error retry after flush_timeout
         """
@@ -386,6 +521,7 @@ class Storage(object):
         """ set operation remove on key: prefix+key value: value is a list of items
         """
         _log.debug("Remove key %s, value %s" % (prefix + key, value))
+        self._invalidate(prefix + key)
         # Keep local storage for sets updated until confirmed
         if (prefix + key) in self.localstore_sets:
             # Don't append value items any more
@@ -411,6 +547,7 @@ class Storage(object):
             del self.localstore[prefix + key]
         if (prefix + key) in self.localstore_sets:
             del self.localstore_sets[prefix + key]
+        self._invalidate(prefix + key)
         if self.started:
             self.set(prefix, key, None, cb)
         else:
@@ -433,27 +570,26 @@ class Storage(object):
         GlobalStore(node=node).export()
 
     def _add_node_index(self, node, cb=None):
-        indexes = node.attributes.get_indexed_public()
+        indexes = []
         try:
-            for index in indexes:
-                # TODO add callback, but currently no users supply a cb anyway
-                self.add_index(index, node.id)
+            indexes.extend(node.attributes.get_indexed_public())
         except:
             _log.debug("Add node index failed", exc_info=True)
             pass
         # Add the capabilities
         try:
-            for c in node._calvinsys.list_capabilities():
-                self.add_index(['node', 'capabilities', c], node.id, root_prefix_level=3)
+            indexes.extend([['node', 'capabilities', c] for c in node._calvinsys.list_capabilities()])
         except:
             _log.debug("Add node capabilities failed", exc_info=True)
             pass
+        # TODO add callback, but currently no users supply a cb anyway
+        self.add_indexes([(index, node.id) for index in indexes])
 
-    def get_node(self, node_id, cb=None):
+    def get_node(self, node_id, cb=None, bypass_cache=False):
         """
         Get node data from storage
         """
-        self.get(prefix="node-", key=node_id, cb=cb)
+        self.get(prefix="node-", key=node_id, cb=cb, bypass_cache=bypass_cache)
 
     def delete_node(self, node, cb=None):
         """
@@ -504,11 +640,11 @@ class Storage(object):
                         "origin_node_id": application.origin_node_id},
                  cb=cb)
 
-    def get_application(self, application_id, cb=None):
+    def get_application(self, application_id, cb=None, bypass_cache=False):
         """
         Get application from storage
         """
-        self.get(prefix="application-", key=application_id, cb=cb)
+        self.get(prefix="application-", key=application_id, cb=cb, bypass_cache=bypass_cache)
 
     def delete_application(self, application_id, cb=None):
         """
@@ -523,26 +659,29 @@ class Storage(object):
         """
         _log.debug("Add actor %s id %s" % (actor, node_id))
         data = {"name": actor.name, "type": actor._type, "node_id": node_id}
+        ports = {}
         inports = []
         for p in actor.inports.values():
             port = {"id": p.id, "name": p.name}
             inports.append(port)
-            self.add_port(p, node_id, actor.id, "in")
+            ports[p.id] = self._port_data(p, node_id, actor.id, "in")
         data["inports"] = inports
         outports = []
         for p in actor.outports.values():
             port = {"id": p.id, "name": p.name}
             outports.append(port)
-            self.add_port(p, node_id, actor.id, "out")
+            ports[p.id] = self._port_data(p, node_id, actor.id, "out")
         data["outports"] = outports
         data["is_shadow"] = isinstance(actor, ShadowActor)
+        if ports:
+            self.set_many(prefix="port-", items=ports, cb=None)
         self.set(prefix="actor-", key=actor.id, value=data, cb=cb)
 
-    def get_actor(self, actor_id, cb=None):
+    def get_actor(self, actor_id, cb=None, bypass_cache=False):
         """
         Get actor from storage
         """
-        self.get(prefix="actor-", key=actor_id, cb=cb)
+        self.get(prefix="actor-", key=actor_id, cb=cb, bypass_cache=bypass_cache)
 
     def delete_actor(self, actor_id, cb=None):
         """
@@ -555,6 +694,9 @@ class Storage(object):
         """
         Add port to storage
         """
+        self.set(prefix="port-", key=port.id, value=self._port_data(port, node_id, actor_id, direction), cb=cb)
+
+    def _port_data(self, port, node_id, actor_id=None, direction=None):
         if direction is None:
             if isinstance(port, actorport.InPort):
                 direction = "in"
@@ -576,13 +718,13 @@ class Storage(object):
                 data["peer"] = port.get_peer()
             else:
                 data["peer"] = None
-        self.set(prefix="port-", key=port.id, value=data, cb=cb)
+        return data
 
-    def get_port(self, port_id, cb=None):
+    def get_port(self, port_id, cb=None, bypass_cache=False):
         """
         Get port from storage
         """
-        self.get(prefix="port-", key=port_id, cb=cb)
+        self.get(prefix="port-", key=port_id, cb=cb, bypass_cache=bypass_cache)
 
     def delete_port(self, port_id, cb=None):
         """
@@ -646,10 +788,26 @@ class Storage(object):
 
         indexes = self._index_strings(index, root_prefix_level)
 
-        # make copy of indexes since altered in callbacks
-        for i in indexes[:]:
-            self.append(prefix="index-", key=i, value=[value],
-                        cb=CalvinCB(self.index_cb, org_cb=cb, index_items=indexes) if cb else None)
+        # index_cb alters its copy of indexes
+        self.append_many(prefix="index-", items={i: [value] for i in indexes},
+                         cb=CalvinCB(self.index_cb, org_cb=cb, index_items=indexes[:]) if cb else None)
+
+    def add_indexes(self, index_values, root_prefix_level=3, cb=None):
+        """
+        Add several (index, value) pairs to the storage as add_index does, in one storage operation.
+        cb: will be called when all are done.
+        """
+        _log.debug("add indexes %s" % (index_values, ))
+        items = {}
+        for index, value in index_values:
+            for i in self._index_strings(index, root_prefix_level):
+                items.setdefault(i, []).append(value)
+        if not items:
+            if cb:
+                cb(key=None, value=True)
+            return
+        self.append_many(prefix="index-", items=items,
+                         cb=CalvinCB(self.index_cb, org_cb=cb, index_items=items.keys()) if cb else None)
 
     def remove_index(self, index, value, root_prefix_level=2, cb=None):
         """
@@ -746,6 +904,8 @@ class Storage(object):
         # TODO check if we want a tunnel first
         _log.analyze(self.node.id, "+ SERVER", {'tunnel_id': tunnel.id})
         self.tunnel[tunnel.peer_node_id] = tunnel
+        # Accept batched requests, sent back to the client in the tunnel reply
+        tunnel.policy = {'batch': bool((tunnel.policy or {}).get('batch'))}
         tunnel.register_tunnel_down(CalvinCB(self.tunnel_down, tunnel))
         tunnel.register_tunnel_up(CalvinCB(self.tunnel_up, tunnel))
         tunnel.register_recv(CalvinCB(self.tunnel_recv_handler, tunnel))
@@ -755,6 +915,11 @@ class Storage(object):
     def tunnel_down(self, tunnel):
         """ Callback that the tunnel is not accepted or is going down """
         _log.analyze(self.node.id, "+ SERVER", {'tunnel_id': tunnel.id})
+        # The client's cache is cleared when its tunnel is down
+        self._proxy_invalidations.pop(tunnel.peer_node_id, None)
+        for key in self._proxy_cache_holders.keys():
+            self._proxy_cache_timeouts.cancel((key, tunnel.peer_node_id))
+            self._proxy_cache_expired((key, tunnel.peer_node_id))
         # We should always return True which sends an ACK on the destruction of the tunnel
         return True
 
@@ -772,7 +937,26 @@ class Storage(object):
         """ Gets called when a storage client request"""
         _log.debug("Storage proxy request %s" % payload)
         _log.analyze(self.node.id, "+ SERVER", {'payload': payload})
-        if 'cmd' in payload and payload['cmd'] in self._proxy_cmds:
+        if payload.get('cmd') == 'BATCH':
+            self._proxy_batch(tunnel, payload)
+        else:
+            self._proxy_request(tunnel, payload)
+
+    def _proxy_batch(self, tunnel, payload):
+        """ Handle a BATCH of requests, the replies ready within the tick are sent together in one BATCH """
+        batch = {'replies': [], 'pending': len(payload['msgs']), 'delayedcall': None}
+        for msg in payload['msgs']:
+            self._proxy_request(tunnel, msg, batch=batch)
+        if batch['replies'] is not None:
+            batch['delayedcall'] = async.DelayedCall(0, self._proxy_send_batch, tunnel, batch)
+
+    def _proxy_request(self, tunnel, payload, batch=None):
+        if payload.get('cache') and payload.get('cmd') in ('GET', 'GET_CONCAT'):
+            # Before the get, a change while getting is also invalidated
+            self._proxy_cache_hold(payload['key'], tunnel.peer_node_id, payload['cache'])
+        if payload.get('cmd') in self._proxy_many_cmds:
+            self._proxy_many(tunnel, payload, batch)
+        elif 'cmd' in payload and payload['cmd'] in self._proxy_cmds:
             if 'value' in payload:
                 if payload['cmd'] == 'SET' and payload['value'] is None:
                     # We detected a delete operation, since a set op with unencoded None is a delete
@@ -787,12 +971,89 @@ class Storage(object):
             # client's higher level expect from storage plugin level.
             self._proxy_cmds[payload['cmd']](cb=CalvinCB(self._proxy_send_reply, tunnel=tunnel,
                                                         encode=True if payload['cmd'] in ('GET', 'GET_CONCAT') else False,
-                                                        msgid=payload['msg_uuid']),
+                                                        msgid=payload['msg_uuid'], batch=batch),
                                              prefix="",
                                              **{k: v for k, v in payload.iteritems() if k in ('key', 'value')})
         else:
             _log.error("Unknown storage proxy request %s" % payload['cmd'] if 'cmd' in payload else "")
 
-    def _proxy_send_reply(self, key, value, tunnel, encode, msgid):
+    def _proxy_many(self, tunnel, payload, batch=None):
+        """ Handle a *_MANY request, all values are sent in one reply """
+        cmd = payload['cmd']
+        if cmd == 'GET_MANY':
+            keys = payload['keys']
+            kwargs = {'keys': keys}
+        else:
+            # Values will be encoded again in the storage operation, hence decode
+            kwargs = {'items': {k: self.coder.decode(v) if v is not None else None
+                                for k, v in payload['items'].iteritems()}}
+            keys = kwargs['items'].keys()
+        if not keys:
+            self._proxy_send_many_reply(tunnel, payload['msg_uuid'], {}, batch)
+            return
+        # prefix is empty since that is already in the keys
+        self._proxy_many_cmds[cmd](cb=CalvinCB(self._proxy_many_collect, tunnel=tunnel, encode=cmd == 'GET_MANY',
+                                               msgid=payload['msg_uuid'], values={}, pending=set(keys),
+                                               batch=batch),
+                                   prefix="", **kwargs)
+
+    def _proxy_many_collect(self, key, value, tunnel, encode, msgid, values, pending, batch=None):
+        values[key] = self.coder.encode(value) if encode else value
+        pending.discard(key)
+        if not pending:
+            self._proxy_send_many_reply(tunnel, msgid, values, batch)
+
+    def _proxy_send_many_reply(self, tunnel, msgid, values, batch=None):
+        _log.analyze(self.node.id, "+ SERVER", {'msgid': msgid, 'keys': values.keys()})
+        self._proxy_send(tunnel, {'cmd': 'REPLY', 'msg_uuid': msgid, 'values': values}, batch)
+
+    def _proxy_send_reply(self, key, value, tunnel, encode, msgid, batch=None):
         _log.analyze(self.node.id, "+ SERVER", {'msgid': msgid, 'key': key, 'value': value})
-        tunnel.send({'cmd': 'REPLY', 'msg_uuid': msgid, 'key': key, 'value': self.coder.encode(value) if encode else value})
+        self._proxy_send(tunnel, {'cmd': 'REPLY', 'msg_uuid': msgid, 'key': key,
+                                  'value': self.coder.encode(value) if encode else value}, batch)
+
+    def _proxy_send(self, tunnel, msg, batch=None):
+        """ Send a reply, or keep it for the BATCH reply when the batch is not yet sent """
+        if batch is None or batch['replies'] is None:
+            tunnel.send(msg)
+            return
+        batch['replies'].append(msg)
+        batch['pending'] -= 1
+        if not batch['pending']:
+            # All replied, no need to wait for the tick
+            if batch['delayedcall'] is not None:
+                batch['delayedcall'].cancel()
+            self._proxy_send_batch(tunnel, batch)
+
+    def _proxy_cache_hold(self, key, peer_id, seconds):
+        """ The client peer_id caches key for at most seconds """
+        self._proxy_cache_holders.setdefault(key, set()).add(peer_id)
+        self._proxy_cache_timeouts.cancel((key, peer_id))
+        self._proxy_cache_timeouts.add((key, peer_id), seconds, self._proxy_cache_expired)
+
+    def _proxy_cache_expired(self, holder):
+        key, peer_id = holder
+        peer_ids = self._proxy_cache_holders.get(key)
+        if peer_ids is None:
+            return
+        peer_ids.discard(peer_id)
+        if not peer_ids:
+            del self._proxy_cache_holders[key]
+
+    def _proxy_send_invalidations(self):
+        self._proxy_invalidate_delayedcall = None
+        invalidations, self._proxy_invalidations = self._proxy_invalidations, {}
+        for peer_id, keys in invalidations.iteritems():
+            tunnel = self.tunnel.get(peer_id)
+            if tunnel is None:
+                continue
+            _log.analyze(self.node.id, "+ SERVER", {'peer_id': peer_id, 'keys': list(keys)})
+            tunnel.send({'cmd': 'INVALIDATE', 'keys': list(keys)})
+            self.proxy_invalidations_sent += len(keys)
+
+    def _proxy_send_batch(self, tunnel, batch):
+        replies, batch['replies'] = batch['replies'], None
+        if len(replies) == 1:
+            tunnel.send(replies[0])
+        elif replies:
+            tunnel.send({'cmd': 'BATCH', 'msgs': replies})
@@ -17,8 +17,17 @@
 from calvin.runtime.north.calvin_token import Token
 import time
 from calvin.utilities.calvinlogger import get_logger
+from calvin.utilities import calvinconfig
 
 _log = get_logger(__name__)
+_conf = calvinconfig.get()
+
+# Max number of tokens sent in one TOKENS message
+TOKEN_BATCH_SIZE = 64
+# Seconds without credit from peer before probing for it
+WINDOW_PROBE_INTERVAL = 1.0
+# Max number of chunks of a large token sent but not yet acked
+CHUNK_WINDOW = 4
 
 
 class Endpoint(object):
@@ -46,6 +55,12 @@ class Endpoint(object):
         raise Exception("Can't communicate on endpoint in port %s.%s with id: %s" % (
             self.port.owner.name, self.port.name, self.port.id))
 
+    def tokens_available(self):
+        """
+        Called by the outport when tokens have been written to its fifo.
+        """
+        pass
+
     def destroy(self):
         pass
 
@@ -177,12 +192,18 @@ class TunnelInEndpoint(Endpoint):
 
     """docstring for TunnelInEndpoint"""
 
-    def __init__(self, port, tunnel, peer_node_id, peer_port_id, trigger_loop):
+    def __init__(self, port, tunnel, peer_node_id, peer_port_id, trigger_loop, batch=False):
         super(TunnelInEndpoint, self).__init__(port)
         self.tunnel = tunnel
         self.peer_port_id = peer_port_id
         self.peer_node_id = peer_node_id
         self.trigger_loop = trigger_loop
+        # Peer sends batches of tokens (TOKENS) within the window we give it credit for
+        self.batch = batch
+        # Sequence number peer was last told it may send up to (exclusive)
+        self.window = 0
+        # Chunks received of a large token, until all have arrived
+        self.chunks = None
 
     def __str__(self):
         str = super(TunnelInEndpoint, self).__str__()
@@ -196,7 +217,7 @@ class TunnelInEndpoint(Endpoint):
         # Drop any tokens that we can't write to fifo or is out of sequence
         if self.port.fifo.can_write() and self.port.fifo.write_pos == payload['sequencenbr']:
             self.port.fifo.write(Token.decode(payload['token']))
-            self.trigger_loop()
+            self.trigger_loop(actor_ids=[self.port.owner.id])
             ok = True
         elif self.port.fifo.write_pos > payload['sequencenbr']:
             # Other side resent a token we already have received (can happen after a reconnect if our previous ACK was
@@ -211,9 +232,112 @@ class TunnelInEndpoint(Endpoint):
         }
         self.tunnel.send(reply)
 
+    def recv_tokens(self, payload):
+        """
+        Receive a batch of tokens with consecutive sequence numbers starting at payload['sequencenbr'].
+        Tokens are written to the fifo until it is full or a token is out of sequence, the
+        reply ACKs all tokens up to the fifo's write position, NACKs if part of the batch was dropped,
+        and gives credit for the free slots in the fifo. An empty batch just asks for credit.
+        """
+        fifo = self.port.fifo
+        sequencenbr = payload['sequencenbr']
+        written = False
+        for token in payload['tokens']:
+            if sequencenbr == fifo.write_pos:
+                if not fifo.write(Token.decode(token)):
+                    # Fifo full, drop the rest
+                    break
+                written = True
+            elif sequencenbr > fifo.write_pos:
+                # Out of sequence, drop the rest
+                break
+            # else a token we already have received (resent after a lost reply)
+            sequencenbr += 1
+        if written:
+            self.trigger_loop(actor_ids=[self.port.owner.id])
+        # NACK also an empty batch beyond what we have received, peer has lost tokens
+        self._reply_tokens(payload, sequencenbr == payload['sequencenbr'] + len(payload['tokens']) <= fifo.write_pos)
+
+    def recv_token_chunk(self, payload):
+        """
+        Receive a chunk of the data of a large token, the chunks are sent in order starting at offset 0.
+        Each chunk is (N)ACKed with the number of characters received, the last one is replied to as a batch
+        of tokens when the reassembled token is written to the fifo.
+        """
+        fifo = self.port.fifo
+        sequencenbr = payload['sequencenbr']
+        if sequencenbr != fifo.write_pos:
+            # Token already received (resent after a lost reply) or out of sequence
+            self.chunks = None
+            self._reply_tokens(payload, sequencenbr < fifo.write_pos)
+            return
+        if payload['offset'] == 0:
+            self.chunks = {'sequencenbr': sequencenbr, 'parts': [], 'received': 0}
+        chunks = self.chunks
+        if chunks is None or chunks['sequencenbr'] != sequencenbr or chunks['received'] != payload['offset']:
+            # A chunk is lost, peer resends from what we have
+            self._reply_token_chunk(payload, chunks['received'] if chunks and chunks['sequencenbr'] == sequencenbr else 0,
+                                    False)
+            return
+        chunks['parts'].append(payload['data'])
+        chunks['received'] += len(payload['data'])
+        if chunks['received'] < payload['total']:
+            self._reply_token_chunk(payload, chunks['received'], True)
+            return
+        self.chunks = None
+        written = fifo.write(Token.decode({'type': payload['type'], 'data': ''.join(chunks['parts'])}))
+        if written:
+            self.trigger_loop(actor_ids=[self.port.owner.id])
+        self._reply_tokens(payload, written)
+
+    def _reply_token_chunk(self, payload, received, ok):
+        self.tunnel.send({
+            'cmd': 'TOKEN_CHUNK_REPLY',
+            'port_id': payload['port_id'],
+            'peer_port_id': payload['peer_port_id'],
+            'sequencenbr': payload['sequencenbr'],
+            'received': received,
+            'epoch': payload['epoch'],
+            'value': 'ACK' if ok else 'NACK'
+        })
+
+    def _reply_tokens(self, payload, ok):
+        self.tunnel.send({
+            'cmd': 'TOKENS_REPLY',
+            'port_id': payload['port_id'],
+            'peer_port_id': payload['peer_port_id'],
+            'sequencenbr': payload['sequencenbr'],
+            'acked': self.port.fifo.write_pos,
+            'credit': self._credit(),
+            'value': 'ACK' if ok else 'NACK'
+        })
+
+    def _credit(self):
+        credit = self.port.fifo.available_slots()
+        self.window = self.port.fifo.write_pos + credit
+        return credit
+
+    def _update_credit(self):
+        # Give peer more credit when it has used up (at least) half of what it got, since the
+        # actor has consumed tokens, peer might be waiting for it
+        fifo = self.port.fifo
+        free = fifo.available_slots()
+        if self.window - fifo.write_pos <= free // 2 and fifo.write_pos + free > self.window:
+            self.tunnel.send({
+                'cmd': 'TOKENS_REPLY',
+                'port_id': self.peer_port_id,
+                'peer_port_id': self.port.id,
+                'sequencenbr': fifo.write_pos,
+                'acked': fifo.write_pos,
+                'credit': self._credit(),
+                'value': 'ACK'
+            })
+
     def read_token(self):
         token = self.port.fifo.read(self.port.id)
         self.port.fifo.commit_reads(self.port.id, token is not None)
+        if self.batch and token is not None:
+            self._update_credit()
         return token
 
     def peek_token(self):
@@ -225,6 +349,8 @@ class TunnelInEndpoint(Endpoint):
 
     def commit_peek_as_read(self):
         self.port.fifo.commit_reads(self.port.id)
+        if self.batch:
+            self._update_credit()
 
     def available_tokens(self):
         # First fit as many tokens as possible in the fifo
@@ -241,22 +367,44 @@ class TunnelOutEndpoint(Endpoint):
 
     """docstring for TunnelOutEndpoint"""
 
-    def __init__(self, port, tunnel, peer_node_id, peer_port_id, trigger_loop):
+    def __init__(self, port, tunnel, peer_node_id, peer_port_id, trigger_loop, batch=False, chunked=False):
         super(TunnelOutEndpoint, self).__init__(port)
         self.tunnel = tunnel
         self.peer_id = peer_port_id
         self.peer_node_id = peer_node_id
         self.trigger_loop = trigger_loop
+        # Peer accepts batches of tokens (TOKENS) with credit based flow control,
+        # otherwise one token per message with ACK/NACK and backoff
+        self.batch = batch
+        # Sequence number we may send up to (exclusive), given by peer's credit, None until known
+        self.window = None
+        # Peer accepts large tokens in chunks (TOKEN_CHUNK), only used with batches
+        self.chunk_size = _conf.get(None, 'token_chunk_size') if chunked and batch else None
+        # The large token currently sent in chunks
+        self.chunking = None
         # Keep track of acked tokens, only contains something post call if acks comes out of order
-        self.sequencenbrs_acked = []
+        self.sequencenbrs_acked = set()
         self.backoff = 0.0
         self.time_cont = 0.0
         self.bulk = True
+        # Set by the monitor when registered
+        self.monitor = None
 
     def __str__(self):
         str = super(TunnelOutEndpoint, self).__str__()
         return str
 
+    def _set_dirty(self):
+        if self.monitor is not None:
+            self.monitor.set_dirty(self)
+
+    def _set_timer(self, delay):
+        if self.monitor is not None:
+            self.monitor.set_timer(self, delay)
+
+    def tokens_available(self):
+        self._set_dirty()
+
     def is_connected(self):
         return True
 
@@ -277,12 +425,64 @@ class TunnelOutEndpoint(Endpoint):
         self.bulk = True
         self.backoff = 0.0
         if sequencenbr < sequencenbr_sent:
-            self.sequencenbrs_acked.append(sequencenbr)
-        while any(n == sequencenbr_acked for n in self.sequencenbrs_acked):
+            self.sequencenbrs_acked.add(sequencenbr)
+        while sequencenbr_acked in self.sequencenbrs_acked:
             self.port.fifo.commit_one_read(self.peer_id, True)
-            self.sequencenbrs_acked.remove(sequencenbr_acked)
+            self.sequencenbrs_acked.discard(sequencenbr_acked)
+            sequencenbr_acked += 1
+        self._set_dirty()
         # Maybe someone can fill the fifo again
-        self.trigger_loop()
+        self.trigger_loop(actor_ids=[self.port.owner.id])
+
+    def reply_tokens(self, sequencenbr, acked, credit, status):
+        """
+        Reply on a batch of tokens starting at sequencenbr, all tokens before acked are received
+        and peer has room for credit more tokens.
+        """
+        _log.debug("Reply on port %s/%s/%s [%i-%i+%i] %s" % (self.port.owner.name, self.peer_id, self.port.name,
+                                                            sequencenbr, acked, credit, status))
+        if status not in ('ACK', 'NACK'):
+            # FIXME implement ABORT
+            return
+        fifo = self.port.fifo
+        sequencenbr_sent = fifo.tentative_read_pos[self.peer_id]
+        if fifo.read_pos[self.peer_id] < min(acked, sequencenbr_sent):
+            fifo.read_pos[self.peer_id] = min(acked, sequencenbr_sent)
+        if status == 'NACK' and sequencenbr <= sequencenbr_sent:
+            # Resend from first token not received, unless batch was sent before an earlier rollback
+            fifo.rollback_reads(self.peer_id)
+        if self.chunking is not None and (fifo.read_pos[self.peer_id] > self.chunking['sequencenbr'] or
+                                          fifo.tentative_read_pos[self.peer_id] <= self.chunking['sequencenbr']):
+            # The chunked token is received or will be resent
+            self.chunking = None
+        self.window = acked + credit
+        self.time_cont = time.time() + WINDOW_PROBE_INTERVAL
+        self._set_dirty()
+        # Maybe someone can fill the fifo again, or we can send more
+        self.trigger_loop(actor_ids=[self.port.owner.id])
+        if fifo.can_read(self.peer_id) and fifo.tentative_read_pos[self.peer_id] >= self.window:
+            # No credit left, check again later in case credit from peer is lost
+            self._set_timer(WINDOW_PROBE_INTERVAL)
+
+    def reply_token_chunk(self, sequencenbr, received, epoch, status):
+        """
+        Reply on a chunk of a large token, peer has received the first received characters of its data.
+        """
+        chunking = self.chunking
+        if chunking is None or chunking['sequencenbr'] != sequencenbr or chunking['epoch'] != epoch:
+            # Reply on chunks sent before a resend
+            return
+        if status == 'ACK':
+            chunking['received'] = max(chunking['received'], received)
+        elif status == 'NACK':
+            # Resend from what peer has, and ignore replies on chunks already sent
+            chunking['received'] = chunking['offset'] = received
+            chunking['epoch'] += 1
+        else:
+            # FIXME implement ABORT
+            return
+        self.time_cont = time.time() + WINDOW_PROBE_INTERVAL
+        self._set_dirty()
 
     def _reply_nack(self, sequencenbr, status):
         sequencenbr_sent = self.port.fifo.tentative_read_pos[self.peer_id]
@@ -293,13 +493,15 @@ class TunnelOutEndpoint(Endpoint):
             self.time_cont = curr_time
         if self.time_cont <= curr_time:
             # Need to trigger again due to either too late NACK or switched from series of ACK
-            self.trigger_loop()
+            self.trigger_loop(actor_ids=[self.port.owner.id])
+        # Resend when backoff has passed
+        self._set_timer(self.time_cont - curr_time)
         self.bulk = False
         self.backoff = min(1.0, 0.1 if self.backoff < 0.1 else self.backoff * 2.0)
 
         if sequencenbr < sequencenbr_sent and sequencenbr >= sequencenbr_acked:
             # Filter out ACK for later seq nbrs, should not happen but precaution
-            self.sequencenbrs_acked = [n for n in self.sequencenbrs_acked if n < sequencenbr]
+            self.sequencenbrs_acked = set(n for n in self.sequencenbrs_acked if n < sequencenbr)
             # Rollback fifo to the NACKed token
             while(self.port.fifo.tentative_read_pos[self.peer_id] > sequencenbr):
                 self.port.fifo.commit_one_read(self.peer_id, False)
@@ -320,7 +522,103 @@ class TunnelOutEndpoint(Endpoint):
             'port_id': self.port.id
         })
 
+    def _is_large(self, token):
+        return (self.chunk_size and isinstance(token.value, basestring) and
+                len(token.value) > self.chunk_size)
+
+    def _send_tokens(self, max_tokens):
+        sequencenbr = self.port.fifo.tentative_read_pos[self.peer_id]
+        tokens = []
+        while len(tokens) < max_tokens and self.port.fifo.can_read(self.peer_id):
+            token = self.port.fifo.read(self.peer_id)
+            if self._is_large(token):
+                # Sent in chunks after the tokens before it, see _communicate_window
+                self._start_chunks(sequencenbr + len(tokens), token)
+                if not tokens:
+                    return
+                break
+            tokens.append(token.encode())
+        _log.debug("Send on port  %s/%s/%s [%i-%i]" % (self.port.owner.name,
+                                                       self.peer_id,
+                                                       self.port.name,
+                                                       sequencenbr,
+                                                       sequencenbr + len(tokens) - 1))
+        self.tunnel.send({
+            'cmd': 'TOKENS',
+            'tokens': tokens,
+            'peer_port_id': self.peer_id,
+            'sequencenbr': sequencenbr,
+            'port_id': self.port.id
+        })
+
+    def _start_chunks(self, sequencenbr, token):
+        encoded = token.encode()
+        self.chunking = {'sequencenbr': sequencenbr, 'type': encoded['type'], 'data': encoded['data'],
+                         'offset': 0, 'received': 0, 'epoch': 0}
+        self.time_cont = time.time() + WINDOW_PROBE_INTERVAL
+
+    def _send_chunks(self):
+        """ Send chunks of the large token while less than CHUNK_WINDOW chunks are not acked """
+        chunking = self.chunking
+        data = chunking['data']
+        sent = False
+        while (chunking['offset'] < len(data) and
+               chunking['offset'] - chunking['received'] < CHUNK_WINDOW * self.chunk_size):
+            offset = chunking['offset']
+            self.tunnel.send({
+                'cmd': 'TOKEN_CHUNK',
+                'type': chunking['type'],
+                'data': data[offset:offset + self.chunk_size],
+                'offset': offset,
+                'total': len(data),
+                'epoch': chunking['epoch'],
+                'peer_port_id': self.peer_id,
+                'sequencenbr': chunking['sequencenbr'],
+                'port_id': self.port.id
+            })
+            chunking['offset'] = min(len(data), offset + self.chunk_size)
+            sent = True
+        return sent
+
+    def _communicate_chunks(self):
+        sent = self._send_chunks()
+        if not sent and time.time() >= self.time_cont:
+            # No replies for a while, resend from what peer has received
+            self.chunking['offset'] = self.chunking['received']
+            self.chunking['epoch'] += 1
+            sent = self._send_chunks()
+            self.time_cont = time.time() + WINDOW_PROBE_INTERVAL
+        # Check again in case replies are lost
+        self._set_timer(self.time_cont - time.time())
+        return sent
+
+    def _communicate_window(self):
+        fifo = self.port.fifo
+        if self.window is None:
+            # Until peer has given us credit, send one batch
+            self.window = fifo.tentative_read_pos[self.peer_id] + TOKEN_BATCH_SIZE
+        if self.chunking is not None:
+            # Tokens after a large token wait until all of its chunks are received
+            return self._communicate_chunks()
+        sent = False
+        while (self.chunking is None and fifo.can_read(self.peer_id) and
+               fifo.tentative_read_pos[self.peer_id] < self.window):
+            self._send_tokens(min(TOKEN_BATCH_SIZE, self.window - fifo.tentative_read_pos[self.peer_id]))
+            sent = True
+        if self.chunking is not None:
+            # Found a large token, send its first chunks
+            return self._communicate_chunks() or sent
+        if not sent and fifo.can_read(self.peer_id):
+            if time.time() >= self.time_cont:
+                # Still no credit, probe peer with an empty batch in case its credit was lost
+                self._send_tokens(0)
+                self.time_cont = time.time() + WINDOW_PROBE_INTERVAL
+            self._set_timer(self.time_cont - time.time())
+        return sent
+
     def communicate(self, *args, **kwargs):
+        if self.batch:
+            return self._communicate_window()
         sent = False
         if self.bulk:
             # Send all we have, since other side seems to keep up
@@ -336,7 +634,7 @@ class TunnelOutEndpoint(Endpoint):
             sent = True
             self.time_cont = time.time() + self.backoff
             # Make sure that resend will be tried in backoff seconds
-            self.trigger_loop(self.backoff)
+            self._set_timer(self.backoff)
         return sent
 
     def get_peer(self):
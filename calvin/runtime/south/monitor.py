@@ -14,6 +14,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import heapq
+import itertools
+import time
+
+from calvin.runtime.south.plugins.async import async
 from calvin.utilities.calvinlogger import get_logger
 
 _log = get_logger(__name__)
@@ -21,18 +26,84 @@ _log = get_logger(__name__)
 
 class Event_Monitor(object):
 
+    """
+    Keeps track of the out endpoints that might have something to send.
+
+    Endpoints mark themselves dirty when their port's fifo is written or when
+    the peer replies, and are visited once in the next loop. Endpoints that are
+    waiting (e.g. backoff after a NACK) set a timer instead, and are marked
+    dirty when it expires.
+    """
+
     def __init__(self):
         super(Event_Monitor, self).__init__()
         """docstring for __init__"""
 
         self.out_endpoints = []
+        self._dirty = set()
+        self._timers = []  # heap of (expire time, seq, endpoint)
+        self._timer_at = {}  # key: endpoint, value: earliest expire time
+        self._timer_seq = itertools.count()
+        self._wakeup = None
+        self._wakeup_at = None
+        self._scheduler = None
 
     def register_out_endpoint(self, endpoint):
         self.out_endpoints.append(endpoint)
+        endpoint.monitor = self
+        # Port might already have tokens queued
+        self._dirty.add(endpoint)
 
     def unregister_out_endpoint(self, endpoint):
         self.out_endpoints.remove(endpoint)
+        endpoint.monitor = None
+        self._dirty.discard(endpoint)
+        self._timer_at.pop(endpoint, None)
+
+    def set_dirty(self, endpoint):
+        """ Visit endpoint in the next loop """
+        self._dirty.add(endpoint)
+
+    def set_timer(self, endpoint, delay):
+        """ Visit endpoint once delay seconds have passed """
+        expire = time.time() + delay
+        if self._timer_at.get(endpoint, expire + 1) <= expire:
+            # Visited earlier anyway, and will set a new timer if still needed
+            return
+        self._timer_at[endpoint] = expire
+        heapq.heappush(self._timers, (expire, next(self._timer_seq), endpoint))
+        self._schedule_wakeup()
+
+    def _expire_timers(self):
+        now = time.time()
+        while self._timers and self._timers[0][0] <= now:
+            expire, _, endpoint = heapq.heappop(self._timers)
+            if self._timer_at.get(endpoint) == expire:
+                del self._timer_at[endpoint]
+                self._dirty.add(endpoint)
+
+    def _schedule_wakeup(self):
+        """ Make sure there is a loop when the first timer expires """
+        if not self._timers or self._scheduler is None:
+            return
+        expire = self._timers[0][0]
+        if self._wakeup is not None:
+            if self._wakeup_at <= expire:
+                return
+            self._wakeup.cancel()
+        self._wakeup_at = expire
+        self._wakeup = async.DelayedCall(max(0, expire - time.time()), self._wakeup_loop)
+
+    def _wakeup_loop(self):
+        self._wakeup = None
+        self._scheduler.trigger_loop(actor_ids=[])
 
     def loop(self, scheduler):
-        # Communicate endpoint, see if anyone sent anything
-        return any([endp.communicate() for endp in self.out_endpoints])
+        self._scheduler = scheduler
+        self._expire_timers()
+        # Communicate dirty endpoints, see if anyone sent anything
+        dirty = self._dirty
+        self._dirty = set()
+        activity = any([endp.communicate() for endp in dirty])
+        self._schedule_wakeup()
+        return activity
@@ -14,10 +14,50 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+import threading
+import multiprocessing
+
 from twisted.internet import threads
+from twisted.internet import defer
+from twisted.internet import reactor
 
 # Some callbacks functionallity
 # Thread function
 defer_to_thread = threads.deferToThread
 call_multiple_in_thread = threads.callMultipleInThread
 
+
+def suggest_pool_size(size):
+    """ Set the maximum number of threads used by defer_to_thread """
+    reactor.suggestThreadPoolSize(size)
+
+
+def _wait_for_result(result, timeout, cancelled):
+    """ Waits in a thread of the reactor's pool for the AsyncResult of a process """
+    deadline = None if timeout is None else time.time() + timeout
+    while not result.ready() and not cancelled.is_set():
+        if deadline is not None and time.time() >= deadline:
+            raise multiprocessing.TimeoutError("No result in %s s" % timeout)
+        result.wait(0.5)
+    if cancelled.is_set():
+        return None
+    # Raises the error of func, or the pickling error of its arguments or result
+    return result.get(0)
+
+
+def defer_to_process(pool, func, *args, **kwargs):
+    """ Run func(*args) in a multiprocessing pool, returns a deferred that fires in the reactor thread.
+        The deferred fails when func raises, when its arguments or result can't be pickled and,
+        with multiprocessing.TimeoutError, when there is no result within the timeout keyword
+        argument seconds, as when a worker died. Cancel the deferred when the pool is terminated.
+    """
+    try:
+        result = pool.apply_async(func, args)
+    except Exception:
+        return defer.fail()
+    cancelled = threading.Event()
+    d = defer.Deferred(lambda _: cancelled.set())
+    waiter = threads.deferToThread(_wait_for_result, result, kwargs.get('timeout'), cancelled)
+    waiter.addBoth(lambda reply: None if d.called else d.callback(reply))
+    return d
@@ -36,6 +36,9 @@ from calvin.utilities import calvinlogger
 import base64
 _log = calvinlogger.get_logger(__name__)
 
+# Bytes of keys and values sent in one request of set_many/append_many, rpcudp limits a datagram to 8K
+MANY_REQUEST_BYTES = 6144
+
 # Fix for None types in storage
 class ForgetfulStorageFix(ForgetfulStorage):
     def get(self, key, default=None):
@@ -45,6 +48,23 @@ class ForgetfulStorageFix(ForgetfulStorage):
         return (False, default)
 
 
+class PersistentStorageFix(ForgetfulStorageFix):
+    """ ForgetfulStorageFix with the values kept in a LogStore, hence they survive a restart """
+    def __init__(self, store, ttl=604800):
+        ForgetfulStorageFix.__init__(self, ttl)
+        self.store = store
+        # Same layout, key: (timestamp, value) oldest first
+        self.data = store.data
+
+    def __setitem__(self, key, value):
+        self.store.set(key, value)
+        self.cull()
+
+    def cull(self):
+        for key, _ in list(self.store.iteritems_older_than(self.ttl)):
+            self.store.delete(key)
+
+
 class KademliaProtocolAppend(KademliaProtocol):
 
     def __init__(self, *args, **kwargs):
@@ -143,23 +163,19 @@ class KademliaProtocolAppend(KademliaProtocol):
             return self.rpc_find_node(sender, nodeid, key)
         return { 'value': value }
 
-    def rpc_append(self, sender, nodeid, key, value):
-        source = Node(nodeid, sender[0], sender[1])
-        _log.debug("rpc_append sender=%s, source=%s, key=%s, value=%s" % (sender, source, base64.b64encode(key), str(value)))
-        self.maybeTransferKeyValues(source)
-        self.router.addContact(source)
-
+    def storeAppend(self, key, value):
+        """ Append the JSON coded list value to the set stored at key in this node """
         try:
             pvalue = json.loads(value)
             self.set_keys.add(key)
             if key not in self.storage:
-                _log.debug("%s append key: %s not in storage set value: %s" % (base64.b64encode(nodeid), base64.b64encode(key), pvalue))
+                _log.debug("append key: %s not in storage set value: %s" % (base64.b64encode(key), pvalue))
                 self.storage[key] = value
             else:
                 old_value_ = self.storage[key]
                 old_value = json.loads(old_value_)
                 new_value = list(set(old_value + pvalue))
-                _log.debug("%s append key: %s old: %s add: %s new: %s" % (base64.b64encode(nodeid), base64.b64encode(key), old_value, pvalue, new_value))
+                _log.debug("append key: %s old: %s add: %s new: %s" % (base64.b64encode(key), old_value, pvalue, new_value))
                 self.storage[key] = json.dumps(new_value)
             return True
 
@@ -167,6 +183,13 @@ class KademliaProtocolAppend(KademliaProtocol):
             _log.debug("Trying to append something not a JSON coded list %s" % value, exc_info=True)
             return False
 
+    def rpc_append(self, sender, nodeid, key, value):
+        source = Node(nodeid, sender[0], sender[1])
+        _log.debug("rpc_append sender=%s, source=%s, key=%s, value=%s" % (sender, source, base64.b64encode(key), str(value)))
+        self.maybeTransferKeyValues(source)
+        self.router.addContact(source)
+        return self.storeAppend(key, value)
+
     def callAppend(self, nodeToAsk, key, value):
         address = (nodeToAsk.ip, nodeToAsk.port)
         d = self.append(address, self.sourceNode.id, key, value)
@@ -198,6 +221,52 @@ class KademliaProtocolAppend(KademliaProtocol):
         d = self.remove(address, self.sourceNode.id, key, value)
         return d.addCallback(self.handleCallResponse, nodeToAsk)
 
+    def rpc_store_many(self, sender, nodeid, items):
+        source = Node(nodeid, sender[0], sender[1])
+        _log.debug("rpc_store_many sender=%s, source=%s, nbr keys=%d" % (sender, source, len(items)))
+        self.maybeTransferKeyValues(source)
+        self.router.addContact(source)
+        for key, value in items:
+            self.storage[key] = value
+        return True
+
+    def callStoreMany(self, nodeToAsk, items):
+        """ Store a list of (key, value) in one request """
+        address = (nodeToAsk.ip, nodeToAsk.port)
+        d = self.store_many(address, self.sourceNode.id, items)
+        return d.addCallback(self.handleCallResponse, nodeToAsk)
+
+    def rpc_append_many(self, sender, nodeid, items):
+        source = Node(nodeid, sender[0], sender[1])
+        _log.debug("rpc_append_many sender=%s, source=%s, nbr keys=%d" % (sender, source, len(items)))
+        self.maybeTransferKeyValues(source)
+        self.router.addContact(source)
+        return [self.storeAppend(key, value) for key, value in items]
+
+    def callAppendMany(self, nodeToAsk, items):
+        """ Append to a list of (key, value) in one request """
+        address = (nodeToAsk.ip, nodeToAsk.port)
+        d = self.append_many(address, self.sourceNode.id, items)
+        return d.addCallback(self.handleCallResponse, nodeToAsk)
+
+    def rpc_find_value_many(self, sender, nodeid, keys):
+        source = Node(nodeid, sender[0], sender[1])
+        _log.debug("rpc_find_value_many sender=%s, source=%s, nbr keys=%d" % (sender, source, len(keys)))
+        self.maybeTransferKeyValues(source)
+        self.router.addContact(source)
+        found = []
+        for key in keys:
+            exists, value = self.storage.get(key, None)
+            if exists:
+                found.append((key, value))
+        return found
+
+    def callFindValueMany(self, nodeToAsk, keys):
+        """ Ask for the values of a list of keys in one request, replies with the (key, value) found """
+        address = (nodeToAsk.ip, nodeToAsk.port)
+        d = self.find_value_many(address, self.sourceNode.id, keys)
+        return d.addCallback(self.handleCallResponse, nodeToAsk)
+
 
 class AppendServer(Server):
 
@@ -235,20 +304,7 @@ class AppendServer(Server):
         def append_(nodes):
             # if this node is close too, then store here as well
             if self.node.distanceTo(node) < max([n.distanceTo(node) for n in nodes]):
-                try:
-                    pvalue = json.loads(value)
-                    self.set_keys.add(dkey)
-                    if dkey not in self.storage:
-                        _log.debug("%s local append key: %s not in storage set value: %s" % (base64.b64encode(node.id), base64.b64encode(dkey), pvalue))
-                        self.storage[dkey] = value
-                    else:
-                        old_value_ = self.storage[dkey]
-                        old_value = json.loads(old_value_)
-                        new_value = list(set(old_value + pvalue))
-                        _log.debug("%s local append key: %s old: %s add: %s new: %s" % (base64.b64encode(node.id), base64.b64encode(dkey), old_value, pvalue, new_value))
-                        self.storage[dkey] = json.dumps(new_value)
-                except:
-                    _log.debug("Trying to append something not a JSON coded list %s" % value, exc_info=True)
+                self.protocol.storeAppend(dkey, value)
             ds = [self.protocol.callAppend(n, dkey, value) for n in nodes]
             return defer.DeferredList(ds).addCallback(self._anyRespondSuccess)
 
@@ -314,6 +370,130 @@ class AppendServer(Server):
         spider = NodeSpiderCrawl(self.protocol, node, nearest, self.ksize, self.alpha)
         return spider.find().addCallback(remove_)
 
+    def _group_by_node(self, keys):
+        """
+        Group keys by the nodes in the routing table closest to them, without crawling the network.
+        Only a full routing table, ksize neighbors of the key, is trusted to hold the closest nodes,
+        as a crawl would find them. Otherwise, as in a runtime that just bootstrapped, the key is
+        left to be crawled.
+
+        Returns a dict of node id: (node, [keys]), the keys this node should store as well and
+        the keys to crawl.
+        """
+        groups = {}
+        local = []
+        crawl = []
+        for key in keys:
+            keynode = Node(digest(key))
+            nearest = self.protocol.router.findNeighbors(keynode)
+            if len(nearest) < self.ksize:
+                crawl.append(key)
+                continue
+            if self.node.distanceTo(keynode) < max([n.distanceTo(keynode) for n in nearest]):
+                local.append(key)
+            for n in nearest:
+                groups.setdefault(n.id, (n, []))[1].append(key)
+        return groups, local, crawl
+
+    def _many(self, items, groups, crawl, call_many, call_one):
+        """
+        Send the (key, value) items in requests of at most MANY_REQUEST_BYTES, one or more per node
+        in groups. The crawl keys and values too large for a request use call_one(key, value).
+        Returns a deferred dict of key: True if any node accepted it.
+        """
+        results = dict.fromkeys(items, False)
+
+        def accepted(result, keys):
+            if result[0]:
+                for key in keys:
+                    results[key] = True
+
+        def accepted_one(result, key):
+            results[key] = results[key] or bool(result)
+
+        ds = []
+        large = set(crawl)
+        for node, keys in groups.itervalues():
+            chunk = []
+            size = 0
+            for key in keys:
+                item_size = len(items[key] or "") + 64
+                if item_size > MANY_REQUEST_BYTES:
+                    large.add(key)
+                    continue
+                if size + item_size > MANY_REQUEST_BYTES:
+                    ds.append(call_many(node, [(digest(k), items[k]) for k in chunk]).addCallback(accepted, chunk))
+                    chunk = []
+                    size = 0
+                chunk.append(key)
+                size += item_size
+            if chunk:
+                ds.append(call_many(node, [(digest(k), items[k]) for k in chunk]).addCallback(accepted, chunk))
+        for key in large:
+            ds.append(call_one(key, items[key]).addCallback(accepted_one, key))
+        return defer.DeferredList(ds).addCallback(lambda _: results)
+
+    def set_many(self, items):
+        """
+        Set several keys given as a dict, grouped into one request per responsible node.
+
+        Returns a deferred dict of key: True if stored at any node.
+        """
+        groups, local, crawl = self._group_by_node(items.keys())
+        for key in local:
+            self.storage[digest(key)] = items[key]
+        return self._many(items, groups, crawl, self.protocol.callStoreMany, self.set)
+
+    def append_many(self, items):
+        """
+        For several keys append the given list values to the sets in the network, items is a dict of
+        key: JSON coded list, grouped into one request per responsible node.
+
+        Returns a deferred dict of key: True if appended at any node.
+        """
+        groups, local, crawl = self._group_by_node(items.keys())
+        for key in local:
+            self.protocol.storeAppend(digest(key), items[key])
+        return self._many(items, groups, crawl, self.protocol.callAppendMany, self.append)
+
+    def get_many(self, keys):
+        """
+        Get several keys, the keys not found in this node are asked for in one request to the
+        closest node in the routing table for each, then the remaining ones one at a time.
+
+        Returns a deferred dict of key: value, None if not found.
+        """
+        results = {}
+        missing = {}
+        for key in keys:
+            exists, value = self.storage.get(digest(key))
+            if exists:
+                results[key] = value
+            else:
+                missing[digest(key)] = key
+
+        groups = {}
+        for dkey, key in missing.iteritems():
+            nearest = self.protocol.router.findNeighbors(Node(dkey), k=1)
+            if nearest:
+                groups.setdefault(nearest[0].id, (nearest[0], []))[1].append(dkey)
+
+        def found(result):
+            if result[0]:
+                for dkey, value in result[1]:
+                    key = missing.pop(dkey, None)
+                    if key is not None:
+                        results[key] = value
+
+        def get_remaining(_):
+            def found_one(value, key):
+                results[key] = value
+            ds = [self.get(key).addCallback(found_one, key) for key in missing.itervalues()]
+            return defer.DeferredList(ds).addCallback(lambda _: results)
+
+        ds = [self.protocol.callFindValueMany(node, dkeys).addCallback(found) for node, dkeys in groups.itervalues()]
+        return defer.DeferredList(ds).addCallback(get_remaining)
+
     def get_concat(self, key):
         """
         Get a key if the network has it. Assuming it is a list that should be combined.
@@ -21,11 +21,12 @@ import Queue
 
 from twisted.internet import reactor, defer, threads
 
-from calvin.runtime.south.plugins.storage.twistedimpl.dht.append_server import AppendServer
+from calvin.runtime.south.plugins.storage.twistedimpl.dht.append_server import AppendServer, PersistentStorageFix
 from calvin.runtime.south.plugins.storage.twistedimpl.dht.service_discovery_ssdp import SSDPServiceDiscovery
 from calvin.runtime.north.plugins.storage.storage_base import StorageBase
 from calvin.utilities import calvinlogger
 from calvin.utilities import calvinconfig
+from calvin.utilities.logstore import LogStore, store_path
 
 _conf = calvinconfig.get()
 _log = calvinlogger.get_logger(__name__)
@@ -128,11 +129,13 @@ class TwistedWaitObject(object):
 
 
 class AutoDHTServer(StorageBase):
-    def __init__(self):
+    def __init__(self, node=None):
         super(AutoDHTServer, self).__init__()
+        self.node = node
         self.dht_server = None
         self._ssdps = None
         self._started = False
+        self._store = None
 
     def start(self, iface='', network=None, bootstrap=None, cb=None, name=None):
         if bootstrap is None:
@@ -141,7 +144,15 @@ class AutoDHTServer(StorageBase):
         if network is None:
             network = _conf.get_in_order("dht_network_filter", "ALL")
 
-        self.dht_server = ServerApp(AppendServer)
+        # Named after the node, since the name given falls back on the id which is new every start
+        path = store_path(self.node.attributes.get_node_name_as_str(), 'dht') if self.node else None
+        if path:
+            # Values stored at this node survive a restart
+            self._store = LogStore(path, sync_delay=_conf.get(None, 'storage_sync_delay'),
+                                   sync_count=_conf.get(None, 'storage_sync_count') or 1000)
+            self.dht_server = ServerApp(lambda: AppendServer(storage=PersistentStorageFix(self._store)))
+        else:
+            self.dht_server = ServerApp(AppendServer)
         ip, port = self.dht_server.start(iface=iface)
 
         dlist = []
@@ -201,6 +212,21 @@ class AutoDHTServer(StorageBase):
     def remove(self, key, value, cb=None):
         return TwistedWaitObject(self.dht_server.remove, key=key, value=value, cb=cb)
 
+    def _many_cb(self, results, cb):
+        if cb:
+            for key, value in results.iteritems():
+                cb(key, value)
+        return results
+
+    def set_many(self, items, cb=None):
+        return self.dht_server.set_many(items).addCallback(self._many_cb, cb)
+
+    def get_many(self, keys, cb=None):
+        return self.dht_server.get_many(keys).addCallback(self._many_cb, cb)
+
+    def append_many(self, items, cb=None):
+        return self.dht_server.append_many(items).addCallback(self._many_cb, cb)
+
     def bootstrap(self, addrs, cb=None):
         return TwistedWaitObject(self.dht_server.bootstrap, addr=addrs, cb=cb)
 
@@ -208,6 +234,9 @@ class AutoDHTServer(StorageBase):
         return self._ssdps.stop_search()
 
     def stop(self, cb=None):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
         d1 = self.dht_server.stop()
         d2 = self._ssdps.stop()
 
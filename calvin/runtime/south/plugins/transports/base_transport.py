@@ -16,14 +16,19 @@
 
 from calvin.utilities.calvin_callback import CalvinCBClass
 from calvin.runtime.north.plugins.coders.messages import message_coder_factory
+from calvin.runtime.north.plugins.coders.negotiators import negotiator_factory
+from calvin.utilities import calvinconfig
 
 from urlparse import urlparse
 
+_conf = calvinconfig.get()
+
 
 class URI(object):
     def __init__(self, uri):
         self.uri = uri
         self.port = None
+        self.path = None
         schema, peer_addr = uri.split(':', 1)
         if schema == 'calvinbt':
             data = uri.split(":")
@@ -36,6 +41,8 @@ class URI(object):
             self.scheme = url.scheme
             self.port = url.port
             self.hostname = url.hostname
+            # Used by transports addressed by a file system path, e.g. unix sockets
+            self.path = url.path
 
     def geturl(self):
         return self.uri
@@ -56,11 +63,13 @@ class BaseTransport(CalvinCBClass):
 
         # Override the setting of these in subclass
         self._coder = None                     # Active coder set for transport
+        self._negotiator = negotiator_factory.get(_conf.get(None, 'remote_coder_negotiator'))
         self._rtt = 2000                       # round trip time on ms
         self._timeout = self._rtt * 2          # Time out for connect and replys
         self._uri = split_uri(remote_uri)      # get a URI object
         self._rt_id = local_id
         self._remote_rt_id = None
+        self._link_name = None                 # Name of a data link, None for the control link
 
     def connect(self, timeout=2):
         """
@@ -99,6 +108,25 @@ class BaseTransport(CalvinCBClass):
         """
         return self._coder
 
+    def get_negotiator(self):
+        """
+            Return the negotiator selecting the coder to use with the peer
+        """
+        return self._negotiator
+
+    def get_link_name(self):
+        """
+            Return the name of the data link this transport carries,
+            None when it is the runtime to runtime control link
+        """
+        return self._link_name
+
+    def get_stats(self):
+        """
+            Return a dictionary of transport counters, e.g. bytes sent
+        """
+        return {}
+
     def get_coders(self):
         """
             Return the filtered coders on this transport
@@ -33,7 +33,7 @@ class CalvinTransportFactory(base_transport.BaseTransportFactory):
     def _peer_connected(self):
         pass
 
-    def join(self, uri):
+    def join(self, uri, link_name=None):
         """docstring for join"""
         schema, peer_addr = uri.split(':', 1)
         if schema != 'calvinbt':
@@ -41,7 +41,7 @@ class CalvinTransportFactory(base_transport.BaseTransportFactory):
 
         try:
             tp = twisted_transport.CalvinTransport(self._rt_id, uri, self._callbacks,
-                                                   TwistedCalvinTransport)
+                                                   TwistedCalvinTransport, link_name=link_name)
             self._peers[peer_addr] = tp
             tp.connect()
             # self._callback_execute('join_finished', peer_id, tp)
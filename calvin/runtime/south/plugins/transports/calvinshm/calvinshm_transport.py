@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from twisted.twisted_transport import TwistedCalvinServer, TwistedCalvinTransport
+from calvin.runtime.south.plugins.transports.lib.twisted import unix_transport
+
+
+class CalvinTransportFactory(unix_transport.UnixTransportFactory):
+
+    """
+    Transport between runtimes on the same host, uris are the path of the
+    listening unix socket, e.g. calvinshm:///tmp/runtime1.sock
+    """
+
+    scheme = 'calvinshm'
+    server_transport = TwistedCalvinServer
+    client_transport = TwistedCalvinTransport
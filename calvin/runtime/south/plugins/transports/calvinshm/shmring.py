@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Single producer, single consumer ring buffer of messages in a memory mapped file.
+
+The producer creates the file and the consumer, another process on the same
+host, maps it by path. Header (little endian):
+
+    0   write position (uint64), only updated by the producer
+    8   read position (uint64), only updated by the consumer
+    16  consumer waiting flag (uint32), consumer needs a wakeup when data is written
+    20  producer waiting flag (uint32), producer needs a wakeup when space is freed
+
+The positions increase monotonically, the data offset is the position modulo
+the capacity. Each message is stored as a uint32 length followed by the data,
+possibly wrapping around the end of the data area.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+
+_POS = struct.Struct('<Q')
+_FLAG = struct.Struct('<I')
+_LEN = struct.Struct('<I')
+
+_WRITE_POS = 0
+_READ_POS = 8
+_CONSUMER_WAITING = 16
+_PRODUCER_WAITING = 20
+HEADER_SIZE = 64
+
+
+def _shm_dir():
+    """ Prefer a memory backed file system for the ring files """
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class ShmRing(object):
+
+    """
+    A ring buffer mapped from path, create() or attach() one.
+    """
+
+    def __init__(self, path, capacity, fd):
+        super(ShmRing, self).__init__()
+        self.path = path
+        self.capacity = capacity
+        self._mm = mmap.mmap(fd, HEADER_SIZE + capacity)
+        os.close(fd)
+
+    @classmethod
+    def create(cls, capacity):
+        """ Create a new ring file as producer """
+        fd, path = tempfile.mkstemp(prefix='calvinshm-', dir=_shm_dir())
+        os.ftruncate(fd, HEADER_SIZE + capacity)
+        return cls(path, capacity, fd)
+
+    @classmethod
+    def attach(cls, path):
+        """ Map an existing ring file as consumer """
+        fd = os.open(path, os.O_RDWR)
+        capacity = os.fstat(fd).st_size - HEADER_SIZE
+        return cls(path, capacity, fd)
+
+    def unlink(self):
+        """ Remove the file, the mappings stay valid """
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        self._mm.close()
+
+    def _get(self, offset, fmt=_POS):
+        return fmt.unpack_from(self._mm, offset)[0]
+
+    def _set(self, offset, value, fmt=_POS):
+        fmt.pack_into(self._mm, offset, value)
+
+    def _copy_in(self, pos, data):
+        start = pos % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._mm[HEADER_SIZE + start:HEADER_SIZE + start + first] = data[:first]
+        if first < len(data):
+            self._mm[HEADER_SIZE:HEADER_SIZE + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos, length):
+        start = pos % self.capacity
+        first = min(length, self.capacity - start)
+        data = self._mm[HEADER_SIZE + start:HEADER_SIZE + start + first]
+        if first < length:
+            data += self._mm[HEADER_SIZE:HEADER_SIZE + length - first]
+        return data
+
+    def fits(self, data):
+        """ True if data is small enough to ever fit in the ring """
+        return _LEN.size + len(data) <= self.capacity
+
+    def free(self):
+        return self.capacity - (self._get(_WRITE_POS) - self._get(_READ_POS))
+
+    def is_empty(self):
+        return self._get(_WRITE_POS) == self._get(_READ_POS)
+
+    def write(self, data):
+        """
+        Producer: append a message, returns False when there is no room. The
+        consumer then gets asked to wake up the producer when it frees space.
+        """
+        need = _LEN.size + len(data)
+        if need > self.free():
+            self._set(_PRODUCER_WAITING, 1, _FLAG)
+            # Consumer might have read everything just before the flag was set
+            if need > self.free():
+                return False
+            self._set(_PRODUCER_WAITING, 0, _FLAG)
+        pos = self._get(_WRITE_POS)
+        self._copy_in(pos, _LEN.pack(len(data)) + data)
+        self._set(_WRITE_POS, pos + need)
+        return True
+
+    def read(self):
+        """ Consumer: return the next message, or None when empty """
+        pos = self._get(_READ_POS)
+        if pos == self._get(_WRITE_POS):
+            return None
+        length = _LEN.unpack(self._copy_out(pos, _LEN.size))[0]
+        data = self._copy_out(pos + _LEN.size, length)
+        self._set(_READ_POS, pos + _LEN.size + length)
+        return data
+
+    def wait_for_data(self):
+        """
+        Consumer: ask for a wakeup when data is written. Returns False if data
+        arrived in the meantime, i.e. the consumer should keep reading instead.
+        """
+        self._set(_CONSUMER_WAITING, 1, _FLAG)
+        if self.is_empty():
+            return True
+        self._set(_CONSUMER_WAITING, 0, _FLAG)
+        return False
+
+    def consumer_waiting(self):
+        """ Producer: returns True, and clears the flag, if the consumer needs a wakeup """
+        if self._get(_CONSUMER_WAITING, _FLAG):
+            self._set(_CONSUMER_WAITING, 0, _FLAG)
+            return True
+        return False
+
+    def producer_waiting(self):
+        """ Consumer: returns True, and clears the flag, if the producer needs a wakeup """
+        if self._get(_PRODUCER_WAITING, _FLAG):
+            self._set(_PRODUCER_WAITING, 0, _FLAG)
+            return True
+        return False
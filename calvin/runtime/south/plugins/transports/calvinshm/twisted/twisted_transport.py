@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import collections
+
+from calvin.utilities.calvin_callback import CalvinCB, CalvinCBClass
+from calvin.utilities import calvinlogger
+from calvin.utilities import calvinconfig
+from calvin.runtime.south.plugins.transports.lib.twisted import base_transport
+from calvin.runtime.south.plugins.transports.lib.twisted import unix_transport
+from calvin.runtime.south.plugins.transports.calvinshm import shmring
+
+from twisted.protocols.basic import Int32StringReceiver
+from twisted.internet import reactor, protocol
+
+_log = calvinlogger.get_logger(__name__)
+_conf = calvinconfig.get()
+
+# Kinds of strings on the unix socket, first byte
+_RING = 'R'      # path of the sender's outgoing ring
+_MAPPED = 'M'    # peer has mapped our ring, the file can be removed
+_DATA = 'D'      # wakeup, messages written to the ring
+_SPACE = 'S'     # wakeup, space freed in the ring
+_INLINE = 'I'    # message too large for the ring
+
+# An empty record in the ring marks the place of the next inline message,
+# which keeps the messages in order. Empty messages are also sent inline.
+_INLINE_MARKER = ''
+
+# Seconds between checks of the rings, in case a wakeup was missed
+POLL_INTERVAL = 1.0
+
+
+class ShmProtocol(CalvinCBClass, Int32StringReceiver):
+
+    """
+    Messages are written to a pair of memory mapped rings, one in each
+    direction. The unix socket only carries the ring setup, wakeups of a
+    waiting peer and messages too large for the ring. A message sent on
+    the socket is delivered when its marker is read from the ring. The
+    'connected' callback is executed when both rings are mapped.
+    """
+
+    def __init__(self, callbacks):
+        super(ShmProtocol, self).__init__(callbacks)
+        self._out = None
+        self._in = None
+        self._out_mapped = False
+        self._backlog = collections.deque()
+        self._inline = collections.deque()  # inline messages received, waiting for their markers
+        self._marker_read = False  # a marker was read before its inline message was received
+        self._poll = None
+        self._callback_execute('set_proto', self)
+
+    def connectionMade(self):
+        self._out = shmring.ShmRing.create(_conf.get(None, 'shm_ring_size') or 1048576)
+        self.sendString(_RING + self._out.path)
+
+    def connectionLost(self, reason):
+        if self._poll is not None and self._poll.active():
+            self._poll.cancel()
+        self._poll = None
+        if self._out is not None:
+            if not self._out_mapped:
+                self._out.unlink()
+            self._out.close()
+            self._out = None
+        if self._in is not None:
+            self._in.close()
+            self._in = None
+        self._callback_execute('disconnected', reason)
+
+    def is_ready(self):
+        return self._in is not None and self._out_mapped
+
+    def stringReceived(self, data):
+        kind = data[:1]
+        if kind == _DATA:
+            self._drain()
+        elif kind == _SPACE:
+            self._flush_backlog()
+        elif kind == _INLINE:
+            # Delivered when its marker is read, after the messages written to the ring before it
+            self._inline.append(data[1:])
+            self._drain()
+        elif kind == _RING:
+            self._in = shmring.ShmRing.attach(data[1:])
+            self.sendString(_MAPPED)
+            self._check_ready()
+        elif kind == _MAPPED:
+            self._out.unlink()
+            self._out_mapped = True
+            self._check_ready()
+
+    def _check_ready(self):
+        if not self.is_ready():
+            return
+        self._callback_execute('connected', self)
+        self._poll_rings()
+
+    def _poll_rings(self):
+        self._drain()
+        self._flush_backlog()
+        if self._in is not None:
+            self._poll = reactor.callLater(POLL_INTERVAL, self._poll_rings)
+
+    def _drain(self):
+        """ Deliver all messages in the incoming ring """
+        if self._marker_read:
+            if not self._inline:
+                return
+            self._marker_read = False
+            self._callback_execute('data', self._inline.popleft())
+        while self._in is not None:
+            data = self._in.read()
+            if data is None:
+                if self._in.producer_waiting():
+                    self.sendString(_SPACE)
+                if self._in.wait_for_data():
+                    break
+                continue
+            if data == _INLINE_MARKER:
+                if not self._inline:
+                    # Wait for the inline message on the socket
+                    self._marker_read = True
+                    return
+                data = self._inline.popleft()
+            self._callback_execute('data', data)
+
+    def _write(self, data):
+        if not data or not self._out.fits(data):
+            if not self._out.write(_INLINE_MARKER):
+                return False
+            self.sendString(_INLINE + data)
+            if self._out.consumer_waiting():
+                self.sendString(_DATA)
+            return True
+        if not self._out.write(data):
+            return False
+        if self._out.consumer_waiting():
+            self.sendString(_DATA)
+        return True
+
+    def _flush_backlog(self):
+        while self._backlog and self.is_ready():
+            if not self._write(self._backlog[0]):
+                break
+            self._backlog.popleft()
+
+    def send_message(self, data):
+        """ Send a message, queued locally until there is room in the ring """
+        if self._backlog or not self.is_ready() or not self._write(data):
+            self._backlog.append(data)
+
+
+class ShmServerFactory(protocol.ServerFactory):
+    protocol = ShmProtocol
+
+    def __init__(self, callbacks):
+        # For the protocol
+        self._callbacks = callbacks
+
+    def buildProtocol(self, addr):
+        proto = self.protocol(self._callbacks)
+        return proto
+
+
+# Server
+class TwistedCalvinServer(unix_transport.UnixCalvinServer):
+
+    scheme = 'calvinshm'
+    server_factory = ShmServerFactory
+
+
+# Client
+class TwistedCalvinTransport(base_transport.CalvinTransportBase):
+    def __init__(self, host, port, callbacks=None, proto=None, path=None, *args, **kwargs):
+        super(TwistedCalvinTransport, self).__init__(host, port, callbacks=callbacks)
+        self._path = path
+        self._proto = proto
+        self._factory = None
+
+        # Server created us already have a proto
+        if proto:
+            proto.callback_register('connected', CalvinCB(self._connected))
+            proto.callback_register('disconnected', CalvinCB(self._disconnected))
+            proto.callback_register('data', CalvinCB(self._data))
+
+        self._callbacks = callbacks
+
+    def is_connected(self):
+        return self._proto is not None
+
+    def disconnect(self):
+        if self._proto:
+            self._proto.transport.loseConnection()
+
+    def send(self, data):
+        if self._proto:
+            self._proto.send_message(data)
+
+    def join(self):
+        if self._proto:
+            raise Exception("Already connected")
+
+        # Own callbacks
+        callbacks = {'connected': [CalvinCB(self._connected)],
+                     'disconnected': [CalvinCB(self._disconnected)],
+                     'data': [CalvinCB(self._data)],
+                     'set_proto': [CalvinCB(self._set_proto)]}
+
+        self._factory = ShmClientFactory(callbacks)
+        reactor.connectUNIX(self._path, self._factory)
+
+    def _set_proto(self, proto):
+        _log.debug("%s, %s, %s" % (self, '_set_proto', proto))
+        if self._proto:
+            _log.error("_set_proto: Already connected")
+            return
+        self._proto = proto
+
+    def _connected(self, proto):
+        _log.debug("%s, %s" % (self, 'connected'))
+        self._callback_execute('connected')
+
+    def _disconnected(self, reason):
+        _log.debug("%s, %s, %s" % (self, 'disconnected', reason))
+        self._callback_execute('disconnected', str(reason))
+
+    def _data(self, data):
+        self._callback_execute('data', data)
+
+
+class ShmClientFactory(protocol.ClientFactory):
+    protocol = ShmProtocol
+
+    def __init__(self, callbacks):
+        # For the protocol
+        self._callbacks = callbacks
+
+    def startedConnecting(self, connector):
+        pass
+
+    def buildProtocol(self, addr):
+        proto = self.protocol(self._callbacks)
+        return proto
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from calvin.utilities.calvin_callback import CalvinCB
+from calvin.utilities import calvinlogger
+from calvin.runtime.south.plugins.transports.lib.twisted import unix_transport
+from calvin.runtime.south.plugins.transports.calvinip.twisted import twisted_transport as calvinip_transport
+
+from twisted.internet import reactor
+
+_log = calvinlogger.get_logger(__name__)
+
+
+# Server
+class TwistedCalvinServer(unix_transport.UnixCalvinServer):
+    """
+    Same framing and protocol as calvinip, over a unix domain socket
+    """
+
+    scheme = 'calvinunix'
+    server_factory = calvinip_transport.TCPServerFactory
+
+
+# Client
+class TwistedCalvinTransport(calvinip_transport.TwistedCalvinTransport):
+    def __init__(self, host, port, callbacks=None, proto=None, path=None, *args, **kwargs):
+        super(TwistedCalvinTransport, self).__init__(host, port, callbacks=callbacks, proto=proto)
+        self._path = path
+
+    def join(self):
+        if self._proto:
+            raise Exception("Already connected")
+
+        # Own callbacks
+        callbacks = {'connected': [CalvinCB(self._connected)],
+                     'disconnected': [CalvinCB(self._disconnected)],
+                     'data': [CalvinCB(self._data)],
+                     'set_proto': [CalvinCB(self._set_proto)]}
+
+        self._factory = calvinip_transport.TCPClientFactory(callbacks)
+        reactor.connectUNIX(self._path, self._factory)
@@ -14,28 +14,85 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import struct
+import zlib
+
 from calvin.utilities.calvin_callback import CalvinCB
 from calvin.utilities import calvinlogger
 from calvin.utilities import calvinuuid
+from calvin.utilities import calvinconfig
+from calvin.runtime.south.plugins.async import async
 from calvin.runtime.south.plugins.transports import base_transport
 
 _log = calvinlogger.get_logger(__name__)
-
-_join_request_reply = {'cmd': 'JOIN_REPLY', 'id': None, 'sid': None, 'serializer': None}
-_join_request = {'cmd': 'JOIN_REQUEST', 'id': None, 'sid': None, 'serializers': []}
+_conf = calvinconfig.get()
+
+_join_request_reply = {'cmd': 'JOIN_REPLY', 'id': None, 'sid': None, 'serializer': None, 'coalesce': True,
+                       'compression': []}
+_join_request = {'cmd': 'JOIN_REQUEST', 'id': None, 'sid': None, 'serializers': [], 'coalesce': True,
+                 'compression': []}
+
+# A coalesced frame is this marker followed by length prefixed encoded messages,
+# no coder produces a message starting with a NUL byte
+_MULTI_FRAME = '\x00M'
+_MULTI_LEN = struct.Struct('!I')
+# A compressed frame is this marker followed by the compressed frame
+_COMPRESSED_FRAME = '\x00Z'
+# Compression codecs we can decompress, announced in the join
+_COMPRESSION = {'zlib': (zlib.compress, zlib.decompress)}
+
+
+def pack_messages(raw_payloads):
+    """ Frame several encoded messages as one """
+    return _MULTI_FRAME + ''.join([_MULTI_LEN.pack(len(raw)) + raw for raw in raw_payloads])
+
+
+def unpack_messages(data):
+    """ Split a frame into encoded messages, returns None if data is a single message """
+    if not data.startswith(_MULTI_FRAME):
+        return None
+    raw_payloads = []
+    pos = len(_MULTI_FRAME)
+    while pos < len(data):
+        length, = _MULTI_LEN.unpack_from(data, pos)
+        pos += _MULTI_LEN.size
+        raw_payloads.append(data[pos:pos + length])
+        pos += length
+    return raw_payloads
 
 
 class CalvinTransport(base_transport.BaseTransport):
-    def __init__(self, rt_id, remote_uri, callbacks, transport, proto=None):
+    def __init__(self, rt_id, remote_uri, callbacks, transport, proto=None, link_name=None):
         """docstring for __init__"""
         super(CalvinTransport, self).__init__(rt_id, remote_uri, callbacks=callbacks)
 
         self._rt_id = rt_id
         self._remote_rt_id = None
+        # Set when joining a data link, for incoming connections it is given by the join request
+        self._link_name = link_name
         self._coder = None
-        self._transport = transport(self._uri.hostname, self._uri.port, callbacks, proto=proto)
+        self._transport = transport(self._uri.hostname, self._uri.port, callbacks,
+                                    proto=proto, path=self._uri.path)
         self._rtt = 2000  # Init rt in ms
 
+        # Outgoing messages are coalesced when enabled and the peer can unpack them
+        self._coalesce = _conf.get(None, 'link_coalescing')
+        self._coalesce_delay = _conf.get(None, 'link_coalescing_delay') or 0.0
+        self._coalesce_bytes = _conf.get(None, 'link_coalescing_bytes') or 32768
+        self._peer_coalesce = False
+        self._send_queue = []
+        self._send_queue_bytes = 0
+        self._flush_timer = None
+
+        # Frames above the threshold are compressed when enabled and the peer can decompress them
+        self._compression = _conf.get(None, 'link_compression')
+        self._compression_threshold = _conf.get(None, 'link_compression_threshold') or 0
+        self._compression_level = _conf.get(None, 'link_compression_level') or 1
+        self._peer_compression = []
+        # Bytes of frames before and after compression, in both directions
+        self._stats = {'sent_bytes': 0, 'sent_wire_bytes': 0, 'received_bytes': 0, 'received_wire_bytes': 0,
+                       'compressed_frames': 0}
+
         # TODO: This should be incoming param
         self._verify_client = lambda x: True
 
@@ -59,6 +116,7 @@ class CalvinTransport(base_transport.BaseTransport):
     def disconnect(self, timeout=10):
         # TODO: Set timepout
         if self._transport.is_connected():
+            self.flush()
             self._transport.disconnect()
 
     def is_connected(self):
@@ -72,9 +130,13 @@ class CalvinTransport(base_transport.BaseTransport):
             # Send
             raw_payload = tcoder.encode(payload)
 
-            _log.debug('raw_send_message %s => %s "%s"' % (self._rt_id, self._remote_rt_id, raw_payload))
+            _log.debug('raw_send_message %s => %s %r' % (self._rt_id, self._remote_rt_id, raw_payload))
             self._callback_execute('raw_send_message', self, raw_payload)
-            self._transport.send(raw_payload)
+            if self._coalesce and self._peer_coalesce and coder is None:
+                self._queue(raw_payload)
+            else:
+                # Join messages are sent uncompressed
+                self._send_frame(raw_payload, compress=coder is None)
             # TODO: Set timeout of send
             return True
         except:
@@ -82,6 +144,53 @@ class CalvinTransport(base_transport.BaseTransport):
             _log.error("Payload = '%s'" % repr(payload))
         return False
 
+    def _queue(self, raw_payload):
+        """ Queue an encoded message, it is sent with any other messages queued
+            within the coalescing delay or when the queue would exceed the byte bound.
+        """
+        if self._send_queue_bytes + len(raw_payload) > self._coalesce_bytes:
+            self.flush()
+            if len(raw_payload) >= self._coalesce_bytes:
+                self._send_frame(raw_payload)
+                return
+        self._send_queue.append(raw_payload)
+        self._send_queue_bytes += len(raw_payload)
+        if self._flush_timer is None:
+            self._flush_timer = async.DelayedCall(self._coalesce_delay, self.flush)
+
+    def flush(self):
+        """ Send any queued messages, as one frame if more than one """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        queue = self._send_queue
+        if not queue:
+            return
+        self._send_queue = []
+        self._send_queue_bytes = 0
+        try:
+            self._send_frame(queue[0] if len(queue) == 1 else pack_messages(queue))
+        except:
+            _log.exception("Send of %d queued messages failed!!" % len(queue))
+
+    def _send_frame(self, data, compress=True):
+        """ Send a frame, compressed when negotiated with the peer and above the threshold """
+        self._stats['sent_bytes'] += len(data)
+        if compress and self._compression in self._peer_compression and len(data) >= self._compression_threshold:
+            compressed = _COMPRESSED_FRAME + _COMPRESSION[self._compression][0](data, self._compression_level)
+            # Not worth it for incompressible data, e.g. already compressed images
+            if len(compressed) < len(data):
+                data = compressed
+                self._stats['compressed_frames'] += 1
+        self._stats['sent_wire_bytes'] += len(data)
+        self._transport.send(data)
+
+    def get_stats(self):
+        """ Counters of bytes of frames before (sent_bytes, received_bytes) and after compression
+            (sent_wire_bytes, received_wire_bytes) and the number of frames sent compressed.
+        """
+        return dict(self._stats)
+
     def _get_join_coder(self):
         return self.get_coders()['json']
 
@@ -93,7 +202,9 @@ class CalvinTransport(base_transport.BaseTransport):
         msg = _join_request
         msg['id'] = self._rt_id
         msg['sid'] = self._get_msg_uuid()
-        msg['serializers'] = self.get_coders().keys()
+        msg['serializers'] = self.get_negotiator().get_list()
+        msg['link'] = self._link_name
+        msg['compression'] = _COMPRESSION.keys()
         self.send(msg, coder=self._get_join_coder())
 
     def _send_join_reply(self, _id, serializer, sid):
@@ -101,6 +212,7 @@ class CalvinTransport(base_transport.BaseTransport):
         msg['id'] = self._rt_id
         msg['sid'] = sid
         msg['serializer'] = serializer
+        msg['compression'] = _COMPRESSION.keys()
         self.send(msg, coder=self._get_join_coder())
 
     def _handle_join(self, data):
@@ -114,17 +226,19 @@ class CalvinTransport(base_transport.BaseTransport):
 
             sid = data_obj['sid']
 
-            for coder in self.get_coders():
-                if coder in data_obj['serializers']:
-                    self._coder = self.get_coders()[coder]
-                    coder_name = coder
-                    break
+            # Pick the best coder that both ends support
+            coder_name = self.get_negotiator().select(data_obj['serializers'])
+            if coder_name is not None:
+                self._coder = self.get_coders()[coder_name]
 
             # Verify remote
             valid = self._verify_client(data_obj)
             # TODO: Callback or use join_finished
             if valid:
                 self._remote_rt_id = data_obj['id']
+                self._peer_coalesce = data_obj.get('coalesce', False)
+                self._peer_compression = data_obj.get('compression', [])
+                self._link_name = data_obj.get('link')
 
         except:
             _log.exception("_handle_join: Failed!!")
@@ -152,6 +266,8 @@ class CalvinTransport(base_transport.BaseTransport):
             if data_obj['id'] is not None:
                 # Request denied
                 self._remote_rt_id = data_obj['id']
+                self._peer_coalesce = data_obj.get('coalesce', False)
+                self._peer_compression = data_obj.get('compression', [])
         except:
             _log.exception("_handle_join: Failed!!")
             # TODO: disconnect ?
@@ -161,6 +277,11 @@ class CalvinTransport(base_transport.BaseTransport):
 
     def _disconnected(self, reason):
         # TODO: unify reason
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._send_queue = []
+        self._send_queue_bytes = 0
         self._callback_execute('peer_disconnected', self, self._remote_rt_id, reason)
 
     def _data_received(self, data):
@@ -175,9 +296,17 @@ class CalvinTransport(base_transport.BaseTransport):
 
         # TODO: How to error this
         data_obj = None
-        # decode
+        # decode, a coalesced frame is passed on as a list of messages
         try:
-            data_obj = self._coder.decode(data)
+            self._stats['received_wire_bytes'] += len(data)
+            if data.startswith(_COMPRESSED_FRAME):
+                data = _COMPRESSION['zlib'][1](data[len(_COMPRESSED_FRAME):])
+            self._stats['received_bytes'] += len(data)
+            raw_payloads = unpack_messages(data)
+            if raw_payloads is None:
+                data_obj = self._coder.decode(data)
+            else:
+                data_obj = [self._coder.decode(raw) for raw in raw_payloads]
         except:
             _log.exception("Message decode failed")
         self._callback_execute('data_received', self, data_obj)
@@ -195,7 +324,8 @@ class CalvinServer(base_transport.BaseServer):
         # TODO: Get iface from addr and lookup host
         iface = ''
 
-        self._transport = server_transport(iface=iface, port=self._listen_uri.port or 0)
+        self._transport = server_transport(iface=iface, port=self._listen_uri.port or 0,
+                                          path=self._listen_uri.path)
         self._client_transport = client_transport
 
     def _started(self, port):
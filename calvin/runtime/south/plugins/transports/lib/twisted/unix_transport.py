@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Common parts of the transports between runtimes on the same host, which
+listen on a unix domain socket and have its path in the uri, e.g.
+calvinunix:///tmp/runtime1.sock
+"""
+
+import os
+import tempfile
+import importlib
+import traceback
+
+from calvin.utilities.calvin_callback import CalvinCB
+from calvin.utilities import calvinlogger
+from calvin.runtime.south.plugins.transports import base_transport
+from calvin.runtime.south.plugins.transports.lib.twisted import base_transport as twisted_base_transport
+from calvin.runtime.south.plugins.transports.lib.twisted import twisted_transport
+
+from twisted.internet import reactor
+
+_log = calvinlogger.get_logger(__name__)
+
+
+def create_uri(scheme, path, n=None):
+    uri = "%s://%s" % (scheme, path)
+    return uri if n is None else uri + "#%d" % n
+
+
+def register(factories, scheme, module_name, _id, callbacks, schemas):
+    """ The register function of a plugin, module_name has its CalvinTransportFactory """
+    ret = {}
+    if scheme in schemas:
+        try:
+            module = importlib.import_module(module_name)
+            f = module.CalvinTransportFactory(_id, callbacks)
+            factories[_id] = f
+            ret[scheme] = f
+        except ImportError:
+            traceback.print_exc()
+    return ret
+
+
+# Server
+class UnixCalvinServer(twisted_base_transport.CalvinServerBase):
+    """
+    Listens on a unix domain socket, subclasses set the scheme of the uris
+    and the server_factory building the protocol from the callbacks.
+    """
+
+    scheme = None
+    server_factory = None
+
+    def __init__(self, iface='', port=0, callbacks=None, path=None, *args, **kwargs):
+        super(UnixCalvinServer, self).__init__(callbacks=callbacks)
+        self._path = path
+        self._unix_server = None
+        self._clients = 0
+        self._callbacks = callbacks
+
+    def start(self):
+        callbacks = {'connected': [CalvinCB(self._connected)]}
+        unix_f = self.server_factory(callbacks)
+
+        if os.path.exists(self._path):
+            # Left by a runtime that did not stop cleanly
+            os.unlink(self._path)
+        self._unix_server = reactor.listenUNIX(self._path, unix_f)
+        self._callback_execute('server_started', self._path)
+        return self._path
+
+    def stop(self):
+        def fire_callback(args):
+            self._callback_execute('server_stopped')
+        if self._unix_server:
+            d = self._unix_server.stopListening()
+            self._unix_server = None
+            d.addCallback(fire_callback)
+
+    def is_listening(self):
+        return self._unix_server is not None
+
+    def _connected(self, proto):
+        # Unix socket clients are unnamed, number them to get unique uris
+        self._clients += 1
+        self._callback_execute('client_connected', create_uri(self.scheme, self._path, self._clients), proto)
+
+
+class UnixTransportFactory(base_transport.BaseTransportFactory):
+
+    """
+    Subclasses set the scheme and the server_transport and client_transport
+    classes, the listen uri <scheme>:default is a socket in the temp directory.
+    """
+
+    scheme = None
+    server_transport = None
+    client_transport = None
+
+    def __init__(self, rt_id, callbacks):
+        super(UnixTransportFactory, self).__init__(rt_id, callbacks=callbacks)
+        self._peers = {}
+        self._servers = {}
+        self._callbacks = callbacks
+
+    def _peer_connected(self):
+        pass
+
+    def join(self, uri, link_name=None):
+        """docstring for join"""
+        schema, peer_addr = uri.split(':', 1)
+        if schema != self.scheme:
+            raise Exception("Cant handle schema %s!!" % schema)
+
+        try:
+            tp = twisted_transport.CalvinTransport(self._rt_id, uri, self._callbacks,
+                                                   self.client_transport, link_name=link_name)
+            self._peers[peer_addr] = tp
+            tp.connect()
+            return True
+        except:
+            _log.exception("Error creating TwistedCalvinTransport")
+            raise
+
+    def listen(self, uri):
+        if uri == "%s:default" % self.scheme:
+            uri = create_uri(self.scheme, os.path.join(tempfile.gettempdir(), "%s-%s.sock" % (self.scheme, self._rt_id)))
+
+        schema, _peer_addr = uri.split(':', 1)
+        if schema != self.scheme:
+            raise Exception("Cant handle schema %s!!" % schema)
+
+        if uri in self._servers:
+            raise Exception("Server %s already started!!" % uri)
+
+        try:
+            tp = twisted_transport.CalvinServer(
+                self._rt_id, uri, self._callbacks, self.server_transport, self.client_transport)
+            self._servers[uri] = tp
+            tp.start()
+        except:
+            _log.exception("Error starting server")
+            raise
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pytest
+from mock import patch
+from twisted.test import proto_helpers
+
+from calvin.utilities.calvin_callback import CalvinCB
+from calvin.runtime.south.plugins.transports import calvinshm
+from calvin.runtime.south.plugins.transports.calvinshm.shmring import ShmRing
+from calvin.runtime.south.plugins.transports.calvinshm.twisted import twisted_transport
+
+pytestmark = pytest.mark.unittest
+
+
+@pytest.fixture
+def ring(request):
+    producer = ShmRing.create(64)
+    consumer = ShmRing.attach(producer.path)
+    producer.unlink()
+
+    def fin():
+        producer.close()
+        consumer.close()
+    request.addfinalizer(fin)
+    return producer, consumer
+
+
+def test_ring_wrap(ring):
+    producer, consumer = ring
+    expected = []
+    received = []
+    for i in range(100):
+        data = 'x' * (i % 20) + str(i)
+        expected.append(data)
+        if not producer.write(data):
+            assert consumer.producer_waiting()
+            while not producer.write(data):
+                received.append(consumer.read())
+    data = consumer.read()
+    while data is not None:
+        received.append(data)
+        data = consumer.read()
+    assert received == expected
+    assert not producer.fits('x' * 61)
+
+
+def test_ring_wakeup(ring):
+    producer, consumer = ring
+    assert not producer.consumer_waiting()
+    assert consumer.wait_for_data()
+    producer.write('a')
+    assert producer.consumer_waiting()
+    assert not producer.consumer_waiting()
+    # Data already there, keep reading
+    assert not consumer.wait_for_data()
+
+
+def connected_pair():
+    """ Two protocols connected through string transports, pump() delivers socket data """
+    received = ([], [])
+    protos = []
+    for i in range(2):
+        proto = twisted_transport.ShmProtocol({'data': [CalvinCB(received[i].append)]})
+        proto.makeConnection(proto_helpers.StringTransport())
+        protos.append(proto)
+
+    def pump():
+        while any(p.transport.value() for p in protos):
+            for src, dst in ((0, 1), (1, 0)):
+                data = protos[src].transport.value()
+                protos[src].transport.clear()
+                if data:
+                    protos[dst].dataReceived(data)
+    return protos, received, pump
+
+
+@patch('calvin.runtime.south.plugins.transports.calvinshm.twisted.twisted_transport.reactor')
+@patch('calvin.runtime.south.plugins.transports.calvinshm.twisted.twisted_transport._conf')
+def test_protocol(conf_mock, reactor_mock):
+    conf_mock.get.return_value = 256
+    protos, received, pump = connected_pair()
+    # Queued until the rings are set up
+    protos[0].send_message('early')
+    pump()
+    assert all(p.is_ready() for p in protos)
+    assert received[1] == ['early']
+
+    for i in range(20):
+        protos[0].send_message('message %d' % i)
+    protos[1].send_message('x' * 300)
+    # Socket only carries wakeups and too large messages
+    assert len(protos[0].transport.value()) < 20
+    pump()
+    assert received[1][1:] == ['message %d' % i for i in range(20)]
+    assert received[0] == ['x' * 300]
+
+    for p in protos:
+        p.connectionLost(None)
+
+
+@patch('calvin.runtime.south.plugins.transports.calvinshm.twisted.twisted_transport.reactor')
+@patch('calvin.runtime.south.plugins.transports.calvinshm.twisted.twisted_transport._conf')
+def test_inline_order(conf_mock, reactor_mock):
+    conf_mock.get.return_value = 256
+    protos, received, pump = connected_pair()
+    pump()
+    protos[0].send_message('x' * 300)
+    protos[0].send_message('small')
+    protos[0].send_message('')
+    protos[0].send_message('last')
+    # The ring is read, e.g. by the poll, before the inline messages arrive on the socket
+    protos[1]._drain()
+    assert received[1] == []
+    pump()
+    assert received[1] == ['x' * 300, 'small', '', 'last']
+
+    for p in protos:
+        p.connectionLost(None)
+
+
+@patch('calvin.runtime.south.plugins.transports.lib.twisted.unix_transport.reactor')
+def test_listen_default(reactor_mock):
+    factory = calvinshm.register("node1", {}, ['calvinshm'], ['json'])['calvinshm']
+    factory.listen("calvinshm:default")
+    path, server_factory = reactor_mock.listenUNIX.call_args[0]
+    assert path.endswith("calvinshm-node1.sock")
+    assert isinstance(server_factory, twisted_transport.ShmServerFactory)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pytest
+from mock import Mock, patch
+
+from calvin.utilities.calvin_callback import CalvinCB
+from calvin.runtime.south.plugins.transports import calvinunix
+from calvin.runtime.south.plugins.transports.calvinunix.twisted import twisted_transport
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.runtime.south.plugins.transports.calvinunix.twisted.twisted_transport.reactor')
+@patch('calvin.runtime.south.plugins.transports.lib.twisted.unix_transport.reactor')
+def test_listen_join(server_reactor_mock, reactor_mock):
+    factory = calvinunix.register("node1", {}, ['calvinip', 'calvinunix'], ['json'])['calvinunix']
+    factory.listen("calvinunix:///tmp/node1.sock")
+    assert server_reactor_mock.listenUNIX.call_args[0][0] == "/tmp/node1.sock"
+
+    factory.join("calvinunix:///tmp/node2.sock")
+    assert reactor_mock.connectUNIX.call_args[0][0] == "/tmp/node2.sock"
+
+    with pytest.raises(Exception):
+        factory.join("calvinip://127.0.0.1:5000")
+
+
+def test_not_registered():
+    assert calvinunix.register("node1", {}, ['calvinip'], ['json']) == {}
+
+
+@patch('calvin.runtime.south.plugins.transports.lib.twisted.unix_transport.reactor')
+def test_server_clients(reactor_mock):
+    connected = Mock()
+    server = twisted_transport.TwistedCalvinServer(callbacks={'client_connected': [CalvinCB(connected)]},
+                                                   path="/tmp/node1.sock")
+    assert server.start() == "/tmp/node1.sock"
+    assert server.is_listening()
+    # Unnamed clients get numbered uris
+    server._connected("proto1")
+    server._connected("proto2")
+    connected.assert_called_with("calvinunix:///tmp/node1.sock#2", "proto2")
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Firing throughput of a chain of std.Identity actors.
+
+A std.Constant feeds a chain of std.Identity actors to a std.Terminator, all
+local, and the actors are fired in chain order until the tokens reached the
+sink. With --production the actor decorators use the production mode, the
+same as setting actor_production_mode in the configuration, and with --fusion
+the std.Identity actors are fused to one chain (actor_fusion).
+
+    python -m calvin.tests.benchmarks.bench_actors [-n TOKENS] [-l LENGTH] [--production] [--fusion]
+"""
+
+import argparse
+import timeit
+
+from calvin.utilities import calvinconfig
+
+
+def chain(tokens, length):
+    # Imported here since the production mode is selected when the actors are loaded
+    from mock import Mock
+    from calvin.tests import DummyNode
+    from calvin.runtime.north.actormanager import ActorManager
+    from calvin.runtime.south.endpoint import LocalInEndpoint, LocalOutEndpoint
+
+    am = ActorManager(DummyNode())
+    actors = [am.actors[am.new('std.Constant', {'data': 42, 'n': tokens})]]
+    actors += [am.actors[am.new('std.Identity', {})] for _ in range(length)]
+    actors.append(am.actors[am.new('std.Terminator', {})])
+    for actor in actors:
+        actor._calvinsys = Mock()
+    for out_actor, in_actor in zip(actors, actors[1:]):
+        outport = out_actor.outports['token']
+        inport = in_actor.inports['void' if in_actor is actors[-1] else 'token']
+        inport.attach_endpoint(LocalInEndpoint(inport, outport))
+        outport.attach_endpoint(LocalOutEndpoint(outport, inport))
+    for actor in actors:
+        actor.fsm.transition_to(actor.STATUS.ENABLED)
+    return actors
+
+
+def run(actors):
+    while any([actor.fire().did_fire for actor in actors]):
+        pass
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Fire a chain of std.Identity actors")
+    argparser.add_argument('-n', '--tokens', type=int, default=10000, help="tokens through the chain")
+    argparser.add_argument('-l', '--length', type=int, default=10, help="std.Identity actors in the chain")
+    argparser.add_argument('--repeat', type=int, default=3, help="best of this many runs")
+    argparser.add_argument('--production', action='store_true', help="use actor production mode")
+    argparser.add_argument('--fusion', action='store_true', help="fuse the std.Identity actors")
+    args = argparser.parse_args()
+
+    calvinconfig.get().set('global', 'actor_production_mode', args.production)
+    calvinconfig.get().set('global', 'actor_fusion', args.fusion)
+    best = min(timeit.repeat(lambda: run(chain(args.tokens, args.length)), number=1, repeat=args.repeat))
+    firings = args.tokens * (args.length + 1)
+    mode = "production" if args.production else "default"
+    print "%-18s %d tokens, %d std.Identity: %.3f s, %.1f us per token and actor" % (
+        mode + (" fused" if args.fusion else ""), args.tokens, args.length, best, best * 1e6 / firings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Micro-benchmark of the message coders on tunnel data.
+
+Encodes and decodes representative TUNNEL_DATA messages: a single token, a
+batch of tokens and a binary token (base64 in json, raw bytes otherwise).
+
+    python -m calvin.tests.benchmarks.bench_coders [-n MESSAGES]
+"""
+
+import argparse
+import base64
+import os
+import timeit
+
+from calvin.runtime.north.plugins.coders.messages import message_coder_factory
+from calvin.runtime.north.calvin_token import Token
+
+
+def tunnel_data(value):
+    return {'cmd': 'TUNNEL_DATA', 'to_rt_uuid': 'f5dd4d3e-1e95-4a4b-9b2f-e5c3a4cb2ac8',
+            'from_rt_uuid': '4b36bf8c-8a21-49e6-a4a3-3ac2c6e9b5d0',
+            'tunnel_id': 'b76f3a7b-4d2c-4ba2-8e07-1f3bbd14bff2', 'value': value}
+
+
+def payloads(coder_name):
+    binary = os.urandom(1024)
+    if coder_name == 'json':
+        binary = base64.b64encode(binary)
+    port = {'port_id': '0c2f3c5e-5b8e-4d6f-9f4c-2d9dbb3c1f6a',
+            'peer_port_id': 'a9fa6a3e-6a5f-4f0e-8a54-8c2f2b8b1d1e'}
+    token = dict(port, cmd='TOKEN', sequencenbr=4711, token=Token(42).encode())
+    tokens = dict(port, cmd='TOKENS', sequencenbr=4711, tokens=[Token(i).encode() for i in range(64)])
+    blob = dict(port, cmd='TOKEN', sequencenbr=4711, token=Token(binary).encode())
+    return [('TOKEN', tunnel_data(token)), ('TOKENS x64', tunnel_data(tokens)), ('1k binary', tunnel_data(blob))]
+
+
+def roundtrip(coder, msg, count):
+    for _ in xrange(count):
+        coder.decode(coder.encode(msg))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Compare message coders")
+    argparser.add_argument('-n', '--messages', type=int, default=10000, help="messages encoded and decoded")
+    argparser.add_argument('--repeat', type=int, default=3, help="best of this many runs")
+    args = argparser.parse_args()
+
+    for coder_name in message_coder_factory.get_prio_list():
+        coder = message_coder_factory.get(coder_name)
+        for name, msg in payloads(coder_name):
+            best = min(timeit.repeat(lambda: roundtrip(coder, msg, args.messages), number=1, repeat=args.repeat))
+            print "%-8s %-11s %5d bytes, %d messages: %.3f s" % (
+                coder_name, name, len(coder.encode(msg)), args.messages, best)
+
+
+if __name__ == '__main__':
+    main()
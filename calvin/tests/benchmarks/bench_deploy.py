@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deploy time of a large application.
+
+Starts a runtime in a child process and deploys a chain of actors, a
+std.Constant through std.Identity actors to a std.Terminator, timing the
+deploy request until all actors are created and connected. With --legacy the
+runtime generates ids like before the fast id generation, one uuid4 and a log
+level lookup per id.
+
+    python -m calvin.tests.benchmarks.bench_deploy [-a ACTORS] [--legacy]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import socket
+import time
+import uuid as sys_uuid
+
+from calvin.utilities import calvinlogger
+from calvin.utilities import calvinuuid
+from calvin.utilities.nodecontrol import dispatch_node
+from calvin.requests.request_handler import RequestHandler
+
+
+def legacy_uuid(prefix):
+    u = str(sys_uuid.uuid4())
+    if calvinlogger.get_logger(calvinuuid.__name__).getEffectiveLevel() == logging.DEBUG:
+        return prefix + "_" + u
+    else:
+        return u
+
+
+def free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def chain(actors):
+    lines = ["src : std.Constant(data=1, n=1)"]
+    lines += ["id%d : std.Identity()" % i for i in range(actors - 2)]
+    lines.append("snk : std.Terminator()")
+    names = ["src"] + ["id%d" % i for i in range(actors - 2)]
+    lines += ["%s.token > %s.token" % (a, b) for a, b in zip(names, names[1:])]
+    lines.append("%s.token > snk.void" % names[-1])
+    return "\n".join(lines)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Time deploying a large application")
+    argparser.add_argument('-a', '--actors', type=int, default=1000, help="actors in the application")
+    argparser.add_argument('--repeat', type=int, default=3, help="best of this many deploys")
+    argparser.add_argument('--legacy', action='store_true', help="generate ids like before")
+    args = argparser.parse_args()
+
+    if args.legacy:
+        # The runtime process is forked from here and gets the same ids
+        calvinuuid.uuid = legacy_uuid
+        calvinuuid.transient_id = legacy_uuid
+
+    request_handler = RequestHandler()
+    rt, _ = dispatch_node(["calvinip://127.0.0.1:%d" % free_port()], "http://127.0.0.1:%d" % free_port())
+    script = chain(args.actors)
+    times = []
+    try:
+        for _ in range(args.repeat):
+            start = time.time()
+            result = request_handler.deploy_application(rt, "bench", script, timeout=300)
+            times.append(time.time() - start)
+            request_handler.delete_application(rt, result['application_id'], timeout=300)
+    finally:
+        request_handler.quit(rt)
+        time.sleep(0.4)
+        for p in multiprocessing.active_children():
+            p.terminate()
+    print "%s ids, %d actors: %.3f s" % ("legacy" if args.legacy else "fast", args.actors, min(times))
+
+
+if __name__ == '__main__':
+    main()
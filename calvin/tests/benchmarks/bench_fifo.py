@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the FIFO implementations.
+
+Writes and reads tokens through a FIFO with a number of readers, committing
+every read, i.e. the pattern of an outport connected to several inports.
+
+    python -m calvin.tests.benchmarks.bench_fifo [-n TOKENS] [-r READERS]
+"""
+
+import argparse
+import timeit
+
+from calvin.runtime.north import fifo
+from calvin.runtime.north.calvin_token import Token
+
+
+def write_read(fifo_class, tokens, readers, length=5):
+    f = fifo_class(length)
+    names = ["reader%d" % i for i in range(readers)]
+    for name in names:
+        f.add_reader(name)
+    token = Token(0)
+    for _ in xrange(tokens):
+        while f.can_write():
+            f.write(token)
+        for name in names:
+            while f.can_read(name):
+                f.read(name)
+                f.commit_reads(name)
+        f.available_slots()
+        len(f)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Compare FIFO implementations")
+    argparser.add_argument('-n', '--tokens', type=int, default=10000, help="rounds of fill and drain")
+    argparser.add_argument('-r', '--readers', type=int, default=4, help="number of readers")
+    argparser.add_argument('--repeat', type=int, default=3, help="best of this many runs")
+    args = argparser.parse_args()
+
+    for fifo_class in (fifo.FIFO, fifo.CompactFIFO):
+        best = min(timeit.repeat(lambda: write_read(fifo_class, args.tokens, args.readers),
+                                 number=1, repeat=args.repeat))
+        print "%-12s %d rounds, %d readers: %.3f s" % (fifo_class.__name__, args.tokens, args.readers, best)
+
+
+if __name__ == '__main__':
+    main()
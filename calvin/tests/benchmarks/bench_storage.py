@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Throughput of the persistent local storage.
+
+Sets, gets and appends to index sets in a LogStore file in a temporary
+directory, syncing to disk every write (--sync-count 1) or every --sync-count
+writes, and reopens the file to time reading the log back.
+
+    python -m calvin.tests.benchmarks.bench_storage [-n KEYS] [--sync-count COUNT]
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import timeit
+import os
+
+from calvin.utilities.logstore import LogStore
+
+
+def values(count):
+    return [("actor-%08d" % i, json.dumps({'name': "actor%d" % i, 'type': "std.Identity",
+                                           'node_id': "4b36bf8c-8a21-49e6-a4a3-3ac2c6e9b5d0"}))
+            for i in xrange(count)]
+
+
+def set_all(store, items):
+    for key, value in items:
+        store.set(key, value)
+    store.sync()
+
+
+def get_all(store, items):
+    for key, _ in items:
+        store.get(key)
+
+
+def append_all(store, items):
+    # The same read, merge and write as PersistentStorage.append
+    for i, (key, _) in enumerate(items):
+        index = "index-/node/attribute/owner/%d" % (i % 10)
+        old = store.get(index)
+        store.set(index, json.dumps(list(set(json.loads(old) if old else []) | set([key]))))
+    store.sync()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Persistent storage throughput")
+    argparser.add_argument('-n', '--keys', type=int, default=10000, help="keys set, read and appended")
+    argparser.add_argument('--sync-count', type=int, default=1000, help="writes synced to disk together")
+    args = argparser.parse_args()
+
+    items = values(args.keys)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "bench.local")
+        # No timer, only sync on the count
+        store = LogStore(path, sync_delay=None, sync_count=args.sync_count)
+        for name, func in [("set", set_all), ("get", get_all), ("append", append_all)]:
+            elapsed = timeit.timeit(lambda: func(store, items), number=1)
+            print "%-8s %d keys, sync every %d: %.3f s (%.0f ops/s)" % (
+                name, args.keys, args.sync_count, elapsed, args.keys / elapsed)
+        store.close()
+        elapsed = timeit.timeit(lambda: LogStore(path, sync_delay=None).close(), number=1)
+        print "%-8s %d bytes: %.3f s" % ("reopen", os.path.getsize(path), elapsed)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare runtime to runtime transports on the local host.
+
+Joins two transport endpoints in this process, through the plugins' register,
+listen and join, like CalvinNetwork does. Measures round trip latency with
+one outstanding message, and throughput of a stream of messages sent 100 per
+reactor iteration.
+
+    python -m calvin.tests.benchmarks.bench_transports [-n MESSAGES] [-s SIZE]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from twisted.internet import reactor
+
+from calvin.utilities.calvin_callback import CalvinCB
+from calvin.runtime.south.plugins.transports import calvinip, calvinshm, calvinunix
+
+BURST = 100
+
+
+class Bench(object):
+
+    def __init__(self, plugin, schema, uri, pings, messages, size, done):
+        super(Bench, self).__init__()
+        self.schema = schema
+        self.uri = uri
+        self.pings = pings
+        self.messages = messages
+        self.payload = {'cmd': 'DATA', 'data': 'x' * size}
+        self.done = done
+        self.client = None
+        self.rtts = []
+        self.received = 0
+        self.server = plugin.register('server-' + schema, self._callbacks(self._server_data), [schema], ['json'])[schema]
+        self.peer = plugin.register('client-' + schema, self._callbacks(self._client_data), [schema], ['json'])[schema]
+
+    def _callbacks(self, data_cb):
+        return {'join_finished': [CalvinCB(self._join_finished)],
+                'data_received': [CalvinCB(data_cb)],
+                'peer_disconnected': [CalvinCB(lambda *args: None)]}
+
+    def start(self):
+        self.server.listen(self.uri)
+        reactor.callLater(0.2, self.peer.join, self.uri)
+
+    def _join_finished(self, tp_link, peer_id, uri, is_orginator):
+        if is_orginator:
+            self.client = tp_link
+            self._ping()
+
+    def _ping(self):
+        self.sent_at = time.time()
+        self.client.send({'cmd': 'PING'})
+
+    def _server_data(self, tp_link, payload):
+        if payload['cmd'] == 'PING':
+            tp_link.send({'cmd': 'PONG'})
+        else:
+            self.received += 1
+            if self.received == self.messages:
+                tp_link.send({'cmd': 'DONE'})
+
+    def _client_data(self, tp_link, payload):
+        if payload['cmd'] == 'PONG':
+            self.rtts.append(time.time() - self.sent_at)
+            if len(self.rtts) < self.pings:
+                self._ping()
+            else:
+                self.start_stream = time.time()
+                self._stream(self.messages)
+        elif payload['cmd'] == 'DONE':
+            elapsed = time.time() - self.start_stream
+            self.rtts.sort()
+            print "%-10s rtt mean %6.1f us, median %6.1f us, p99 %6.1f us | %7.0f msgs/s %6.1f MB/s" % (
+                self.schema,
+                1e6 * sum(self.rtts) / len(self.rtts),
+                1e6 * self.rtts[len(self.rtts) // 2],
+                1e6 * self.rtts[len(self.rtts) * 99 // 100],
+                self.messages / elapsed,
+                self.messages * len(self.payload['data']) / elapsed / 1e6)
+            self.client.disconnect()
+            reactor.callLater(0.2, self.done)
+
+    def _stream(self, left):
+        for _ in xrange(min(BURST, left)):
+            self.client.send(self.payload)
+        if left > BURST:
+            reactor.callLater(0, self._stream, left - BURST)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Compare transports between runtimes on this host")
+    argparser.add_argument('-p', '--pings', type=int, default=2000, help="round trips for latency")
+    argparser.add_argument('-n', '--messages', type=int, default=20000, help="messages for throughput")
+    argparser.add_argument('-s', '--size', type=int, default=200, help="payload bytes per message")
+    argparser.add_argument('--port', type=int, default=45678, help="calvinip port")
+    args = argparser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench-%s-" + str(os.getpid()) + ".sock")
+    candidates = [(calvinip, 'calvinip', "calvinip://127.0.0.1:%d" % args.port),
+                  (calvinunix, 'calvinunix', "calvinunix://" + path % 'calvinunix'),
+                  (calvinshm, 'calvinshm', "calvinshm://" + path % 'calvinshm')]
+
+    def run_next():
+        if not candidates:
+            reactor.stop()
+            return
+        plugin, schema, uri = candidates.pop(0)
+        Bench(plugin, schema, uri, args.pings, args.messages, args.size, run_next).start()
+
+    reactor.callWhenRunning(run_next)
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main()
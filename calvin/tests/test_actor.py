@@ -46,6 +46,9 @@ def actor():
     ("in", "token", "missing", "", False),
     ("out", "token", "name", "new_name", True),
     ("out", "token", "name", "new_name", True),
+    ("in", "token", "fifo_size", 8, True),
+    ("out", "token", "fifo_size", 1, False),
+    ("out", "token", "fifo_max_size", 16, True),
 ])
 def test_set_port_property(port_type, port_name, port_property, value, expected):
     assert actor().set_port_property(port_type, port_name, port_property, value) is expected
@@ -134,6 +137,7 @@ def test_state(actor):
         'dump': False,
         'id': actor.id,
         'inports': {'token': {'fifo': {'N': 5,
+                                       'max_N': 5,
                                        'fifo': [{'data': 0, 'type': 'Token'},
                                                 {'data': 0, 'type': 'Token'},
                                                 {'data': 0, 'type': 'Token'},
@@ -144,10 +148,12 @@ def test_state(actor):
                                        'tentative_read_pos': {inport.id: 0},
                                        'write_pos': 0},
                               'id': inport.id,
+                              'link': None,
                               'name': 'token'}},
         'name': '',
         'outports': {'token': {'fanout': 1,
                                'fifo': {'N': 5,
+                                        'max_N': 5,
                                         'fifo': [{'data': 0, 'type': 'Token'},
                                                  {'data': 0, 'type': 'Token'},
                                                  {'data': 0, 'type': 'Token'},
@@ -158,6 +164,7 @@ def test_state(actor):
                                         'tentative_read_pos': {},
                                         'write_pos': 0},
                                'id': outport.id,
+                               'link': None,
                                'name': 'token'}}}
     test_state = actor.state()
     for k, v in correct_state.iteritems():
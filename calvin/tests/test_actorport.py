@@ -142,6 +142,27 @@ def test_inport_outport_connection(inport, outport):
     assert inport.available_tokens() == 0
 
 
+def test_fifo_size_property(inport, outport):
+    out_endpoint = LocalOutEndpoint(outport, inport)
+    in_endpoint = LocalInEndpoint(inport, outport)
+    outport.attach_endpoint(out_endpoint)
+    inport.attach_endpoint(in_endpoint)
+
+    for i in range(4):
+        outport.write_token(i)
+    assert outport.available_tokens() == 0
+    assert inport.read_token() == 0
+
+    outport.fifo_size = 10
+    assert outport.fifo_size == 10
+    assert outport.fifo_max_size == 10
+    assert outport.available_tokens() == 6
+    assert [inport.read_token() for _ in range(3)] == [1, 2, 3]
+
+    with pytest.raises(Exception):
+        inport.fifo_size = 1
+
+
 def test_set_outport_state(outport):
     new_state = {
         'fanout': 2,
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from mock import Mock, patch
+
+from calvin.actor.actor import condition, ActionResult
+from calvin.runtime.north.calvin_token import Token, ExceptionToken
+
+pytestmark = pytest.mark.unittest
+
+
+class InPort(object):
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.read = 0
+        self.peeked = 0
+
+    def available_tokens(self):
+        return len(self.tokens) - self.read - self.peeked
+
+    def peek_token(self):
+        self.peeked += 1
+        return self.tokens[self.read + self.peeked - 1]
+
+    def peek_rewind(self):
+        self.peeked = 0
+
+    def commit_peek_as_read(self):
+        self.read += self.peeked
+        self.peeked = 0
+
+
+class OutPort(object):
+
+    def __init__(self, space):
+        self.space = space
+        self.written = []
+
+    def available_tokens(self):
+        return self.space - len(self.written)
+
+    def write_token(self, token):
+        self.written.append(token.value)
+
+
+def actor(tokens, space=10):
+    a = Mock()
+    a.inports = {'a': InPort([Token(t) for t in tokens[0]]), 'b': InPort([Token(t) for t in tokens[1]])}
+    a.outports = {'sum': OutPort(space)}
+    a.exception_handler.return_value = ActionResult(production=('handled', ))
+    return a
+
+
+@condition(['a', 'b'], ['sum'], batch=True)
+def add(self, a, b):
+    self.calls.append(len(a))
+    return ActionResult(production=([x + y for x, y in zip(a, b)], ))
+
+
+def test_batch():
+    a = actor([[1, 2, 3], [10, 20, 30, 40]])
+    a.calls = []
+    result = add(a)
+    assert a.calls == [3]
+    assert (result.tokens_consumed, result.tokens_produced) == (6, 3)
+    assert a.outports['sum'].written == [11, 22, 33]
+    assert a.inports['b'].available_tokens() == 1
+    assert not add(a).did_fire
+
+
+def test_output_space():
+    a = actor([[1, 2, 3], [10, 20, 30]], space=2)
+    a.calls = []
+    add(a)
+    assert a.calls == [2]
+    assert a.inports['a'].available_tokens() == 1
+
+
+def test_exception_token():
+    a = actor([[1, 2, 3], [10, 20, 30]])
+    a.inports['b'].tokens[1] = ExceptionToken()
+    a.calls = []
+    add(a)
+    # Tokens before the exception in one batch, then the exception by itself
+    assert a.calls == [1]
+    add(a)
+    assert a.exception_handler.call_args[0][1][0] == 2
+    assert a.exception_handler.call_args[0][2] == {'exceptions': {'b': [0]}}
+    add(a)
+    assert a.calls == [1, 1]
+    assert a.outports['sum'].written == [11, 'handled', 33]
+
+
+def test_not_fired():
+    @condition(['a', 'b'], ['sum'], batch=True)
+    def refuse(self, a, b):
+        return ActionResult(did_fire=False)
+
+    a = actor([[1], [2]])
+    assert not refuse(a).did_fire
+    assert a.inports['a'].available_tokens() == 1
+
+
+@patch('calvin.actor.actor._production_mode', False)
+def test_invalid_production():
+    @condition(['a', 'b'], ['sum'], batch=True)
+    def short(self, a, b):
+        return ActionResult(production=([0], ))
+
+    a = actor([[1, 2], [1, 2]])
+    with pytest.raises(Exception):
+        short(a)
+    assert a.inports['a'].available_tokens() == 2
+
+
+def test_batch_requires_single_tokens():
+    with pytest.raises(Exception):
+        condition([('a', 2)], ['sum'], batch=True)
+    with pytest.raises(Exception):
+        condition([], ['sum'], batch=True)
@@ -120,6 +120,41 @@ class CalvinScriptAnalyzerTest(CalvinTestBase):
         app_info = generate_app_info(result)
         self.assertFalse(app_info['valid'])
 
+    def testPortProperties(self):
+        script = """
+        define SIZE = 16
+        component Filter() in -> out {
+            id : std.Identity()
+            .in > id.token
+            id.token > .out
+        }
+        src : std.Counter()
+        filter : Filter()
+        snk : io.StandardOut()
+        src.integer(fifo_size=8) > filter.in(fifo_size=SIZE, fifo_max_size=64)
+        filter.out > snk.token
+        """
+        result = self.invoke_parser_assert_syntax('inline', script)
+        app_info = generate_app_info(result)
+        self.assertTrue(app_info['valid'])
+        self.assertEqual(app_info['port_properties'], {
+            'inline:src': {'out': {'integer': {'fifo_size': 8}}},
+            'inline:filter:id': {'in': {'token': {'fifo_size': 16, 'fifo_max_size': 64}}}})
+
+    def testPortPropertiesOnComponentPort(self):
+        script = """
+        component Foo() in -> {
+            snk : io.StandardOut()
+            .in(fifo_size=8) > snk.token
+        }
+        src : std.Counter()
+        foo : Foo()
+        src.integer > foo.in
+        """
+        result = self.invoke_parser_assert_syntax('inline', script)
+        app_info = generate_app_info(result)
+        self.assertFalse(app_info['valid'])
+
 
 class CalvinScriptCheckerTest(CalvinTestBase):
     """Test the CalvinsScript checker"""
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid
+import logging
+import pytest
+from mock import patch
+
+from calvin.utilities import calvinuuid
+
+pytestmark = pytest.mark.unittest
+
+
+def test_uuid4():
+    ids = set()
+    for _ in range(1000):
+        u = calvinuuid.uuid("ACTOR")
+        assert str(uuid.UUID(u)) == u
+        assert uuid.UUID(u).version == 4
+        ids.add(u)
+    assert len(ids) == 1000
+
+
+def test_transient_id():
+    ids = [calvinuuid.transient_id("MSGID") for _ in range(1000)]
+    assert len(set(ids)) == 1000
+    assert calvinuuid.transient_id("MSGID") != calvinuuid.transient_id("LMSG")
+
+
+@patch('calvin.utilities.calvinuuid.os.getpid')
+def test_forked(getpid_mock):
+    getpid_mock.return_value = 1
+    parent = [calvinuuid.uuid("ACTOR"), calvinuuid.transient_id("MSGID")]
+    pool = calvinuuid._pool
+    getpid_mock.return_value = 2
+    child = [calvinuuid.uuid("ACTOR"), calvinuuid.transient_id("MSGID")]
+    # Random bytes and session are not shared with the parent
+    assert calvinuuid._pool != pool
+    assert child[1].rsplit("-", 1)[0] != parent[1].rsplit("-", 1)[0]
+
+
+@patch('calvin.utilities.calvinuuid.calvinlogger')
+def test_prefix(logger_mock):
+    logger_mock.get_logger.return_value.getEffectiveLevel.return_value = logging.DEBUG
+    calvinuuid.refresh()
+    assert calvinuuid.uuid("ACTOR").startswith("ACTOR_")
+    assert calvinuuid.transient_id("MSGID").startswith("MSGID_")
+    # The decision is cached until refreshed
+    logger_mock.get_logger.return_value.getEffectiveLevel.return_value = logging.INFO
+    assert calvinuuid.uuid("ACTOR").startswith("ACTOR_")
+    assert logger_mock.get_logger.call_count == 1
+    calvinuuid.refresh()
+    assert not calvinuuid.uuid("ACTOR").startswith("ACTOR_")
+    calvinuuid.refresh()
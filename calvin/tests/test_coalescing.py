@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.runtime.south.plugins.transports.lib.twisted import twisted_transport
+from calvin.runtime.south.plugins.transports.lib.twisted.twisted_transport import CalvinTransport
+from calvin.runtime.north.calvin_proto import CalvinProto
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.runtime.south.plugins.transports.lib.twisted.twisted_transport.async')
+class CoalescingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = CalvinTransport("node1", "calvinip://127.0.0.1:5000", {}, Mock())
+        self.transport._coder = self.transport.get_coders()['json']
+        self.transport._coalesce = True
+        self.transport._coalesce_bytes = 100
+        self.transport._peer_coalesce = True
+        self.sent = self.transport._transport.send
+
+    def test_single_message(self, async_mock):
+        self.transport.send({'cmd': 'A'})
+        assert not self.sent.called
+        assert async_mock.DelayedCall.call_count == 1
+        self.transport.flush()
+        self.sent.assert_called_once_with('{"cmd": "A"}')
+
+    def test_coalesce(self, async_mock):
+        for i in range(3):
+            self.transport.send({'cmd': 'A', 'n': i})
+        assert not self.sent.called
+        # One flush is scheduled
+        assert async_mock.DelayedCall.call_count == 1
+        self.transport.flush()
+        assert self.sent.call_count == 1
+        frame = self.sent.call_args[0][0]
+        raws = twisted_transport.unpack_messages(frame)
+        assert [self.transport._coder.decode(r)['n'] for r in raws] == [0, 1, 2]
+        self.transport.flush()
+        assert self.sent.call_count == 1
+
+    def test_max_bytes(self, async_mock):
+        # Each message is 22 bytes, the fifth would exceed 100 bytes
+        for i in range(5):
+            self.transport.send({'cmd': 'A', 'n': 10 + i})
+        assert self.sent.call_count == 1
+        assert len(twisted_transport.unpack_messages(self.sent.call_args[0][0])) == 4
+        # Large messages are sent directly
+        self.transport.send({'cmd': 'A', 'data': 'x' * 100})
+        assert self.sent.call_count == 3
+        assert self.sent.call_args_list[1][0][0] == '{"cmd": "A", "n": 14}'
+        assert not self.transport._send_queue
+
+    def test_peer_without_coalescing(self, async_mock):
+        self.transport._peer_coalesce = False
+        self.transport.send({'cmd': 'A'})
+        self.sent.assert_called_once_with('{"cmd": "A"}')
+
+    def test_receive(self, async_mock):
+        self.transport._remote_rt_id = "node2"
+        received = Mock()
+        self.transport.callback_register('data_received', received)
+        coder = self.transport._coder
+        self.transport._data_received(twisted_transport.pack_messages([coder.encode({'n': 1}), coder.encode({'n': 2})]))
+        received.assert_called_once_with(self.transport, [{'n': 1}, {'n': 2}])
+        self.transport._data_received(coder.encode({'n': 3}))
+        received.assert_called_with(self.transport, {'n': 3})
+
+
+class ProtoTests(unittest.TestCase):
+
+    @patch.object(CalvinProto, 'port_disconnect_handler')
+    def test_recv_coalesced(self, handler):
+        node = Mock()
+        proto = CalvinProto(node, node.network)
+        payload = {'cmd': 'PORT_DISCONNECT', 'from_rt_uuid': 'node2'}
+        proto.recv_handler(None, [payload, {'cmd': 'NOT_A_COMMAND', 'from_rt_uuid': 'node2'}, payload])
+        assert handler.call_count == 2
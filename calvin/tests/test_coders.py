@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import patch
+
+from calvin.runtime.north.plugins.coders.messages import message_coder_factory
+from calvin.runtime.north.plugins.coders.negotiators import negotiator_factory
+from calvin.utilities.calvinconfig import CalvinConfig
+
+pytestmark = pytest.mark.unittest
+
+
+TOKENS_MSG = {'cmd': 'TUNNEL_DATA', 'to_rt_uuid': 'node1', 'from_rt_uuid': 'node2',
+              'tunnel_id': 'tunnel1', 'value': {
+                  'cmd': 'TOKENS', 'port_id': 'port1', 'peer_port_id': 'port2',
+                  'sequencenbr': 17,
+                  'tokens': [{'type': 'Token', 'data': i} for i in range(10)]}}
+
+
+class MessageCoderTests(unittest.TestCase):
+
+    def test_prio_list(self):
+        prio_list = message_coder_factory.get_prio_list()
+        assert 'json' in prio_list
+        for name in prio_list:
+            assert message_coder_factory.get(name) is not None
+        with pytest.raises(Exception):
+            message_coder_factory.get('nocoder')
+
+    def test_roundtrip(self):
+        for name in message_coder_factory.get_prio_list():
+            coder = message_coder_factory.get(name)
+            assert coder.decode(coder.encode(TOKENS_MSG)) == TOKENS_MSG
+
+    def test_msgpack_binary(self):
+        if 'msgpack' not in message_coder_factory.get_prio_list():
+            pytest.skip("No msgpack implementation")
+        coder = message_coder_factory.get('msgpack')
+        data = {'data': '\x00\xff\x80', 'text': u'r\xe4ksm\xf6rg\xe5s'}
+        decoded = coder.decode(coder.encode(data))
+        assert decoded == data
+        assert isinstance(decoded['data'], str)
+        assert len(coder.encode(TOKENS_MSG)) < len(message_coder_factory.get('json').encode(TOKENS_MSG))
+
+
+class NegotiatorTests(unittest.TestCase):
+
+    @patch('calvin.runtime.north.plugins.coders.negotiators.dynamic.message_coder_factory.get_prio_list')
+    def test_dynamic(self, prio_mock):
+        prio_mock.return_value = ['msgpack', 'json']
+        negotiator = negotiator_factory.get('dynamic')
+        assert negotiator.get_list() == ['msgpack', 'json']
+        assert negotiator.select(['json', 'msgpack']) == 'msgpack'
+        # Peers without binary coder
+        assert negotiator.select(['json']) == 'json'
+        assert negotiator.select(['other']) is None
+        with pytest.raises(Exception):
+            negotiator.get_coder(['other'])
+        assert negotiator.get_coder(['json']) is not None
+
+    @patch('calvin.runtime.north.plugins.coders.negotiators.static._conf')
+    def test_static(self, conf_mock):
+        conf_mock.get.return_value = 'json'
+        negotiator = negotiator_factory.get('static')
+        assert negotiator.get_list() == ['json']
+        assert negotiator.select(['msgpack', 'json']) == 'json'
+        assert negotiator.select(['msgpack']) is None
+        conf_mock.get.assert_called_with(None, 'static_coder')
+
+    def test_default(self):
+        # Runtimes talk json unless the dynamic negotiator is configured
+        assert CalvinConfig().default_config()['global']['remote_coder_negotiator'] == 'static'
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.runtime.south.plugins.transports.lib.twisted.twisted_transport import CalvinTransport
+from calvin.runtime.north.calvin_network import CalvinNetwork, CalvinLink
+
+pytestmark = pytest.mark.unittest
+
+
+def transport(rt_id, proto=None):
+    tp = CalvinTransport(rt_id, "calvinip://127.0.0.1:5000", {}, Mock(), proto=proto)
+    tp._compression = 'zlib'
+    tp._compression_threshold = 100
+    return tp
+
+
+@patch('calvin.runtime.south.plugins.transports.lib.twisted.twisted_transport.async')
+class CompressionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sender = transport("node1")
+        self.receiver = transport("node2", proto=Mock())
+        # Join, the receiver is the accepting side
+        self.sender._send_join()
+        self.receiver._handle_join(self.sender._transport.send.call_args[0][0])
+        self.sender._handle_join_reply(self.receiver._transport.send.call_args[0][0])
+        self.sent = self.sender._transport.send
+        self.received = Mock()
+        self.receiver.callback_register('data_received', self.received)
+
+    def test_negotiated(self, async_mock):
+        assert self.sender._peer_compression == ['zlib']
+        assert self.receiver._peer_compression == ['zlib']
+
+    def test_compressed(self, async_mock):
+        msg = {'cmd': 'ACTOR_NEW', 'state': {'data': ['value'] * 100}}
+        sent = self.sender.get_stats()
+        received = self.receiver.get_stats()
+        self.sender.send(msg)
+        frame = self.sent.call_args[0][0]
+        assert frame.startswith('\x00Z')
+        self.receiver._data_received(frame)
+        self.received.assert_called_once_with(self.receiver, msg)
+
+        stats = self.sender.get_stats()
+        assert stats['compressed_frames'] == 1
+        assert stats['sent_wire_bytes'] - sent['sent_wire_bytes'] == len(frame)
+        raw_size = stats['sent_bytes'] - sent['sent_bytes']
+        assert raw_size > 4 * len(frame)
+        stats = self.receiver.get_stats()
+        assert stats['received_wire_bytes'] - received['received_wire_bytes'] == len(frame)
+        assert stats['received_bytes'] - received['received_bytes'] == raw_size
+
+    def test_below_threshold(self, async_mock):
+        self.sender.send({'cmd': 'REPLY'})
+        frame = self.sent.call_args[0][0]
+        assert frame == '{"cmd": "REPLY"}'
+        self.receiver._data_received(frame)
+        self.received.assert_called_once_with(self.receiver, {'cmd': 'REPLY'})
+        assert self.sender.get_stats()['compressed_frames'] == 0
+
+    def test_coalesced(self, async_mock):
+        self.sender._coalesce = True
+        self.sender._peer_coalesce = True
+        for n in range(20):
+            self.sender.send({'cmd': 'TUNNEL_DATA', 'n': n})
+        self.sender.flush()
+        assert self.sent.call_args[0][0].startswith('\x00Z')
+        self.receiver._data_received(self.sent.call_args[0][0])
+        assert [m['n'] for m in self.received.call_args[0][1]] == range(20)
+
+    def test_not_enabled(self, async_mock):
+        self.sender._compression = None
+        self.sender.send({'cmd': 'ACTOR_NEW', 'state': {'data': ['value'] * 100}})
+        assert self.sent.call_args[0][0].startswith('{')
+
+    def test_peer_without_compression(self, async_mock):
+        self.sender._peer_compression = []
+        self.sender.send({'cmd': 'ACTOR_NEW', 'state': {'data': ['value'] * 100}})
+        assert self.sent.call_args[0][0].startswith('{')
+
+    def test_join_uncompressed(self, async_mock):
+        sender = transport("node1")
+        receiver = transport("node2", proto=Mock())
+        receiver._compression_threshold = 0
+        sender._send_join()
+        receiver._handle_join(sender._transport.send.call_args[0][0])
+        assert receiver._transport.send.call_args[0][0].startswith('{')
+
+
+def test_link_stats():
+    network = CalvinNetwork(Mock())
+    control = transport("node1")
+    data = transport("node1")
+    network.links["node2"] = CalvinLink("node1", "node2", control)
+    network.data_links["node2"] = {'token': CalvinLink("node1", "node2", data)}
+    control._send_frame('x' * 10)
+    stats = network.link_stats()
+    assert stats["node2"]['link']['sent_bytes'] == 10
+    assert stats["node2"]['data_links']['token']['sent_bytes'] == 0
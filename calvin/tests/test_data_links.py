@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.runtime.south.plugins.transports.lib.twisted.twisted_transport import CalvinTransport
+from calvin.runtime.north.calvin_network import CalvinNetwork
+from calvin.runtime.north.calvin_proto import CalvinTunnel
+from calvin.runtime.north.portmanager import PortManager
+from calvin.actor.actorport import OutPort
+
+pytestmark = pytest.mark.unittest
+
+
+def tp_link(name=None, uri="calvinip://127.0.0.1:5001"):
+    tp = Mock()
+    tp.get_link_name.return_value = name
+    tp.get_uri.return_value = uri
+    return tp
+
+
+class JoinTests(unittest.TestCase):
+
+    def test_link_name_in_join(self):
+        client = CalvinTransport("node1", "calvinip://127.0.0.1:5000", {}, Mock(), link_name="token")
+        client._send_join()
+        request = client._transport.send.call_args[0][0]
+
+        server = CalvinTransport("node2", "calvinip://127.0.0.1:5001", {}, Mock(), proto=Mock())
+        assert server.get_link_name() is None
+        server._handle_join(request)
+        assert server.get_link_name() == "token"
+
+    def test_control_link_join(self):
+        client = CalvinTransport("node1", "calvinip://127.0.0.1:5000", {}, Mock())
+        client._send_join()
+        server = CalvinTransport("node2", "calvinip://127.0.0.1:5001", {}, Mock(), proto=Mock())
+        server._handle_join(client._transport.send.call_args[0][0])
+        assert server.get_link_name() is None
+
+
+@patch('calvin.runtime.north.calvin_network.async')
+class NetworkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.node = Mock()
+        self.node.id = "node2"
+        self.network = CalvinNetwork(self.node)
+        self.network.transports['calvinip'] = Mock()
+        self.control = Mock()
+        self.network.links["node1"] = self.control
+
+    def test_request(self, async_mock):
+        assert not self.network.data_link_request("node1", "token")
+        assert not self.network.data_link_request("node1", "token")
+        # Only one join for pending requests
+        assert self.node.storage.get_node.call_count == 1
+        cb = self.node.storage.get_node.call_args[0][1]
+        cb(key="node1", value={'uri': ["calvinip://127.0.0.1:5001"]})
+        self.network.transports['calvinip'].join.assert_called_once_with("calvinip://127.0.0.1:5001", link_name="token")
+
+        tp = tp_link("token")
+        self.network.join_finished(tp, "node1", "calvinip://127.0.0.1:5001", True)
+        assert self.network.data_link_get("node1", "token").transport is tp
+        # The control link is untouched
+        assert self.network.links["node1"] is self.control
+        assert self.network.data_link_request("node1", "token")
+        assert not self.network.pending_data_links
+
+    def test_failed_join(self, async_mock):
+        self.network.data_link_request("node1", "token")
+        cb = self.node.storage.get_node.call_args[0][1]
+        cb(key="node1", value={'uri': ["calvinip://127.0.0.1:5001"]})
+        self.network.peer_disconnected(tp_link("token"), None, "failed")
+        assert not self.network.pending_data_links
+
+    def test_simultaneous(self, async_mock):
+        # Peer node1 has the lower id, the link we requested is kept
+        ours = tp_link("token")
+        peers = tp_link("token")
+        self.network.join_finished(peers, "node1", "calvinip://127.0.0.1:5001", False)
+        self.network.join_finished(ours, "node1", "calvinip://127.0.0.1:5001", True)
+        assert self.network.data_link_get("node1", "token").transport is ours
+        # The replaced link is closed later
+        assert async_mock.DelayedCall.call_count == 1
+        self.network.join_finished(tp_link("token"), "node1", "calvinip://127.0.0.1:5001", False)
+        assert self.network.data_link_get("node1", "token").transport is ours
+
+    def test_disconnect(self, async_mock):
+        tp = tp_link("port-1")
+        self.network.join_finished(tp, "node1", "calvinip://127.0.0.1:5001", True)
+        self.network.peer_disconnected(tp, "node1", "closed")
+        assert self.network.data_link_get("node1", "port-1") is None
+        assert "node1" in self.network.links
+
+        self.network.join_finished(tp, "node1", "calvinip://127.0.0.1:5001", True)
+        self.network.data_link_close("node1", "port-1")
+        tp.disconnect.assert_called_once_with()
+        assert self.network.data_link_get("node1", "port-1") is None
+
+    def test_control_link_removed(self, async_mock):
+        tp = tp_link("token")
+        self.network.join_finished(tp, "node1", "calvinip://127.0.0.1:5001", True)
+        self.network.link_remove("node1")
+        tp.disconnect.assert_called_once_with()
+        assert not self.network.data_links
+
+
+class TunnelTests(unittest.TestCase):
+
+    def test_send(self):
+        links = {"node1": Mock()}
+        data_links = {}
+        tunnel = CalvinTunnel(links, {}, "node1", 'token', {}, rt_id="node2", id="TUNNEL1", data_links=data_links)
+        on_link = tunnel.on_link('token')
+        assert tunnel.on_link(None) is tunnel
+        assert on_link.id == "TUNNEL1"
+
+        # Control link is used until the data link is established
+        on_link.send({'n': 1})
+        assert links["node1"].send.call_count == 1
+
+        data_links["node1"] = {'token': Mock()}
+        on_link.send({'n': 2})
+        data_links["node1"]['token'].send.assert_called_once_with({'cmd': 'TUNNEL_DATA', 'value': {'n': 2}, 'tunnel_id': "TUNNEL1"})
+        tunnel.send({'n': 3})
+        assert links["node1"].send.call_count == 2
+
+
+class PortManagerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pm = PortManager(Mock(), Mock())
+        self.port = OutPort('out', Mock())
+
+    @patch('calvin.runtime.north.portmanager._conf')
+    def test_link_name(self, conf_mock):
+        conf_mock.get.return_value = 'shared'
+        assert self.pm._link_name(self.port) is None
+        self.port.link = 'token'
+        assert self.pm._link_name(self.port) == 'token'
+        self.port.link = 'dedicated'
+        assert self.pm._link_name(self.port) == 'port-' + self.port.id
+        self.port.link = None
+        conf_mock.get.return_value = 'dedicated'
+        assert self.pm._link_name(self.port) == 'port-' + self.port.id
+
+    def test_release_link(self):
+        ep = Mock()
+        ep.tunnel = CalvinTunnel({}, {}, "node1", 'token', {}, id="TUNNEL1").on_link('port-1')
+        self.pm._release_link(ep)
+        self.pm.node.network.data_link_close.assert_called_once_with("node1", 'port-1')
+        # Links shared by all connections are kept
+        ep.tunnel = ep.tunnel.on_link('token')
+        self.pm._release_link(ep)
+        assert self.pm.node.network.data_link_close.call_count == 1
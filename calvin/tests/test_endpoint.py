@@ -20,6 +20,7 @@ from mock import Mock
 
 from calvin.actor.actorport import InPort, OutPort
 from calvin.runtime.north.calvin_token import Token
+from calvin.runtime.south import endpoint
 from calvin.runtime.south.endpoint import LocalInEndpoint, LocalOutEndpoint, TunnelInEndpoint, TunnelOutEndpoint
 
 pytestmark = pytest.mark.unittest
@@ -213,6 +214,15 @@ class TestTunnelEndpoint(unittest.TestCase):
         self.tunnel_out.communicate()
         assert self.tunnel.send.call_count == 2
 
+    def test_dirty(self):
+        self.tunnel_out.monitor = Mock()
+        self.tunnel_out.port.write_token(Token(1))
+        self.tunnel_out.monitor.set_dirty.assert_called_with(self.tunnel_out)
+        self.tunnel_out.monitor.reset_mock()
+        self.tunnel_out.communicate()
+        self.tunnel_out.reply(0, 'ACK')
+        self.tunnel_out.monitor.set_dirty.assert_called_with(self.tunnel_out)
+
     def test_communicate(self):
         self.tunnel_out.port.write_token(Token(1))
         self.tunnel_out.port.write_token(Token(2))
@@ -227,3 +237,231 @@ class TestTunnelEndpoint(unittest.TestCase):
         self.tunnel_out.reply(1, 'ACK')
         assert self.tunnel_out.communicate() is True
         assert self.tunnel.send.call_count == 2
+
+    def test_recv_tokens(self):
+        payload = {
+            'port_id': self.port.id,
+            'peer_port_id': self.peer_port.id,
+            'sequencenbr': 0,
+            'tokens': [{'type': 'Token', 'data': n} for n in range(6)]
+        }
+        # Only 4 fits
+        self.tunnel_in.recv_tokens(payload)
+        assert self.trigger_loop.called
+        assert [self.port.fifo.fifo[n].value for n in range(4)] == [0, 1, 2, 3]
+        self.tunnel.send.assert_called_with({
+            'cmd': 'TOKENS_REPLY',
+            'port_id': self.port.id,
+            'peer_port_id': self.peer_port.id,
+            'sequencenbr': 0,
+            'acked': 4,
+            'credit': 0,
+            'value': 'NACK'
+        })
+
+        # Resent tokens already received are skipped
+        assert self.tunnel_in.read_token().value == 0
+        assert self.tunnel_in.read_token().value == 1
+        payload['sequencenbr'] = 2
+        payload['tokens'] = [{'type': 'Token', 'data': n} for n in range(2, 6)]
+        self.tunnel_in.recv_tokens(payload)
+        assert [self.tunnel_in.read_token().value for _ in range(4)] == [2, 3, 4, 5]
+        reply = self.tunnel.send.call_args[0][0]
+        assert (reply['acked'], reply['credit'], reply['value']) == (6, 0, 'ACK')
+
+        # Out of sequence
+        self.trigger_loop.reset_mock()
+        payload['sequencenbr'] = 10
+        self.tunnel_in.recv_tokens(payload)
+        assert not self.trigger_loop.called
+        reply = self.tunnel.send.call_args[0][0]
+        assert (reply['sequencenbr'], reply['acked'], reply['value']) == (10, 6, 'NACK')
+
+    def test_batch_communicate(self):
+        self.tunnel_out.batch = True
+        for n in range(3):
+            self.tunnel_out.port.write_token(Token(n))
+        assert self.tunnel_out.communicate() is True
+        assert self.tunnel.send.call_count == 1
+        msg = self.tunnel.send.call_args[0][0]
+        assert msg['cmd'] == 'TOKENS'
+        assert msg['sequencenbr'] == 0
+        assert [t['data'] for t in msg['tokens']] == [0, 1, 2]
+        assert self.tunnel_out.communicate() is False
+
+    def test_tokens_reply(self):
+        fifo = self.tunnel_out.port.fifo
+        self.tunnel_out.batch = True
+        self.tunnel_out.monitor = Mock()
+        for n in range(3):
+            self.tunnel_out.port.write_token(Token(n))
+        self.tunnel_out.communicate()
+
+        # First two received, no room for more
+        self.tunnel_out.reply_tokens(0, 2, 0, 'NACK')
+        assert fifo.read_pos[self.port.id] == 2
+        assert fifo.tentative_read_pos[self.port.id] == 2
+        assert self.tunnel_out.window == 2
+        # Nothing sent without credit, but a check is scheduled
+        self.tunnel_out.monitor.set_timer.assert_called_with(self.tunnel_out, endpoint.WINDOW_PROBE_INTERVAL)
+        self.tunnel.send.reset_mock()
+        assert self.tunnel_out.communicate() is False
+        assert not self.tunnel.send.called
+
+        # Credit for one
+        self.tunnel_out.reply_tokens(2, 2, 1, 'ACK')
+        assert self.tunnel_out.communicate() is True
+        msg = self.tunnel.send.call_args[0][0]
+        assert (msg['sequencenbr'], len(msg['tokens'])) == (2, 1)
+
+        # Reply on batch sent before the rollback only commits
+        self.tunnel_out.reply_tokens(5, 2, 1, 'NACK')
+        assert fifo.tentative_read_pos[self.port.id] == 3
+
+        self.tunnel_out.reply_tokens(2, 3, 3, 'ACK')
+        assert fifo.read_pos[self.port.id] == 3
+        assert self.tunnel_out.window == 6
+
+    def test_window_probe(self):
+        self.tunnel_out.batch = True
+        self.tunnel_out.port.write_token(Token(1))
+        self.tunnel_out.window = 0
+        self.tunnel_out.time_cont = 0.0
+        # Probe with empty batch when no credit
+        assert self.tunnel_out.communicate() is False
+        msg = self.tunnel.send.call_args[0][0]
+        assert (msg['cmd'], msg['sequencenbr'], msg['tokens']) == ('TOKENS', 0, [])
+        self.tunnel.send.reset_mock()
+        self.tunnel_out.communicate()
+        assert not self.tunnel.send.called
+
+        payload = dict(msg)
+        self.tunnel_in.recv_tokens(payload)
+        reply = self.tunnel.send.call_args[0][0]
+        assert (reply['acked'], reply['credit'], reply['value']) == (0, 4, 'ACK')
+
+        # Empty batch beyond what is received means lost tokens
+        payload['sequencenbr'] = 2
+        self.tunnel_in.recv_tokens(payload)
+        assert self.tunnel.send.call_args[0][0]['value'] == 'NACK'
+
+    def test_credit_update(self):
+        self.tunnel_in.batch = True
+        payload = {
+            'port_id': self.peer_port.id,
+            'peer_port_id': self.port.id,
+            'sequencenbr': 0,
+            'tokens': [{'type': 'Token', 'data': n} for n in range(4)]
+        }
+        self.tunnel_in.recv_tokens(payload)
+        assert self.tunnel.send.call_args[0][0]['credit'] == 0
+
+        # Peer out of credit, tell it when there is room
+        self.tunnel.send.reset_mock()
+        self.tunnel_in.read_token()
+        self.tunnel.send.assert_called_with({
+            'cmd': 'TOKENS_REPLY',
+            'port_id': self.peer_port.id,
+            'peer_port_id': self.port.id,
+            'sequencenbr': 4,
+            'acked': 4,
+            'credit': 1,
+            'value': 'ACK'
+        })
+        self.tunnel.send.reset_mock()
+        self.tunnel_in.peek_token()
+        self.tunnel_in.commit_peek_as_read()
+        assert self.tunnel.send.call_args[0][0]['credit'] == 2
+        # Peer has enough credit
+        self.tunnel.send.reset_mock()
+        self.tunnel_in.read_token()
+        assert not self.tunnel.send.called
+
+    def _deliver(self, drop=None):
+        """ Deliver the messages sent over the tunnel, returns the number delivered """
+        calls = self.tunnel.send.call_args_list[:]
+        self.tunnel.send.reset_mock()
+        for n, call in enumerate(calls):
+            msg = call[0][0]
+            if drop and drop(n, msg):
+                continue
+            if msg['cmd'] == 'TOKENS':
+                self.tunnel_in.recv_tokens(msg)
+            elif msg['cmd'] == 'TOKEN_CHUNK':
+                self.tunnel_in.recv_token_chunk(msg)
+            elif msg['cmd'] == 'TOKENS_REPLY':
+                self.tunnel_out.reply_tokens(msg['sequencenbr'], msg['acked'], msg['credit'], msg['value'])
+            elif msg['cmd'] == 'TOKEN_CHUNK_REPLY':
+                self.tunnel_out.reply_token_chunk(msg['sequencenbr'], msg['received'], msg['epoch'], msg['value'])
+        return len(calls)
+
+    def _chunked(self):
+        self.tunnel_out = TunnelOutEndpoint(self.peer_port, self.tunnel, self.node_id, self.port.id, self.trigger_loop,
+                                            batch=True, chunked=True)
+        self.tunnel_out.chunk_size = 10
+        self.peer_port.attach_endpoint(self.tunnel_out)
+        self.tunnel_in.batch = True
+        large = "x" * 25 + "y" * 10
+        for data in [1, large, 2]:
+            self.peer_port.write_token(Token(data))
+        return large
+
+    def test_chunked_transfer(self):
+        large = self._chunked()
+        assert self.tunnel_out.communicate() is True
+        # The token before is batched, then the chunks within the chunk window
+        cmds = [c[0][0]['cmd'] for c in self.tunnel.send.call_args_list]
+        assert cmds == ['TOKENS'] + ['TOKEN_CHUNK'] * 4
+        assert self.tunnel_out.communicate() is False
+        while self._deliver():
+            self.tunnel_out.communicate()
+        assert [self.tunnel_in.read_token().value for _ in range(3)] == [1, large, 2]
+        assert self.tunnel_out.chunking is None
+        assert self.peer_port.fifo.read_pos[self.port.id] == 3
+
+    def test_chunk_window(self):
+        self.tunnel_out = TunnelOutEndpoint(self.peer_port, self.tunnel, self.node_id, self.port.id, self.trigger_loop,
+                                            batch=True, chunked=True)
+        self.tunnel_out.chunk_size = 10
+        self.peer_port.attach_endpoint(self.tunnel_out)
+        self.peer_port.write_token(Token("z" * 100))
+        self.tunnel_out.communicate()
+        assert self.tunnel.send.call_count == endpoint.CHUNK_WINDOW
+        # One more chunk for each acked
+        self.tunnel.send.reset_mock()
+        self.tunnel_out.reply_token_chunk(0, 10, 0, 'ACK')
+        self.tunnel_out.communicate()
+        assert self.tunnel.send.call_count == 1
+        assert self.tunnel.send.call_args[0][0]['offset'] == 40
+
+    def test_lost_chunk(self):
+        large = self._chunked()
+        self.tunnel_out.communicate()
+        # Second chunk is lost, the following are NACKed and resent
+        self._deliver(drop=lambda n, msg: msg['cmd'] == 'TOKEN_CHUNK' and msg['offset'] == 10)
+        while self._deliver():
+            self.tunnel_out.communicate()
+        assert [self.tunnel_in.read_token().value for _ in range(3)] == [1, large, 2]
+
+    def test_lost_chunk_replies(self):
+        large = self._chunked()
+        self.tunnel_out.monitor = Mock()
+        self.tunnel_out.communicate()
+        # Deliver the chunks but lose the replies
+        self._deliver()
+        self.tunnel.send.reset_mock()
+        assert self.tunnel_out.communicate() is False
+        self.tunnel_out.monitor.set_timer.assert_called_with(self.tunnel_out, pytest.approx(endpoint.WINDOW_PROBE_INTERVAL, abs=0.1))
+        # Resent when no replies within the probe interval
+        self.tunnel_out.time_cont = 0.0
+        assert self.tunnel_out.communicate() is True
+        while self._deliver():
+            self.tunnel_out.communicate()
+        assert [self.tunnel_in.read_token().value for _ in range(3)] == [1, large, 2]
+
+    def test_not_chunked(self):
+        # Peer not accepting chunks get the large token in a batch
+        self.tunnel_out.batch = True
+        self.peer_port.write_token(Token("x" * 100000))
+        self.tunnel_out.communicate()
+        assert self.tunnel.send.call_args[0][0]['cmd'] == 'TOKENS'
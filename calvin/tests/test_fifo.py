@@ -15,12 +15,15 @@
 # limitations under the License.
 
 import unittest
+from mock import patch
 from calvin.runtime.north import fifo
 from calvin.runtime.north.calvin_token import Token
 
 
 class FifoTests(unittest.TestCase):
 
+    fifo_class = fifo.FIFO
+
     def setUp(self):
         pass
 
@@ -35,7 +38,7 @@ class FifoTests(unittest.TestCase):
 
     def test1(self):
         """Adding reader again (reconnect)"""
-        f = fifo.FIFO(5)
+        f = self.fifo_class(5)
         f.add_reader('p1.id')
         data = ['1', '2', '3', '4']
         for token in data:
@@ -66,7 +69,7 @@ class FifoTests(unittest.TestCase):
     def test2(self):
         """Multiple readers"""
 
-        f = fifo.FIFO(5)
+        f = self.fifo_class(5)
         f.add_reader("r1")
         f.add_reader("r2")
 
@@ -118,7 +121,7 @@ class FifoTests(unittest.TestCase):
 
     def test3(self):
         """Testing commit reads"""
-        f = fifo.FIFO(5)
+        f = self.fifo_class(5)
         f.add_reader("r1")
 
         for token in ['1', '2', '3', '4']:
@@ -144,7 +147,7 @@ class FifoTests(unittest.TestCase):
 
     def test4(self):
         """Testing rollback reads"""
-        f = fifo.FIFO(5)
+        f = self.fifo_class(5)
         f.add_reader('r1')
 
         for token in ['1', '2', '3', '4']:
@@ -176,3 +179,148 @@ class FifoTests(unittest.TestCase):
         self.assertTrue(f.write(Token('a')))
         self.assertFalse(f.can_write())
         self.assertFalse(f.write(Token('b')))
+
+    def test_resize(self):
+        """Resizing keeps queued tokens"""
+        f = self.fifo_class(5)
+        f.add_reader("r1")
+        f.add_reader("r2")
+        for token in ['1', '2', '3', '4']:
+            self.assertTrue(f.write(Token(token)))
+        self.verify_data(['1', '2'], [f.read("r1") for _ in range(2)])
+        f.commit_reads("r1")
+        self.verify_data(['1'], [f.read("r2")])
+
+        self.assertTrue(f.resize(8))
+        self.assertEquals(f.N, 8)
+        self.assertEquals(len(f), 4)
+        self.assertEquals(f.available_slots(), 3)
+        for token in ['5', '6', '7']:
+            self.assertTrue(f.write(Token(token)))
+        self.assertFalse(f.can_write())
+        self.verify_data(['3', '4', '5', '6', '7'], [f.read("r1") for _ in range(5)])
+        self.verify_data(['2', '3', '4', '5', '6', '7'], [f.read("r2") for _ in range(6)])
+        f.commit_reads("r1")
+        f.commit_reads("r2")
+
+        # Too small for queued tokens
+        self.assertTrue(f.write(Token('8')))
+        self.assertTrue(f.write(Token('9')))
+        self.assertFalse(f.resize(2))
+        self.assertTrue(f.resize(3))
+        self.assertFalse(f.can_write())
+        self.verify_data(['8', '9'], [f.read("r1") for _ in range(2)])
+
+    def test_grow(self):
+        """Repeatedly full fifo grows up to max length"""
+        f = self.fifo_class(3, 8)
+        f.add_reader("r1")
+        sizes = []
+        for i in range(20):
+            while f.write(Token(i)):
+                pass
+            sizes.append(f.N)
+            self.assertEquals([f.read("r1") is not None for _ in range(len(f))], [True] * len(f))
+            f.commit_reads("r1")
+        self.assertEquals(sizes[0], 3)
+        self.assertEquals(f.N, 8)
+        self.assertTrue(6 in sizes)
+
+        # No growth by default
+        f = self.fifo_class(3)
+        f.add_reader("r1")
+        for i in range(10):
+            while f.write(Token(i)):
+                pass
+            f.read("r1")
+            f.commit_reads("r1")
+        self.assertEquals(f.N, 3)
+
+    @patch('calvin.runtime.north.fifo.time')
+    def test_grow_spread_fills(self, time_mock):
+        """Fills far apart in time do not grow the fifo"""
+        f = self.fifo_class(3, 8)
+        f.add_reader("r1")
+        for i in range(6):
+            time_mock.time.return_value = 3600.0 * i
+            while f.write(Token(i)):
+                pass
+            while f.read("r1") is not None:
+                pass
+            f.commit_reads("r1")
+        self.assertEquals(f.N, 3)
+        # but within the window they do
+        for i in range(3):
+            time_mock.time.return_value = 30000.0 + 0.1 * i
+            while f.write(Token(i)):
+                pass
+            while f.read("r1") is not None:
+                pass
+            f.commit_reads("r1")
+        self.assertEquals(f.N, 6)
+
+    def test_grow_state(self):
+        """Size and growth limit are part of the state"""
+        f = self.fifo_class(3, 12)
+        f.add_reader("r1")
+        f.write(Token('1'))
+        f.resize(6)
+        g = self.fifo_class(5)
+        g._set_state(f._state())
+        self.assertEquals((g.N, g.max_N), (6, 12))
+        self.verify_data(['1'], [g.read("r1")])
+
+
+class CompactFifoTests(FifoTests):
+
+    fifo_class = fifo.CompactFIFO
+
+    def test_slowest_reader(self):
+        """Slowest reader tracked when readers come and go"""
+        f = self.fifo_class(5)
+        f.add_reader("r1")
+        f.add_reader("r2")
+        for token in ['1', '2', '3']:
+            self.assertTrue(f.write(Token(token)))
+        f.read("r1")
+        f.read("r1")
+        f.commit_reads("r1")
+        self.assertEquals(len(f), 3)
+        self.assertEquals(f.available_slots(), 1)
+        f.remove_reader("r2")
+        self.assertEquals(len(f), 1)
+        self.assertEquals(f.available_slots(), 3)
+        self.assertEquals(f.read_pos["r1"], 2)
+        # Position set from outside, as when syncing local fifos
+        f.read_pos["r1"] = 3
+        f.tentative_read_pos["r1"] = 3
+        self.assertEquals(len(f), 0)
+        self.assertFalse(f.can_read("r1"))
+
+    def test_unknown_reader(self):
+        f = self.fifo_class(5)
+        with self.assertRaises(Exception):
+            f.read("r1")
+
+    def test_state(self):
+        """State compatible with FIFO"""
+        f = self.fifo_class(5)
+        f.add_reader("r1")
+        f.add_reader("r2")
+        for token in ['1', '2', '3']:
+            f.write(Token(token))
+        f.read("r1")
+        f.commit_reads("r1")
+        f.read("r2")
+        state = f._state()
+
+        g = fifo.FIFO(5)
+        g._set_state(state)
+        self.assertEquals(g._state(), state)
+        self.assertEquals(len(g), len(f))
+
+        h = self.fifo_class(5)
+        h._set_state(g._state())
+        self.assertEquals(h._state(), state)
+        self.verify_data(['2', '3'], [h.read("r1") for _ in range(2)])
+        self.verify_data(['2'], [h.read("r2")])
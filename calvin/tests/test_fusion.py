@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.tests import DummyNode
+from calvin.actor.actor import ActionResult
+from calvin.runtime.north.actormanager import ActorManager
+from calvin.runtime.north.scheduler import EventScheduler
+from calvin.runtime.north.calvin_token import Token, EOSToken
+from calvin.runtime.south.endpoint import LocalInEndpoint, LocalOutEndpoint
+
+pytestmark = pytest.mark.unittest
+
+
+def connect(out_actor, out_name, in_actor, in_name):
+    outport = out_actor.outports[out_name]
+    inport = in_actor.inports[in_name]
+    inport.attach_endpoint(LocalInEndpoint(inport, outport))
+    outport.attach_endpoint(LocalOutEndpoint(outport, inport))
+
+
+def sink_values(actor):
+    port = actor.inports['void']
+    values = []
+    while port.available_tokens():
+        values.append(port.peek_token().value)
+    port.peek_rewind()
+    return values
+
+
+@patch('calvin.actor.actor._conf')
+class FusionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.am = ActorManager(node=DummyNode())
+
+    def _new_actor(self, a_type, a_args):
+        a = self.am.actors[self.am.new(a_type, a_args)]
+        a._calvinsys = Mock()
+        return a
+
+    def _chain(self, n=5):
+        """ Constant -> Identity -> Stringify -> PrefixString -> Terminator """
+        actors = [self._new_actor('std.Constant', {'data': 42, 'n': n}),
+                  self._new_actor('std.Identity', {}),
+                  self._new_actor('std.Stringify', {}),
+                  self._new_actor('text.PrefixString', {'prefix': 'P'}),
+                  self._new_actor('std.Terminator', {})]
+        connect(actors[0], 'token', actors[1], 'token')
+        connect(actors[1], 'token', actors[2], 'in')
+        connect(actors[2], 'out', actors[3], 'in')
+        # Not fired, tokens stay in its inport
+        actors[4].inports['void'].attach_endpoint(LocalInEndpoint(actors[4].inports['void'], actors[3].outports['out']))
+        actors[3].outports['out'].attach_endpoint(LocalOutEndpoint(actors[3].outports['out'], actors[4].inports['void']))
+        return actors
+
+    def test_fused(self, conf_mock):
+        conf_mock.get.return_value = True
+        actors = self._chain()
+        chain = actors[1]._fused_chain
+        assert chain is not None
+        assert chain.actors == actors[1:4]
+        assert actors[0]._fused_chain is None
+        assert actors[4]._fused_chain is None
+
+        actors[0].fire()
+        result = actors[1].fire()
+        assert result.did_fire
+        # Only the head fired, the tokens passed the chain
+        values = sink_values(actors[4])
+        assert values == ['P42'] * len(values)
+        assert result.tokens_consumed == 3 * len(values)
+        assert not actors[2].fire().did_fire
+        assert not actors[3].fire().did_fire
+
+    def test_not_enabled(self, conf_mock):
+        conf_mock.get.return_value = False
+        actors = self._chain()
+        assert all(a._fused_chain is None for a in actors)
+
+    def test_disconnect(self, conf_mock):
+        conf_mock.get.return_value = True
+        actors = self._chain()
+        inport = actors[2].inports['in']
+        inport.detach_endpoint(inport.endpoint)
+        assert all(a._fused_chain is None for a in actors)
+        # Reconnected, fused again
+        connect(actors[1], 'token', actors[2], 'in')
+        assert actors[1]._fused_chain.actors == actors[1:4]
+
+    def test_tokens_in_between(self, conf_mock):
+        conf_mock.get.return_value = False
+        actors = self._chain(n=2)
+        actors[0].fire()
+        # Leave tokens inside the chain before fusing
+        actors[1].fire()
+        actors[0].n = 2
+        actors[0].fire()
+        conf_mock.get.return_value = True
+        actors[1].did_connect(actors[1].inports['token'])
+        assert actors[1]._fused_chain is not None
+        assert not actors[1]._fused_chain.fire().did_fire
+        for actor in actors[2:4]:
+            actor.fire()
+        assert actors[1]._fused_chain.fire().did_fire
+        assert sink_values(actors[4]) == ['P42'] * 4
+
+    def test_exception_token(self, conf_mock):
+        conf_mock.get.return_value = True
+        actors = self._chain(n=1)
+        for actor in actors[1:3]:
+            # Pass on the exception token
+            actor.exception_handler = lambda action, args, context: ActionResult(production=(args[0], ))
+        actors[0].fire()
+        actors[0].outports['token'].write_token(EOSToken())
+        actors[0].outports['token'].write_token(Token(43))
+        actors[1].fire()
+        actors[2].fire()
+        actors[3].fire()
+        actors[1].fire()
+        values = sink_values(actors[4])
+        assert values[0] == 'P42'
+        assert values[2] == 'P43'
+        assert values[1] == EOSToken().value
+
+    def test_scheduler_peers(self, conf_mock):
+        conf_mock.get.return_value = True
+        actors = self._chain()
+        sched = EventScheduler(None, self.am, Mock())
+        assert actors[4].id in sched._local_peers(actors[1])
+        assert actors[4].id not in sched._local_peers(actors[2])
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from mock import Mock, patch
+
+from calvin.tests import DummyNode
+from calvin.runtime.north.actormanager import ActorManager
+from calvin.runtime.north.calvincontrol import CalvinControl
+from calvin.runtime.north import hooks
+from calvin.runtime.north import metering
+
+pytestmark = pytest.mark.unittest
+
+
+@pytest.fixture
+def firing_hooks():
+    with patch('calvin.runtime.north.hooks._firing_hooks', hooks.FiringHooks()) as firing_hooks:
+        yield firing_hooks
+
+
+def constant(n):
+    am = ActorManager(DummyNode())
+    actor = am.actors[am.new('std.Constant', {'data': 42, 'n': n})]
+    actor._calvinsys = Mock()
+    actor.fsm.transition_to(actor.STATUS.ENABLED)
+    return actor
+
+
+def test_attach(firing_hooks):
+    hook = Mock()
+    firing_hooks.attach(hook)
+    firing_hooks.attach(hook)
+    assert firing_hooks.fired == [hook]
+    firing_hooks.detach(hook)
+    firing_hooks.detach(hook)
+    assert firing_hooks.fired == []
+
+
+@patch('calvin.runtime.north.metering._conf')
+def test_fire(conf_mock, firing_hooks):
+    conf_mock.get.return_value = 0.0
+    actor = constant(1)
+    actor.metering = Mock()
+    actor.control = Mock()
+    assert actor.fire().did_fire
+    # Nothing attached, nothing called
+    assert not actor.metering.fired.called
+    assert not actor.control.log_actor_firing.called
+
+    hook = Mock()
+    firing_hooks.attach(hook)
+    actor = constant(1)
+    actor.fire()
+    assert hook.call_count == 1
+    assert hook.call_args[0][0] is actor
+    assert hook.call_args[0][2].did_fire
+
+
+@patch('calvin.runtime.north.metering._conf')
+def test_metering(conf_mock, firing_hooks):
+    conf_mock.get.return_value = 0.0
+    meter = metering.Metering(Mock())
+    assert not firing_hooks.fired
+    user_id = meter.register()
+    assert firing_hooks.fired == [meter.actor_fired]
+    meter.unregister(user_id)
+    assert not firing_hooks.fired
+
+    # Aggregated metering is always collected
+    conf_mock.get.return_value = 10.0
+    with patch('calvin.runtime.north.metering._metering', None):
+        meter = metering.set_metering(metering.Metering(Mock()))
+        meter.unregister(meter.register())
+        assert firing_hooks.fired == [meter.actor_fired]
+
+
+def test_control_log(firing_hooks):
+    control = CalvinControl()
+    control.send_response = Mock()
+    control.handle_post_log(None, None, None, {'events': ['actor_new']}, None)
+    assert not firing_hooks.fired
+    control.handle_post_log(None, None, None, {'user_id': "TRACE1", 'events': ['actor_firing']}, None)
+    assert firing_hooks.fired == [control.actor_fired]
+
+    match = Mock()
+    match.group.return_value = "TRACE1"
+    control.handle_delete_log(None, None, match, None, None)
+    assert not firing_hooks.fired
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.utilities import logstore
+from calvin.utilities.logstore import LogStore
+from calvin.runtime.north.plugins.storage.persistent import PersistentStorage
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.utilities.logstore.async')
+class LogStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "store")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reopen(self, async_mock):
+        store = LogStore(self.path)
+        store["a"] = "1"
+        store["b"] = None
+        store["c"] = "3"
+        store["a"] = "4"
+        store.delete("c")
+        store.close()
+        store = LogStore(self.path)
+        assert dict(store.iteritems()) == {"a": "4", "b": None}
+        # Ordered by the time they were set
+        assert list(store) == ["b", "a"]
+        # Replaced a, set and delete of c
+        assert store.stale_bytes == 3 * logstore._HEADER.size + 5
+        assert store.live_bytes == 2 * logstore._HEADER.size + 3
+
+    def test_sync_batching(self, async_mock):
+        store = LogStore(self.path, sync_delay=0.5, sync_count=3)
+        store["a"] = "1"
+        store["b"] = "2"
+        # One timer for the writes waiting to be synced
+        async_mock.DelayedCall.assert_called_once_with(0.5, store._sync_timeout)
+        assert store.unsynced == 2
+        store["c"] = "3"
+        assert store.unsynced == 0
+        async_mock.DelayedCall.return_value.cancel.assert_called_once_with()
+
+    def test_truncated_record(self, async_mock):
+        store = LogStore(self.path)
+        store["a"] = "1"
+        store["b"] = "2"
+        store.close()
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(size - 1)
+        store = LogStore(self.path)
+        assert dict(store.iteritems()) == {"a": "1"}
+        store["c"] = "3"
+        store.close()
+        assert dict(LogStore(self.path).iteritems()) == {"a": "1", "c": "3"}
+
+    @patch('calvin.utilities.logstore.COMPACT_MIN_BYTES', 1000)
+    def test_compact(self, async_mock):
+        store = LogStore(self.path)
+        store["b"] = "1"
+        # A growing value, as an index set appended to, few records but many stale bytes
+        for i in range(1, 10):
+            store["a"] = "x" * 100 * i
+        store.sync()
+        assert store.stale_bytes == 0
+        assert os.path.getsize(self.path) == store.live_bytes
+        store.close()
+        assert dict(LogStore(self.path).iteritems()) == {"a": "x" * 900, "b": "1"}
+
+    def test_in_memory(self, async_mock):
+        store = LogStore(None)
+        store["a"] = "1"
+        store.delete("a")
+        store["b"] = "2"
+        store.close()
+        assert dict(store.iteritems()) == {"b": "2"}
+        assert not async_mock.DelayedCall.called
+
+    @patch('calvin.utilities.logstore.time')
+    def test_older_than(self, time_mock, async_mock):
+        store = LogStore(self.path)
+        time_mock.time.return_value = 100.0
+        store["a"] = "1"
+        time_mock.time.return_value = 200.0
+        store["b"] = "2"
+        assert list(store.iteritems_older_than(50.0)) == [("a", "1")]
+
+
+@patch('calvin.utilities.logstore.async')
+@patch('calvin.runtime.north.plugins.storage.persistent.async')
+class PersistentStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _start(self, node_name="runtime/1"):
+        node = Mock(id="node1")
+        node.attributes.get_node_name_as_str.return_value = node_name
+        storage = PersistentStorage(node)
+        options = {'storage_path': self.dir, 'storage_sync_delay': 0}
+        with patch.object(logstore._conf, 'get', side_effect=lambda section, option: options.get(option)):
+            storage.start(name=node_name or node.id)
+        return storage
+
+    def test_restart(self, async_mock, logstore_async_mock):
+        storage = self._start()
+        assert storage.store.path == os.path.join(self.dir, "runtime_1.local")
+        cb = Mock()
+        storage.set("node-1", '{"uri": "x"}', cb=cb)
+        cb.assert_called_once_with(key="node-1", value=True)
+        storage.append("index-/a", json.dumps(["n1"]))
+        storage.append("index-/a", json.dumps(["n2"]))
+        storage.remove("index-/a", json.dumps(["n1"]))
+        storage.stop()
+        storage = self._start()
+        cb = Mock()
+        storage.get("node-1", cb=cb)
+        cb.assert_called_once_with(key="node-1", value='{"uri": "x"}')
+        storage.get_concat("index-/a", cb=cb)
+        assert json.loads(cb.call_args[1]['value']) == ["n2"]
+        # Deleted with a None value
+        storage.set("node-1", None)
+        storage.get("node-1", cb=cb)
+        assert cb.call_args[1]['value'] is None
+
+    def test_unnamed(self, async_mock, logstore_async_mock):
+        # The id of an unnamed runtime is new every start, the storage is kept in memory
+        storage = self._start(node_name=None)
+        assert storage.store.path is None
+        cb = Mock()
+        storage.set("node-1", '{"uri": "x"}')
+        storage.get("node-1", cb=cb)
+        cb.assert_called_once_with(key="node-1", value='{"uri": "x"}')
+        storage.stop()
+        assert os.listdir(self.dir) == []
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.runtime.south.monitor import Event_Monitor
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.runtime.south.monitor.async')
+class MonitorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = Event_Monitor()
+        self.scheduler = Mock()
+        self.endpoints = [Mock(), Mock()]
+        for endp in self.endpoints:
+            endp.communicate.return_value = False
+            self.monitor.register_out_endpoint(endp)
+
+    def test_only_dirty(self, async_mock):
+        # New endpoints are visited once
+        assert self.monitor.loop(self.scheduler) is False
+        assert all(e.communicate.call_count == 1 for e in self.endpoints)
+        self.monitor.loop(self.scheduler)
+        assert all(e.communicate.call_count == 1 for e in self.endpoints)
+
+        self.endpoints[1].communicate.return_value = True
+        self.monitor.set_dirty(self.endpoints[1])
+        self.monitor.set_dirty(self.endpoints[1])
+        assert self.monitor.loop(self.scheduler) is True
+        assert self.endpoints[0].communicate.call_count == 1
+        assert self.endpoints[1].communicate.call_count == 2
+
+    def test_unregister(self, async_mock):
+        self.monitor.unregister_out_endpoint(self.endpoints[0])
+        assert self.endpoints[0].monitor is None
+        self.monitor.loop(self.scheduler)
+        assert not self.endpoints[0].communicate.called
+        assert self.endpoints[1].communicate.called
+
+    @patch('calvin.runtime.south.monitor.time')
+    def test_timer(self, time_mock, async_mock):
+        time_mock.time.return_value = 100.0
+        self.monitor.loop(self.scheduler)
+        self.monitor.set_timer(self.endpoints[0], 0.5)
+        self.monitor.set_timer(self.endpoints[0], 0.8)
+        # A wakeup is scheduled for the first timer
+        async_mock.DelayedCall.assert_called_once_with(0.5, self.monitor._wakeup_loop)
+        self.monitor.loop(self.scheduler)
+        assert self.endpoints[0].communicate.call_count == 1
+
+        time_mock.time.return_value = 100.6
+        self.monitor._wakeup_loop()
+        self.scheduler.trigger_loop.assert_called_once_with(actor_ids=[])
+        self.monitor.loop(self.scheduler)
+        assert self.endpoints[0].communicate.call_count == 2
+        # The later timer was merged into the first
+        time_mock.time.return_value = 101.0
+        self.monitor.loop(self.scheduler)
+        assert self.endpoints[0].communicate.call_count == 2
+        assert self.endpoints[1].communicate.call_count == 1
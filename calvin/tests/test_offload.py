@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from mock import Mock, patch
+from twisted.internet import defer
+
+from calvin.actor.actor import condition, ActionResult
+from calvin.runtime.north.calvin_token import Token, ExceptionToken
+from calvin.runtime.north import offload
+from calvin.tests.test_batch_condition import InPort, OutPort
+
+pytestmark = pytest.mark.unittest
+
+
+def actor(tokens, space=10):
+    a = Mock()
+    a.inports = {'a': InPort([Token(t) for t in tokens])}
+    a.outports = {'out': OutPort(space)}
+    a.exception_handler.return_value = ActionResult(production=('handled', ))
+    a._offload_job = None
+    return a
+
+
+@condition(['a'], ['out'], offload='thread')
+def double(self, a):
+    return ActionResult(production=(2 * a, ))
+
+
+@condition(['a'], ['out'], offload='thread')
+def fail(self, a):
+    raise Exception("failed")
+
+
+def deferred_threads():
+    """ Threads stand-in running the function at once """
+    threads = Mock()
+    threads.defer_to_thread.side_effect = lambda func, *args: defer.succeed(func(*args))
+    return threads
+
+
+def test_offload_thread():
+    jobs = []
+    pool = Mock()
+    pool.run_in_thread.side_effect = lambda actor, action, method, args: jobs.append((action, method, args)) or \
+        offload.OffloadJob(actor, action)
+    a = actor([1, 2])
+    with patch('calvin.runtime.north.offload.get_offload', return_value=pool):
+        assert not double(a).did_fire
+        assert jobs[0][2] == [1]
+        # Tokens stay in the FIFO until the action returned
+        assert a.inports['a'].available_tokens() == 2
+        assert not double(a).did_fire
+        assert len(jobs) == 1
+        a._offload_job.finished(jobs[0][1](a, *jobs[0][2]), None)
+        a._calvinsys.scheduler_wakeup.assert_called_with([a.id])
+        result = double(a)
+    assert result.did_fire
+    assert (result.tokens_consumed, result.tokens_produced) == (1, 1)
+    assert a.outports['out'].written == [2]
+    assert a.inports['a'].available_tokens() == 1
+    assert a._offload_job is None
+
+
+def test_offload_not_runnable():
+    a = actor([1], space=0)
+    with patch('calvin.runtime.north.offload.get_offload') as get_offload:
+        assert not double(a).did_fire
+        assert not get_offload.called
+
+
+def test_offload_exception_token():
+    a = actor([1])
+    a.inports['a'].tokens[0] = ExceptionToken()
+    with patch('calvin.runtime.north.offload.get_offload') as get_offload:
+        assert double(a).did_fire
+        assert not get_offload.called
+    assert a.outports['out'].written == ['handled']
+
+
+@patch('calvin.runtime.north.offload.threads', deferred_threads())
+def test_offload_pool():
+    pool = offload.Offload()
+    a = actor([1, 2])
+    with patch('calvin.runtime.north.offload.get_offload', return_value=pool):
+        double(a)
+        assert a._offload_job.done
+        assert double(a).did_fire
+        fail(a)
+        with pytest.raises(Exception):
+            fail(a)
+    stats = pool.get_stats()['thread']
+    assert (stats['submitted'], stats['completed'], stats['failed']) == (2, 1, 1)
+    assert stats['queue_depth'] == 0
+    assert a.outports['out'].written == [2]
+    # The failed action did not consume its token
+    assert a.inports['a'].available_tokens() == 1
+
+
+def test_offload_requires_pool_type():
+    with pytest.raises(Exception):
+        condition(['a'], ['out'], offload='gpu')
+
+
+@patch('calvin.runtime.south.plugins.async.twistedimpl.threads.threads')
+def test_offload_process_unpicklable(twisted_threads):
+    # The thread waiting for the process pool runs at once
+    twisted_threads.deferToThread.side_effect = lambda func, *args: defer.maybeDeferred(func, *args)
+    pool = offload.Offload()
+    pool.process_workers = 1
+    try:
+        a = actor([1])
+        job = pool.run_in_process(a, double, [lambda: None])
+        assert job.done
+        assert "PicklingError" in job.error
+        stats = pool.get_stats()['process']
+        assert (stats['submitted'], stats['completed'], stats['failed']) == (1, 0, 1)
+        assert not pool.process_pending
+    finally:
+        pool.stop()
+
+
+def test_offload_process_stop():
+    pool = offload.Offload()
+    pool.process_pool = Mock()
+    a = actor([1])
+    with patch('calvin.runtime.north.offload.threads') as threads_mock:
+        threads_mock.defer_to_process.return_value = defer.Deferred()
+        job = pool.run_in_process(a, double, [1])
+    pool.stop()
+    assert job.done and "CancelledError" in job.error
+    assert pool.get_stats()['process']['failed'] == 1
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from mock import Mock
+
+from calvin.actor.actor import condition, guard, ActionResult, _production_condition
+from calvin.runtime.north.calvin_token import Token, ExceptionToken
+
+pytestmark = pytest.mark.unittest
+
+
+def port(tokens=(), space=5):
+    p = Mock()
+    p.available_tokens.return_value = len(tokens) if tokens else space
+    p.peek_token.side_effect = list(tokens)
+    return p
+
+
+def actor(inports, outports):
+    a = Mock()
+    a.inports = inports
+    a.outports = outports
+    a.exception_handler.return_value = ActionResult(production=('handled', ))
+    return a
+
+
+def increment(self, value):
+    return ActionResult(production=(value + 1, ))
+
+
+def add(self, values, other):
+    return ActionResult(production=(sum(values) + other, [other, other]))
+
+
+def written(p):
+    return [c[0][0].value for c in p.write_token.call_args_list]
+
+
+def wrappers(method, action_input, action_output):
+    """ The checked condition wrapper and the production one """
+    checked = condition(action_input, action_output)(method)
+    action_input = checked.action_input
+    action_output = checked.action_output
+    tokens_consumed = sum(n for _, n in action_input)
+    tokens_produced = sum(n for _, n in action_output)
+    production = _production_condition(method, action_input, action_output, tokens_consumed, tokens_produced)
+    assert production.action_input == checked.action_input
+    assert production.action_output == checked.action_output
+    return checked, production
+
+
+@pytest.mark.parametrize("mode", [0, 1])
+def test_one_to_one(mode):
+    wrapper = wrappers(increment, ['token'], ['token'])[mode]
+    a = actor({'token': port([Token(1)])}, {'token': port()})
+    result = wrapper(a)
+    assert result.did_fire
+    assert (result.tokens_consumed, result.tokens_produced) == (1, 1)
+    assert written(a.outports['token']) == [2]
+    a.inports['token'].commit_peek_as_read.assert_called_once_with()
+
+    # No space
+    a = actor({'token': port([Token(1)])}, {'token': port(space=0)})
+    assert not wrapper(a).did_fire
+    assert not a.inports['token'].peek_token.called
+
+
+@pytest.mark.parametrize("mode", [0, 1])
+def test_exception_token(mode):
+    wrapper = wrappers(increment, ['token'], ['token'])[mode]
+    a = actor({'token': port([ExceptionToken()])}, {'token': port()})
+    wrapper(a)
+    assert a.exception_handler.call_args[0][2] == {'exceptions': {'token': [0]}}
+    assert written(a.outports['token']) == ['handled']
+
+
+@pytest.mark.parametrize("mode", [0, 1])
+def test_repeat(mode):
+    wrapper = wrappers(add, [('values', 2), 'other'], ['sum', ('copies', 2)])[mode]
+    a = actor({'values': port([Token(1), Token(2)]), 'other': port([Token(10)])},
+              {'sum': port(), 'copies': port()})
+    result = wrapper(a)
+    assert (result.tokens_consumed, result.tokens_produced) == (3, 3)
+    assert written(a.outports['sum']) == [13]
+    assert written(a.outports['copies']) == [10, 10]
+
+
+@pytest.mark.parametrize("mode", [0, 1])
+def test_guarded(mode):
+    guarded = guard(lambda self, value: value > 1)(increment)
+    wrapper = wrappers(guarded, ['token'], ['token'])[mode]
+    a = actor({'token': port([Token(1)])}, {'token': port()})
+    assert not wrapper(a).did_fire
+    a.inports['token'].peek_rewind.assert_called_once_with()
+    assert not a.outports['token'].write_token.called
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.tests import DummyNode
+from calvin.runtime.north.actormanager import ActorManager
+from calvin.runtime.north.scheduler import Scheduler, EventScheduler, DebugEventScheduler
+from calvin.runtime.south.endpoint import LocalInEndpoint, LocalOutEndpoint
+
+pytestmark = pytest.mark.unittest
+
+
+def connect(out_actor, out_name, in_actor, in_name):
+    outport = out_actor.outports[out_name]
+    inport = in_actor.inports[in_name]
+    inport.attach_endpoint(LocalInEndpoint(inport, outport))
+    outport.attach_endpoint(LocalOutEndpoint(outport, inport))
+
+
+@patch('calvin.runtime.north.scheduler.async')
+class SchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        n = DummyNode()
+        self.am = ActorManager(node=n)
+        n.am = self.am
+        self.monitor = Mock()
+        self.monitor.loop.return_value = False
+
+    def _new_actor(self, a_type, a_args):
+        a_id = self.am.new(a_type, a_args)
+        a = self.am.actors[a_id]
+        a._calvinsys = Mock()
+        return a
+
+    def _chain(self):
+        """ Constant -> Identity -> Identity -> Terminator, all local """
+        actors = [self._new_actor('std.Constant', {'data': 42, 'n': 25}),
+                  self._new_actor('std.Identity', {}),
+                  self._new_actor('std.Identity', {}),
+                  self._new_actor('std.Terminator', {})]
+        connect(actors[0], 'token', actors[1], 'token')
+        connect(actors[1], 'token', actors[2], 'token')
+        connect(actors[2], 'token', actors[3], 'void')
+        return actors
+
+    def _run(self, scheduler_class):
+        actors = self._chain()
+        sched = scheduler_class(None, self.am, self.monitor)
+        sched.trigger_loop()
+        loops = 0
+        sched.loop_once()
+        while not sched.idle and loops < 100:
+            sched.loop_once()
+            loops += 1
+        sink_port = actors[3].inports['void']
+        consumed = actors[2].outports['token'].fifo.read_pos[sink_port.id]
+        return actors[0].n, consumed, sched
+
+    def test_same_firing_as_default(self, async_mock):
+        default_result = self._run(Scheduler)
+        self.am.actors.clear()
+        event_result = self._run(EventScheduler)
+        assert default_result[:2] == event_result[:2] == (0, 25)
+        # Nothing left to do, the event scheduler only polls the monitor
+        assert not event_result[2]._trigger_set
+
+    def test_debug_event_scheduler(self, async_mock):
+        # Debug runs keep the event scheduling
+        result = self._run(DebugEventScheduler)
+        assert result[:2] == (0, 25)
+        assert not result[2]._trigger_set
+
+    def test_fire_only_triggered(self, async_mock):
+        actors = {}
+        for i in range(3):
+            actor = Mock()
+            actor.id = "actor%d" % i
+            actor.enabled.return_value = True
+            actor.fire.return_value.did_fire = False
+            actor.fire.return_value.tokens_consumed = 0
+            actor.fire.return_value.tokens_produced = 0
+            actors[actor.id] = actor
+        self.am.actors = actors
+
+        sched = EventScheduler(None, self.am, self.monitor)
+        # First loop fires everything
+        sched.loop_once()
+        assert all(a.fire.call_count == 1 for a in actors.values())
+
+        sched.trigger_loop(actor_ids=["actor1"])
+        sched.loop_once()
+        assert actors["actor0"].fire.call_count == 1
+        assert actors["actor1"].fire.call_count == 2
+        assert actors["actor2"].fire.call_count == 1
+
+        # An unspecific trigger fires all actors
+        sched.trigger_loop()
+        sched.loop_once()
+        assert all(a.fire.call_count >= 2 for a in actors.values())
+
+    def test_fire_local_peers(self, async_mock):
+        actors = self._chain()
+        sched = EventScheduler(None, self.am, self.monitor)
+        total = sched.fire_actors(set([actors[0].id]))
+        # Constant filled its outport, its consumer should be runnable
+        assert total.actor_ids == set([actors[0].id, actors[1].id])
+        total = sched.fire_actors(set([actors[1].id]))
+        assert total.actor_ids == set([actors[0].id, actors[1].id, actors[2].id])
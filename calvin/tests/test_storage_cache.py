@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.utilities.lrucache import LRUCache
+from calvin.runtime.north import storage
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.utilities.lrucache.time')
+class LRUCacheTests(unittest.TestCase):
+
+    def test_ttl(self, time_mock):
+        time_mock.time.return_value = 100.0
+        cache = LRUCache(10)
+        cache.set("a", 1, 5.0)
+        assert cache.get("a") == 1
+        time_mock.time.return_value = 105.0
+        assert cache.get("a") is None
+        assert "a" not in cache
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru_eviction(self, time_mock):
+        time_mock.time.return_value = 100.0
+        cache = LRUCache(2)
+        cache.set("a", 1, 5.0)
+        cache.set("b", 2, 5.0)
+        cache.get("a")
+        cache.set("c", 3, 5.0)
+        # b was least recently used
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()['evictions'] == 1
+
+    def test_disabled(self, time_mock):
+        time_mock.time.return_value = 100.0
+        cache = LRUCache(0)
+        cache.set("a", 1, 5.0)
+        assert len(cache) == 0
+        cache = LRUCache(10)
+        cache.set("a", 1, 0)
+        assert len(cache) == 0
+
+
+@patch('calvin.runtime.north.storage.async')
+class StorageCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        with patch('calvin.runtime.north.storage.storage_factory'):
+            self.storage = storage.Storage(Mock())
+        self.storage.started = True
+        self.storage.cache = LRUCache(10)
+        self.storage.cache_ttl = {'node-': 60.0}
+        self.plugin = self.storage.storage
+        # The storage plugin replies at once
+        self.plugin.get.side_effect = lambda key, cb: cb(key=key, value=self.storage.coder.encode({'uri': key}))
+        self.plugin.set.side_effect = lambda key, value, cb: cb(key=key, value=True)
+
+    def test_off_by_default(self, async_mock):
+        # Nothing tells a dht node about values changed by the others, caching is opt-in
+        with patch('calvin.runtime.north.storage.storage_factory'):
+            self.storage = storage.Storage(Mock())
+        self.storage.started = True
+        self.storage.storage.get.side_effect = self.plugin.get.side_effect
+        self.storage.get_node("n1", Mock())
+        self.storage.get_node("n1", Mock())
+        assert self.storage.storage.get.call_count == 2
+        assert len(self.storage.cache) == 0
+
+    def test_cached_get(self, async_mock):
+        cb = Mock()
+        self.storage.get_node("n1", cb)
+        cb.assert_called_once_with("n1", {'uri': "node-n1"})
+        self.storage.get_node("n1", cb)
+        assert self.plugin.get.call_count == 1
+        async_mock.DelayedCall.assert_called_with(0, cb, key="n1", value={'uri': "node-n1"})
+        assert (self.storage.cache.hits, self.storage.cache.misses) == (1, 1)
+
+    def test_bypass(self, async_mock):
+        self.storage.get_node("n1", Mock())
+        self.storage.get_node("n1", Mock(), bypass_cache=True)
+        assert self.plugin.get.call_count == 2
+
+    def test_uncached_prefix(self, async_mock):
+        self.storage.get_actor("a1", Mock())
+        self.storage.get_actor("a1", Mock())
+        assert self.plugin.get.call_count == 2
+        assert len(self.storage.cache) == 0
+
+    def test_invalidate(self, async_mock):
+        self.storage.get_node("n1", Mock())
+        self.storage.set("node-", "n1", {'uri': "new"}, None)
+        assert "node-n1" not in self.storage.cache
+        self.storage.get_node("n1", Mock())
+        self.storage.delete("node-", "n1", None)
+        assert "node-n1" not in self.storage.cache
+        self.storage.get_node("n1", Mock())
+        self.storage.append("node-", "n1", ["x"], None)
+        assert "node-n1" not in self.storage.cache
+
+    def test_no_cache_while_set_pending(self, async_mock):
+        self.plugin.set.side_effect = None
+        self.storage.set("node-", "n1", {'uri': "new"}, None)
+        self.storage.get_cb("node-n1", self.storage.coder.encode({'uri': "old"}), Mock(), "n1", cache_ttl=60.0)
+        assert "node-n1" not in self.storage.cache
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+from twisted.internet import defer
+from kademlia.node import Node
+from kademlia.utils import digest
+
+from calvin.runtime.north import storage
+from calvin.runtime.north.plugins.storage.storage_base import StorageBase
+from calvin.runtime.north.plugins.storage.proxy import StorageProxy
+from calvin.runtime.south.plugins.storage.twistedimpl.dht.append_server import AppendServer
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.runtime.north.storage.async')
+class StorageManyTests(unittest.TestCase):
+
+    def setUp(self):
+        with patch('calvin.runtime.north.storage.storage_factory'):
+            self.storage = storage.Storage(Mock())
+        self.storage.started = True
+        self.plugin = self.storage.storage
+        coder = self.storage.coder
+        # The storage plugin replies at once
+        self.plugin.set_many.side_effect = lambda items, cb: [cb(key, True) for key in items]
+        self.plugin.get_many.side_effect = lambda keys, cb: [cb(key, coder.encode({'id': key})) for key in keys]
+        self.plugin.append_many.side_effect = lambda items, cb: [cb(key, True) for key in items]
+
+    def test_set_many(self, async_mock):
+        cb = Mock()
+        self.storage.set_many("port-", {"p1": {'name': "in"}, "p2": {'name': "out"}}, cb)
+        assert self.plugin.set_many.call_count == 1
+        assert sorted(self.plugin.set_many.call_args[1]['items']) == ["port-p1", "port-p2"]
+        assert cb.call_count == 2
+        # Confirmed values leave the localstore
+        assert not self.storage.localstore
+
+    def test_get_many(self, async_mock):
+        cb = Mock()
+        self.plugin.set_many.side_effect = None
+        self.storage.set_many("actor-", {"a1": {'node_id': "n1"}}, None)
+        self.storage.get_many("actor-", ["a1", "a2", "a3"], cb)
+        # a1 is still in localstore
+        assert self.plugin.get_many.call_args[1]['keys'] == ["actor-a2", "actor-a3"]
+        async_mock.DelayedCall.assert_called_with(0, cb, key="a1", value={'node_id': "n1"})
+        cb.assert_any_call("a2", {'id': "actor-a2"})
+        cb.assert_any_call("a3", {'id': "actor-a3"})
+
+    def test_add_indexes(self, async_mock):
+        cb = Mock()
+        self.storage.add_indexes([("node/attribute/owner/me", "n1"), (['node', 'capabilities', 'io'], "n1")], cb=cb)
+        assert self.plugin.append_many.call_count == 1
+        keys = self.plugin.append_many.call_args[1]['items'].keys()
+        assert "index-/node/attribute/owner" in keys
+        assert "index-/node/attribute/owner/me" in keys
+        assert "index-/node/capabilities/io" in keys
+        # Called once when all index levels are done
+        assert cb.call_count == 1
+        assert cb.call_args[1]['value']
+
+    def _port(self, port_id, name):
+        port = Mock(id=port_id)
+        port.name = name
+        port.is_connected.return_value = False
+        return port
+
+    def test_add_actor(self, async_mock):
+        self.storage.set = Mock()
+        actor = Mock(id="a1", _type="std.Identity")
+        actor.name = "identity"
+        actor.inports = {'in': self._port("p1", "in")}
+        actor.outports = {'out': self._port("p2", "out")}
+        self.storage.add_actor(actor, "n1")
+        items = self.plugin.set_many.call_args[1]['items']
+        assert sorted(items) == ["port-p1", "port-p2"]
+        assert self.storage.coder.decode(items["port-p1"])['actor_id'] == "a1"
+        kwargs = self.storage.set.call_args[1]
+        assert (kwargs['prefix'], kwargs['key']) == ("actor-", "a1")
+        assert (kwargs['value']['name'], kwargs['value']['type']) == ("identity", "std.Identity")
+
+    def test_proxy_many(self, async_mock):
+        tunnel = Mock()
+        self.storage._init_proxy()
+        self.storage.tunnel_recv_handler(tunnel, {'cmd': 'GET_MANY', 'msg_uuid': "m1", 'keys': ["actor-a1", "actor-a2"]})
+        reply = tunnel.send.call_args[0][0]
+        assert reply['msg_uuid'] == "m1"
+        assert self.storage.coder.decode(reply['values']["actor-a2"]) == {'id': "actor-a2"}
+        coded = self.storage.coder.encode({'name': "in"})
+        self.storage.tunnel_recv_handler(tunnel, {'cmd': 'SET_MANY', 'msg_uuid': "m2", 'items': {"port-p1": coded}})
+        assert tunnel.send.call_args[0][0] == {'cmd': 'REPLY', 'msg_uuid': "m2", 'values': {"port-p1": True}}
+        assert self.plugin.set_many.call_args[1]['items'] == {"port-p1": coded}
+
+
+def test_storage_base_many():
+    base = StorageBase()
+    base.set = Mock()
+    base.get = Mock()
+    cb = Mock()
+    base.set_many({"a": "1", "b": "2"}, cb=cb)
+    assert base.set.call_count == 2
+    base.get_many(["a", "b"], cb=cb)
+    base.get.assert_any_call(key="b", cb=cb)
+
+
+@patch('calvin.runtime.north.plugins.storage.proxy.TimingWheel')
+@patch('calvin.runtime.north.plugins.storage.proxy.async')
+def test_proxy_client_many(async_mock, wheel_mock):
+    proxy = StorageProxy(Mock())
+    proxy.tunnel = Mock()
+    cb = Mock()
+    proxy.get_many(["a", "b"], cb=cb)
+    proxy._send_queued()
+    msg = proxy.tunnel.send.call_args[0][0]
+    assert (msg['cmd'], msg['keys']) == ('GET_MANY', ["a", "b"])
+    proxy.tunnel_recv_handler({'cmd': 'REPLY', 'msg_uuid': msg['msg_uuid'], 'values': {"a": "1", "b": None}})
+    cb.assert_any_call(key="a", value="1")
+    cb.assert_any_call(key="b", value=None)
+    assert not proxy.replies
+
+
+@patch('kademlia.network.LoopingCall')
+def test_dht_set_many_sparse(looping_mock):
+    server = AppendServer(ksize=3)
+    server.protocol = Mock(router=server.protocol.router)
+    server.protocol.callStoreMany.side_effect = lambda node, items: defer.succeed((True, True))
+    server.set = Mock(side_effect=lambda key, value: defer.succeed(True))
+    server.protocol.router.addContact(Node(digest("n1"), "127.0.0.1", 5001))
+    result = []
+    # Fewer than ksize known nodes need not be the closest ones, the keys are crawled
+    server.set_many({"a": "1", "b": "2"}).addCallback(result.append)
+    assert result == [{"a": True, "b": True}]
+    assert sorted(call[0] for call in server.set.call_args_list) == [("a", "1"), ("b", "2")]
+    assert not server.protocol.callStoreMany.called
+    server.protocol.router.addContact(Node(digest("n2"), "127.0.0.1", 5002))
+    server.protocol.router.addContact(Node(digest("n3"), "127.0.0.1", 5003))
+    server.set.reset_mock()
+    server.set_many({"a": "1", "b": "2"}).addCallback(result.append)
+    assert result[1] == {"a": True, "b": True}
+    assert server.protocol.callStoreMany.call_count == 3
+    assert not server.set.called
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.utilities.lrucache import LRUCache
+from calvin.runtime.north import storage
+from calvin.runtime.north.plugins.storage.proxy import StorageProxy
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.runtime.north.plugins.storage.proxy.TimingWheel')
+@patch('calvin.runtime.north.plugins.storage.proxy.async')
+class StorageProxyClientTests(unittest.TestCase):
+
+    def _proxy(self, window=64, policy={'batch': True}):
+        proxy = StorageProxy(Mock())
+        proxy.window = window
+        proxy.tunnel = Mock(policy=policy)
+        return proxy
+
+    def test_batch(self, async_mock, wheel_mock):
+        proxy = self._proxy()
+        cb = Mock()
+        proxy.get("actor-a1", cb=cb)
+        proxy.set("actor-a2", '{}', cb=cb)
+        # One send scheduled for the tick
+        async_mock.DelayedCall.assert_called_once_with(0, proxy._send_queued)
+        assert not proxy.tunnel.send.called
+        proxy._send_queued()
+        batch = proxy.tunnel.send.call_args[0][0]
+        assert batch['cmd'] == 'BATCH'
+        assert [(m['cmd'], m['key']) for m in batch['msgs']] == [('GET', "actor-a1"), ('SET', "actor-a2")]
+        proxy.tunnel_recv_handler({'cmd': 'BATCH', 'msgs': [
+            {'cmd': 'REPLY', 'msg_uuid': m['msg_uuid'], 'key': m['key'], 'value': "v"} for m in batch['msgs']]})
+        assert cb.call_count == 2
+        assert not proxy.replies
+        assert proxy.timeouts.cancel.call_count == 2
+
+    def test_no_batch(self, async_mock, wheel_mock):
+        # An older master accepts no policy
+        proxy = self._proxy(policy={})
+        proxy.get("actor-a1", cb=Mock())
+        proxy.get("actor-a2", cb=Mock())
+        proxy._send_queued()
+        assert [c[0][0]['key'] for c in proxy.tunnel.send.call_args_list] == ["actor-a1", "actor-a2"]
+        assert len(proxy.replies) == 2
+
+    def test_window(self, async_mock, wheel_mock):
+        proxy = self._proxy(window=2)
+        for i in range(3):
+            proxy.get("actor-a%d" % i, cb=Mock())
+        proxy._send_queued()
+        assert len(proxy.tunnel.send.call_args[0][0]['msgs']) == 2
+        assert len(proxy.queue) == 1
+        # A reply opens the window for the next request
+        async_mock.DelayedCall.reset_mock()
+        msg_id = proxy.tunnel.send.call_args[0][0]['msgs'][0]['msg_uuid']
+        proxy.tunnel_recv_handler({'cmd': 'REPLY', 'msg_uuid': msg_id, 'key': "actor-a0", 'value': None})
+        async_mock.DelayedCall.assert_called_once_with(0, proxy._send_queued)
+        proxy._send_queued()
+        assert proxy.tunnel.send.call_args[0][0]['key'] == "actor-a2"
+
+    def test_timeout(self, async_mock, wheel_mock):
+        proxy = self._proxy()
+        get_cb, append_cb = Mock(), Mock()
+        proxy.get("actor-a1", cb=get_cb)
+        proxy.append("index-/a", '["x"]', cb=append_cb)
+        proxy._send_queued()
+        msg_ids = [m['msg_uuid'] for m in proxy.tunnel.send.call_args[0][0]['msgs']]
+        for msg_id in msg_ids:
+            proxy.timeouts.add.assert_any_call(msg_id, proxy.timeout, proxy._reply_timeout)
+            proxy._reply_timeout(msg_id)
+        get_cb.assert_called_once_with(key="actor-a1", value=None)
+        append_cb.assert_called_once_with(key="index-/a", value=False)
+        assert not proxy.replies
+        # A late reply is ignored
+        proxy.tunnel_recv_handler({'cmd': 'REPLY', 'msg_uuid': msg_ids[0], 'key': "actor-a1", 'value': "v"})
+        assert get_cb.call_count == 1
+
+    def test_tunnel_down(self, async_mock, wheel_mock):
+        proxy = self._proxy()
+        sent_cb, queued_cb = Mock(), Mock()
+        proxy.get_many(["a", "b"], cb=sent_cb)
+        proxy._send_queued()
+        proxy.set("c", '{}', cb=queued_cb)
+        proxy.tunnel_down(org_cb=None)
+        sent_cb.assert_any_call(key="a", value=None)
+        sent_cb.assert_any_call(key="b", value=None)
+        queued_cb.assert_called_once_with(key="c", value=False)
+        assert not proxy.replies and not proxy.queue
+
+
+@patch('calvin.runtime.north.plugins.storage.proxy.TimingWheel')
+@patch('calvin.runtime.north.plugins.storage.proxy.async')
+class StorageProxyCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.proxy = StorageProxy(Mock())
+        self.proxy.cache = LRUCache(10)
+        self.proxy.tunnel = Mock()
+
+    def _get(self, key, value):
+        """ A get replied by the master, returns the request """
+        self.proxy.get(key, cb=Mock())
+        self.proxy._send_queued()
+        msg = self.proxy.tunnel.send.call_args[0][0]
+        self.proxy.tunnel_recv_handler({'cmd': 'REPLY', 'msg_uuid': msg['msg_uuid'], 'key': key, 'value': value})
+        return msg
+
+    def test_cached(self, async_mock, wheel_mock):
+        # The master remembers the key until the reply could have expired from the cache
+        assert self._get("index-/a", '["n1"]')['cache'] == self.proxy.timeout + self.proxy.cache_ttl
+        cb = Mock()
+        self.proxy.tunnel.send.reset_mock()
+        self.proxy.get("index-/a", cb=cb)
+        assert not self.proxy.queue
+        async_mock.DelayedCall.assert_called_with(0, cb, key="index-/a", value='["n1"]')
+        assert self.proxy.cache.stats()['hit_rate'] == 0.5
+        # get_concat is cached on its own
+        self.proxy.get_concat("index-/a", cb=cb)
+        assert self.proxy.queue
+
+    def test_invalidate(self, async_mock, wheel_mock):
+        self._get("index-/a", '["n1"]')
+        self._get("index-/b", '["n1"]')
+        self.proxy.invalidated_cb = Mock()
+        self.proxy.tunnel_recv_handler({'cmd': 'INVALIDATE', 'keys': ["index-/a"]})
+        assert ('GET', "index-/a") not in self.proxy.cache
+        assert ('GET', "index-/b") in self.proxy.cache
+        self.proxy.invalidated_cb.assert_called_once_with("index-/a")
+        # Our own change
+        self.proxy.append("index-/b", '["n2"]')
+        assert ('GET', "index-/b") not in self.proxy.cache
+
+    def test_invalidated_while_getting(self, async_mock, wheel_mock):
+        self.proxy.get("index-/a", cb=Mock())
+        self.proxy._send_queued()
+        msg = self.proxy.tunnel.send.call_args[0][0]
+        self.proxy.tunnel_recv_handler({'cmd': 'INVALIDATE', 'keys': ["index-/a"]})
+        # The reply could be older than the change
+        self.proxy.tunnel_recv_handler({'cmd': 'REPLY', 'msg_uuid': msg['msg_uuid'], 'key': "index-/a", 'value': "old"})
+        assert len(self.proxy.cache) == 0
+
+    def test_disabled(self, async_mock, wheel_mock):
+        self.proxy.cache = LRUCache(0)
+        assert 'cache' not in self._get("index-/a", '["n1"]')
+        self.proxy.get("index-/a", cb=Mock())
+        assert self.proxy.queue
+
+
+@patch('calvin.runtime.north.storage.async')
+class StorageProxyServerTests(unittest.TestCase):
+
+    def setUp(self):
+        with patch('calvin.runtime.north.storage.storage_factory'):
+            self.storage = storage.Storage(Mock())
+        self.storage.started = True
+        self.storage._init_proxy()
+        self.plugin = self.storage.storage
+        self.tunnel = Mock()
+        wheel_patcher = patch('calvin.utilities.timingwheel.async')
+        wheel_patcher.start()
+        self.addCleanup(wheel_patcher.stop)
+
+    def test_accept_batch(self, async_mock):
+        tunnel = Mock(policy={'batch': True, 'unknown': 1})
+        assert self.storage.tunnel_request_handles(tunnel)
+        assert tunnel.policy == {'batch': True}
+        tunnel = Mock(policy={})
+        self.storage.tunnel_request_handles(tunnel)
+        assert tunnel.policy == {'batch': False}
+
+    def test_batch_replied_at_once(self, async_mock):
+        coder = self.storage.coder
+        self.plugin.get.side_effect = lambda key, cb: cb(key=key, value=coder.encode({'id': key}))
+        self.plugin.set.side_effect = lambda key, value, cb: cb(key=key, value=True)
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'BATCH', 'msgs': [
+            {'cmd': 'GET', 'msg_uuid': "m1", 'key': "actor-a1"},
+            {'cmd': 'SET', 'msg_uuid': "m2", 'key': "actor-a2", 'value': coder.encode({'id': "a2"})}]})
+        self.tunnel.send.assert_called_once_with({'cmd': 'BATCH', 'msgs': [
+            {'cmd': 'REPLY', 'msg_uuid': "m1", 'key': "actor-a1", 'value': coder.encode({'id': "actor-a1"})},
+            {'cmd': 'REPLY', 'msg_uuid': "m2", 'key': "actor-a2", 'value': True}]})
+
+    def test_batch_late_reply(self, async_mock):
+        replies = {}
+        self.plugin.get.side_effect = lambda key, cb: replies.__setitem__(key, cb)
+        self.plugin.set.side_effect = lambda key, value, cb: cb(key=key, value=True)
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'BATCH', 'msgs': [
+            {'cmd': 'GET', 'msg_uuid': "m1", 'key': "actor-a1"},
+            {'cmd': 'SET', 'msg_uuid': "m2", 'key': "actor-a2", 'value': self.storage.coder.encode({})}]})
+        assert not self.tunnel.send.called
+        # The replies ready when the tick is over are sent
+        args = async_mock.DelayedCall.call_args[0]
+        assert args[:2] == (0, self.storage._proxy_send_batch)
+        args[1](*args[2:])
+        self.tunnel.send.assert_called_once_with({'cmd': 'REPLY', 'msg_uuid': "m2", 'key': "actor-a2", 'value': True})
+        # and later replies on their own
+        replies["actor-a1"](key="actor-a1", value=None)
+        self.tunnel.send.assert_called_with({'cmd': 'REPLY', 'msg_uuid': "m1", 'key': "actor-a1", 'value': 'null'})
+
+    def test_invalidate_holders(self, async_mock):
+        tunnel2 = Mock(peer_node_id="n2")
+        self.tunnel.peer_node_id = "n1"
+        self.storage.tunnel = {"n1": self.tunnel, "n2": tunnel2}
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'GET', 'msg_uuid': "m1", 'key': "index-/a", 'cache': 60.0})
+        self.storage.tunnel_recv_handler(tunnel2, {'cmd': 'GET', 'msg_uuid': "m2", 'key': "index-/a"})
+        self.storage.append("index-", "/a", ["n3"], None)
+        self.storage.remove("index-", "/a", ["n4"], None)
+        # Sent once at the end of the tick, only to the client caching the key
+        async_mock.DelayedCall.assert_any_call(0, self.storage._proxy_send_invalidations)
+        self.tunnel.reset_mock()
+        self.storage._proxy_send_invalidations()
+        self.tunnel.send.assert_called_once_with({'cmd': 'INVALIDATE', 'keys': ["index-/a"]})
+        assert not tunnel2.send.called
+        assert self.storage.cache_stats()['proxy_master'] == {'keys': 0, 'invalidations': 1}
+
+    def test_holder_tunnel_down(self, async_mock):
+        self.tunnel.peer_node_id = "n1"
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'GET', 'msg_uuid': "m1", 'key': "index-/a", 'cache': 60.0})
+        self.storage.tunnel_down(self.tunnel)
+        assert not self.storage._proxy_cache_holders
+        assert not len(self.storage._proxy_cache_timeouts)
+
+    def test_holder_expires(self, async_mock):
+        self.tunnel.peer_node_id = "n1"
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'GET', 'msg_uuid': "m1", 'key': "index-/a", 'cache': 1.0})
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'GET', 'msg_uuid': "m2", 'key': "index-/b", 'cache': 1.0})
+        wheel = self.storage._proxy_cache_timeouts
+        wheel._tick()
+        # Cached again, remembered from now
+        self.storage.tunnel_recv_handler(self.tunnel, {'cmd': 'GET', 'msg_uuid': "m3", 'key': "index-/b", 'cache': 1.0})
+        wheel._tick()
+        wheel._tick()
+        assert self.storage._proxy_cache_holders == {"index-/b": set(["n1"])}
+        # The client no longer caches index-/a, no invalidation is sent
+        self.storage.append("index-", "/a", ["n3"], None)
+        assert not self.storage._proxy_invalidations
+        wheel._tick()
+        assert not self.storage._proxy_cache_holders
+        assert not len(wheel)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import pytest
+from mock import Mock, patch
+
+from calvin.utilities.timingwheel import TimingWheel
+from calvin.runtime.north.calvin_network import CalvinLink
+import calvin.requests.calvinresponse as response
+
+pytestmark = pytest.mark.unittest
+
+
+@patch('calvin.utilities.timingwheel.async')
+class TimingWheelTests(unittest.TestCase):
+
+    def _ticks(self, wheel, n):
+        for _ in range(n):
+            wheel._tick()
+
+    def test_expire(self, async_mock):
+        wheel = TimingWheel(tick=1.0, slots=8)
+        cb = Mock()
+        wheel.add("a", 3.0, cb)
+        async_mock.DelayedCall.assert_called_once_with(1.0, wheel._tick)
+        self._ticks(wheel, 2)
+        assert not cb.called
+        self._ticks(wheel, 1)
+        cb.assert_called_once_with("a")
+        assert len(wheel) == 0
+        # Timer stops when nothing is pending
+        assert wheel.timer is None
+
+    def test_cancel(self, async_mock):
+        wheel = TimingWheel(tick=1.0, slots=8)
+        cb = Mock()
+        wheel.add("a", 2.0, cb)
+        wheel.add("b", 2.0, cb)
+        assert wheel.cancel("a")
+        assert not wheel.cancel("a")
+        self._ticks(wheel, 3)
+        cb.assert_called_once_with("b")
+        # Only one reactor timer for all timeouts
+        assert async_mock.DelayedCall.call_count == 3
+
+    def test_rounds(self, async_mock):
+        wheel = TimingWheel(tick=1.0, slots=4)
+        cb = Mock()
+        wheel.add("a", 10.0, cb)
+        self._ticks(wheel, 9)
+        assert not cb.called
+        self._ticks(wheel, 1)
+        cb.assert_called_once_with("a")
+
+    def test_added_while_running(self, async_mock):
+        wheel = TimingWheel(tick=1.0, slots=8)
+        cb = Mock()
+        wheel.add("a", 5.0, cb)
+        self._ticks(wheel, 1)
+        # Next tick may be imminent, never expire early
+        wheel.add("b", 1.0, cb)
+        self._ticks(wheel, 1)
+        assert not cb.called
+        self._ticks(wheel, 1)
+        cb.assert_called_once_with("b")
+
+    def test_failing_callback(self, async_mock):
+        wheel = TimingWheel(tick=1.0, slots=8)
+        cb = Mock()
+        wheel.add("a", 1.0, Mock(side_effect=Exception()))
+        wheel.add("b", 1.0, cb)
+        self._ticks(wheel, 2)
+        cb.assert_called_once_with("b")
+
+
+@patch('calvin.utilities.timingwheel.async')
+@patch('calvin.runtime.north.calvin_network.async')
+class LinkReplyTests(unittest.TestCase):
+
+    def test_reply(self, network_async, async_mock):
+        link = CalvinLink("node1", "node2", Mock())
+        cb = Mock()
+        link.send_with_reply(cb, {'cmd': 'ACTOR_NEW'})
+        msg_id = link.transport.send.call_args[0][0]['msg_uuid']
+        assert len(link.timeouts) == 1
+        link.reply_handler({'msg_uuid': msg_id, 'value': response.CalvinResponse(response.OK).encode()})
+        assert cb.call_args[0][0] == response.OK
+        assert len(link.timeouts) == 0
+
+    def test_timeout(self, network_async, async_mock):
+        timeouts = TimingWheel(tick=1.0, slots=4)
+        link = CalvinLink("node1", "node2", Mock(), timeouts=timeouts)
+        cb = Mock()
+        link.send_with_reply(cb, {'cmd': 'ACTOR_NEW'})
+        for _ in range(10):
+            timeouts._tick()
+        assert cb.call_args[0][0] == response.GATEWAY_TIMEOUT
+        assert not link.replies
+
+    def test_msg_ids(self, network_async, async_mock):
+        link = CalvinLink("node1", "node2", Mock())
+        link.send_with_reply(Mock(), {'cmd': 'ACTOR_NEW'})
+        link.send_with_reply(Mock(), {'cmd': 'ACTOR_NEW'})
+        new_link = CalvinLink("node1", "node2", Mock(), link)
+        new_link.send_with_reply(Mock(), {'cmd': 'ACTOR_NEW'})
+        ids = [l.transport.send.call_args_list[i][0][0]['msg_uuid'] for l, i in [(link, 0), (link, 1), (new_link, 0)]]
+        assert len(set(ids)) == 3
+        assert new_link.timeouts is link.timeouts
+        assert len(link.replies) == 3
+
+    def test_shared_timeouts(self, network_async, async_mock):
+        timeouts = TimingWheel()
+        link = CalvinLink("node1", "node2", Mock(), timeouts=timeouts)
+        assert link.timeouts is timeouts
@@ -93,14 +93,42 @@ class CalvinConfig(object):
                 'framework': 'twistedimpl',
                 'storage_type': 'dht', # supports dht, securedht, local, and proxy
                 'storage_proxy': None,
+                'storage_proxy_window': 64,  # proxy client requests waiting for replies from the master at most
+                'storage_proxy_timeout': 20.0,  # seconds a proxy client request waits for its reply before failing
+                'storage_proxy_cache_size': 0,  # entries a proxy client caches, invalidated by the master when changed, 0 disables
+                'storage_proxy_cache_ttl': 60.0,  # seconds a proxy client caches a value, bounds staleness of changes not made through the master
+                'storage_path': None,  # directory of files keeping local or dht storage values across restarts, None keeps them in memory
+                'storage_sync_delay': 0.1,  # seconds storage writes wait to be synced to disk together, 0 syncs every write
+                'storage_sync_count': 1000,  # unsynced storage writes that are synced at once
+                'storage_cache_size': 0,  # entries in the read cache of storage gets, 0 disables
+                # seconds per key prefix, others are not cached, changes by other dht nodes are seen when expired
+                'storage_cache_ttl': {'node-': 60.0, 'application-': 10.0, 'actor-': 2.0, 'port-': 2.0},
                 'capabilities_blacklist': [],
-                'remote_coder_negotiator': 'static',
+                'remote_coder_negotiator': 'static',  # supports static and dynamic
                 'static_coder': 'json',
+                'link_coalescing': False,  # Send messages queued within the delay as one frame
+                'link_coalescing_delay': 0.0,  # seconds, 0 sends at next reactor iteration
+                'link_coalescing_bytes': 32768,
+                'link_compression': None,  # supports zlib, used when the peer can decompress it
+                'link_compression_threshold': 1024,  # bytes, smaller frames are sent as is
+                'link_compression_level': 1,
+                'token_link': 'shared',  # supports shared, token (one data link per peer) and dedicated (per port)
                 'metering_timeout': 10.0,
                 'metering_aggregated_timeout': 3600.0,  # Larger or equal to metering_timeout
                 'media_framework': 'defaultimpl',
                 'display_plugin': 'stdout_impl',
-                'transports': ['calvinip'],
+                'transports': ['calvinip'],  # supports calvinip, calvinbt, calvinshm and calvinunix
+                'shm_ring_size': 1048576,  # bytes in each direction of a calvinshm link
+                'scheduler': 'default',  # supports default and event
+                'fifo': 'default',  # supports default and compact
+                'fifo_size': 5,
+                'fifo_max_size': None,  # grow full fifos up to this size, None disables growth
+                'token_chunk_size': 65536,  # string token data longer than this is sent in chunks, None disables
+                'actor_production_mode': False,  # skip actor status checks and action production validation
+                'actor_fusion': False,  # fire local chains of fusable actors as one unit
+                'offload_threads': 10,  # threads running actions declared with offload='thread'
+                'offload_processes': None,  # processes running actions declared with offload='process', None for one per cpu
+                'offload_process_timeout': 600,  # seconds before a process pool action fails, as when its worker died
                 'control_proxy': None
             },
             'testing': {
@@ -15,13 +15,77 @@
 # limitations under the License.
 
 import calvinlogger
+import binascii
+import itertools
 import logging
-import uuid as sys_uuid
+import os
+
+# Random bytes read from the os at a time
+_POOL_SIZE = 4096
+# uuid4 variant nibble from any hex digit
+_VARIANT = {c: '89ab'[int(c, 16) & 3] for c in '0123456789abcdef'}
+
+_prefixed = None  # Cached decision to prefix ids, None when not yet decided
+_pool = ''
+_pool_pos = 0
+_pool_pid = None
+_session = None  # Unique to the process, for transient ids
+_session_pid = None
+_counter = None
+
+
+def _use_prefix():
+    global _prefixed
+    if _prefixed is None:
+        _prefixed = calvinlogger.get_logger(__name__).getEffectiveLevel() == logging.DEBUG
+    return _prefixed
+
+
+def refresh():
+    """ Decide again whether to prefix ids, call after changing log levels """
+    global _prefixed
+    _prefixed = None
+
+
+def _random16():
+    global _pool, _pool_pos, _pool_pid
+    pid = os.getpid()
+    if _pool_pos + 16 > len(_pool) or _pool_pid != pid:
+        # Never reuse random bytes from a parent process
+        _pool = os.urandom(_POOL_SIZE)
+        _pool_pos = 0
+        _pool_pid = pid
+    _pool_pos += 16
+    return _pool[_pool_pos - 16:_pool_pos]
+
+
+def _uuid4():
+    h = binascii.hexlify(_random16())
+    return "%s-%s-4%s-%s%s-%s" % (h[:8], h[8:12], h[13:16], _VARIANT[h[16]], h[17:20], h[20:])
 
 
 def uuid(prefix):
-    u = str(sys_uuid.uuid4())
-    if calvinlogger.get_logger(__name__).getEffectiveLevel() == logging.DEBUG:
+    """ Globally unique random (version 4) uuid, for ids that are stored or sent to other runtimes """
+    u = _uuid4()
+    if _use_prefix():
+        return prefix + "_" + u
+    else:
+        return u
+
+
+def transient_id(prefix):
+    """ Cheap id for short-lived objects, e.g. messages waiting for a reply,
+        unique among the ids of all runtimes but not a uuid
+    """
+    global _session, _session_pid, _counter
+    pid = os.getpid()
+    if _session_pid != pid:
+        # A forked process gets its own session
+        _session = _uuid4()
+        _session_pid = pid
+        _counter = itertools.count()
+    u = "%s-%x" % (_session, next(_counter))
+    if _use_prefix():
         return prefix + "_" + u
     else:
         return u
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import re
+import time
+import struct
+from collections import OrderedDict
+
+from calvin.runtime.south.plugins.async import async
+from calvin.utilities import calvinconfig
+from calvin.utilities import calvinlogger
+
+_log = calvinlogger.get_logger(__name__)
+_conf = calvinconfig.get()
+
+# Record: operation, timestamp, key length, value length, then key and value
+_HEADER = struct.Struct('!cdII')
+_SET = 'S'
+_SET_NONE = 'N'
+_DELETE = 'D'
+
+# Compact the log when it has more bytes of stale records than this and than of live records
+COMPACT_MIN_BYTES = 1048576
+
+
+def store_path(name, kind):
+    """ Path of the persistent storage file kind (e.g. 'local' or 'dht') of the runtime name,
+        None when no storage_path is configured or the runtime has no name
+    """
+    directory = _conf.get(None, 'storage_path')
+    if not directory:
+        return None
+    if not name:
+        # The id of an unnamed runtime is new every start, its file would never be read again
+        _log.warning("Runtime has no name, %s storage is not kept in %s" % (kind, directory))
+        return None
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return os.path.join(directory, "%s.%s" % (re.sub(r'[^\w.-]', '_', name), kind))
+
+
+class LogStore(object):
+    """ Dictionary of string keys and string (or None) values kept in memory, with every change
+        appended to a log file that is read back when opened. Keys are ordered by the time they
+        were last set, oldest first.
+
+        Writes are synced to disk together, sync_delay seconds after the first unsynced write or
+        at once when sync_count writes are unsynced. sync_delay 0 syncs every write, and None
+        only syncs on sync_count, sync() and close(). With path None nothing is written.
+    """
+
+    def __init__(self, path, sync_delay=0.1, sync_count=1000):
+        super(LogStore, self).__init__()
+        self.path = path
+        self.sync_delay = sync_delay
+        self.sync_count = sync_count
+        self.data = OrderedDict()  # key: (timestamp, value)
+        self.live_bytes = 0  # size of the records of the current values
+        self.stale_bytes = 0  # size of the records in the log replaced by later ones
+        self.unsynced = 0
+        self.sync_timer = None
+        self.log = None
+        if self.path is None:
+            return
+        self._load()
+        self.log = open(self.path, 'ab')
+        if self._needs_compact():
+            self.compact()
+
+    def _needs_compact(self):
+        return self.stale_bytes > max(COMPACT_MIN_BYTES, self.live_bytes)
+
+    def _size(self, key, value):
+        return _HEADER.size + len(key) + (0 if value is None else len(value))
+
+    def _replaced(self, key):
+        """ The record of key, if any, is stale """
+        entry = self.data.pop(key, None)
+        if entry is not None:
+            size = self._size(key, entry[1])
+            self.live_bytes -= size
+            self.stale_bytes += size
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            buf = f.read()
+        pos = 0
+        while pos + _HEADER.size <= len(buf):
+            op, timestamp, key_len, value_len = _HEADER.unpack_from(buf, pos)
+            end = pos + _HEADER.size + key_len + value_len
+            if end > len(buf) or op not in (_SET, _SET_NONE, _DELETE):
+                break
+            key = buf[pos + _HEADER.size:pos + _HEADER.size + key_len]
+            self._replaced(key)
+            if op == _DELETE:
+                self.stale_bytes += end - pos
+            else:
+                self.data[key] = (timestamp, buf[end - value_len:end] if op == _SET else None)
+                self.live_bytes += end - pos
+            pos = end
+        if pos < len(buf):
+            # A write was cut short, e.g. by a crash, drop it
+            _log.warning("Truncating %d bytes of incomplete record in %s" % (len(buf) - pos, self.path))
+            with open(self.path, 'r+b') as f:
+                f.truncate(pos)
+
+    def _record(self, op, timestamp, key, value):
+        return _HEADER.pack(op, timestamp, len(key), len(value)) + key + value
+
+    def _written(self):
+        if self.log is None:
+            return
+        self.unsynced += 1
+        if self.unsynced >= self.sync_count or self.sync_delay == 0:
+            self.sync()
+        elif self.sync_timer is None and self.sync_delay is not None:
+            self.sync_timer = async.DelayedCall(self.sync_delay, self._sync_timeout)
+
+    def set(self, key, value, timestamp=None):
+        key = key.encode('utf-8') if isinstance(key, unicode) else key
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.log is not None:
+            if value is None:
+                self.log.write(self._record(_SET_NONE, timestamp, key, ""))
+            else:
+                self.log.write(self._record(_SET, timestamp, key, value))
+        self._replaced(key)
+        self.data[key] = (timestamp, value)
+        self.live_bytes += self._size(key, value)
+        self._written()
+
+    def delete(self, key):
+        key = key.encode('utf-8') if isinstance(key, unicode) else key
+        if key not in self.data:
+            return
+        if self.log is not None:
+            self.log.write(self._record(_DELETE, time.time(), key, ""))
+        # Both the set and the delete record are stale
+        self._replaced(key)
+        self.stale_bytes += self._size(key, None)
+        self._written()
+
+    def get(self, key, default=None):
+        entry = self.data.get(key)
+        return default if entry is None else entry[1]
+
+    def __getitem__(self, key):
+        return self.data[key][1]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if key not in self.data:
+            raise KeyError(key)
+        self.delete(key)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def iteritems(self):
+        for key, (_, value) in self.data.iteritems():
+            yield key, value
+
+    def iteritems_older_than(self, seconds):
+        """ (key, value) set more than seconds ago, oldest first """
+        oldest = time.time() - seconds
+        for key, (timestamp, value) in self.data.iteritems():
+            if timestamp > oldest:
+                break
+            yield key, value
+
+    def _sync_timeout(self):
+        self.sync_timer = None
+        self.sync()
+
+    def sync(self):
+        """ Write all changes to disk """
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        if self.log is None:
+            return
+        if self.unsynced:
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.unsynced = 0
+        if self._needs_compact():
+            self.compact()
+
+    def compact(self):
+        """ Rewrite the log with only the current values """
+        _log.debug("Compacting %s, %d keys, %d bytes, %d stale bytes" % (self.path, len(self.data),
+                                                                         self.live_bytes, self.stale_bytes))
+        self.log.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            for key, (timestamp, value) in self.data.iteritems():
+                if value is None:
+                    f.write(self._record(_SET_NONE, timestamp, key, ""))
+                else:
+                    f.write(self._record(_SET, timestamp, key, value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.path)
+        self.log = open(self.path, 'ab')
+        self.stale_bytes = 0
+        self.unsynced = 0
+
+    def close(self):
+        self.sync()
+        if self.log is not None:
+            self.log.close()
+            self.log = None
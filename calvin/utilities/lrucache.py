@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """ Bounded cache where every entry expires after its own time to live, when full
+        the least recently used entry is evicted. Counts hits, misses and evictions.
+
+        size: maximum number of entries
+    """
+
+    def __init__(self, size=1000):
+        super(LRUCache, self).__init__()
+        self.size = size
+        self.entries = OrderedDict()  # key: key, value: (expiry time, value), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """ Returns the value of key, or default when missing or expired """
+        entry = self.entries.pop(key, None)
+        if entry is None or entry[0] <= time.time():
+            self.misses += 1
+            return default
+        # Reinsert as most recently used
+        self.entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        """ Keep value for ttl seconds """
+        if self.size <= 0 or ttl <= 0:
+            return
+        self.entries.pop(key, None)
+        while len(self.entries) >= self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.entries[key] = (time.time() + ttl, value)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.entries), 'max_size': self.size, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Ericsson AB
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+from calvin.runtime.south.plugins.async import async
+from calvin.utilities import calvinlogger
+
+_log = calvinlogger.get_logger(__name__)
+
+
+class TimingWheel(object):
+    """ Hashed timing wheel for many timeouts that are mostly cancelled, e.g. waiting for replies.
+        Adding and cancelling a timeout is a dictionary operation, and a single reactor timer
+        ticks the wheel while any timeout is pending. Timeouts expire up to one tick late.
+
+        tick: seconds between ticks
+        slots: number of slots, timeouts longer than tick * slots wait some rounds of the wheel
+    """
+
+    def __init__(self, tick=0.5, slots=64):
+        super(TimingWheel, self).__init__()
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]  # key: timeout key, value: (rounds left, callback)
+        self.slot_of = {}  # key: timeout key, value: slot index
+        self.position = 0
+        self.timer = None
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def add(self, key, delay, callback):
+        """ Call callback(key) after delay seconds unless cancelled, key must be unique among pending timeouts """
+        ticks = max(1, int(math.ceil(delay / self.tick)))
+        if self.timer is not None:
+            # Next tick is less than a tick away
+            ticks += 1
+        index = (self.position + ticks) % len(self.slots)
+        self.slots[index][key] = ((ticks - 1) // len(self.slots), callback)
+        self.slot_of[key] = index
+        if self.timer is None:
+            self.timer = async.DelayedCall(self.tick, self._tick)
+
+    def cancel(self, key):
+        """ Cancel a pending timeout, returns False if not pending """
+        index = self.slot_of.pop(key, None)
+        if index is None:
+            return False
+        del self.slots[index][key]
+        return True
+
+    def _tick(self):
+        self.position = (self.position + 1) % len(self.slots)
+        slot = self.slots[self.position]
+        expired = []
+        for key, (rounds, callback) in slot.items():
+            if rounds:
+                slot[key] = (rounds - 1, callback)
+            else:
+                del slot[key]
+                del self.slot_of[key]
+                expired.append((key, callback))
+        self.timer = async.DelayedCall(self.tick, self._tick) if self.slot_of else None
+        for key, callback in expired:
+            try:
+                callback(key)
+            except Exception:
+                _log.exception("Timeout callback failed")